@@ -1,25 +1,106 @@
 import os
-import json
+import queue
+import threading
+import time as _time
 import requests
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
+from bar_store import BarStore
+from http_session import get_session
+from bars import Bars
+from stream import MarketStream, ReplayFeed
+from orderbook import OrderBook
+from execution import ExecutionEngine
+from resample import Resampler, BASE_TIMEFRAME, timeframe_seconds
 
 # Load API keys from .env file
 load_dotenv()
 
+DATA_URL = os.getenv("DATA_URL", "https://data.alpaca.markets/v1beta3/crypto/us/bars")
+# "resample": the last_* helpers build every timeframe from BASE_TIMEFRAME bars;
+# "alpaca": one request per timeframe
+BAR_SOURCE = os.getenv("BAR_SOURCE", "resample")
+
+def _parse_time(value):
+  if isinstance(value, datetime):
+      return value
+  return datetime.strptime(value, '%Y-%m-%dT%H:%M:%SZ')
+
+def _format_time(value):
+  return value.strftime('%Y-%m-%dT%H:%M:%SZ')
+
+class RateLimiter:
+  # Token bucket shared by the backfill workers (Alpaca allows 200 requests/min)
+
+  def __init__(self, requests_per_minute):
+      self.interval = 60.0 / requests_per_minute
+      self.capacity = max(1, requests_per_minute // 10)
+      self.tokens = self.capacity
+      self.updated = _time.monotonic()
+      self.lock = threading.Lock()
+
+  def acquire(self):
+      while True:
+          with self.lock:
+              now = _time.monotonic()
+              self.tokens = min(self.capacity, self.tokens + (now - self.updated) / self.interval)
+              self.updated = now
+              if self.tokens >= 1:
+                  self.tokens -= 1
+                  return
+              wait = (1 - self.tokens) * self.interval
+          _time.sleep(wait)
+
 class CryptoTrader:
 
-  def __init__(self):
+  def __init__(self, stream=None, symbol="BTC/USD", key=None, secret=None, bar_store=None, account=""):
+      # symbol is the default for every market data and order call; key and
+      # secret select the account (APCA_API_KEY_ID / APCA_API_SECRET_KEY by default),
+      # and account names it in the trade store ("" for the default keys)
+      self.symbol = symbol
+      self.account = account
+      self.position_symbol = symbol.replace("/", "")   # positions use "BTCUSD"
       self.headers = {
           "accept": "application/json",
-          "APCA-API-KEY-ID": os.getenv("APCA_API_KEY_ID"),
-          "APCA-API-SECRET-KEY": os.getenv("APCA_API_SECRET_KEY")
+          "APCA-API-KEY-ID": key or os.getenv("APCA_API_KEY_ID"),
+          "APCA-API-SECRET-KEY": secret or os.getenv("APCA_API_SECRET_KEY")
       }
+      self.session = get_session()
+      self.bar_store = bar_store or BarStore()
+      # While a MarketStream is live, bars and the order book come from memory
+      self.stream = stream
+      self.replay = None
+      # Base series every other timeframe is resampled from
+      self.resampler = Resampler(base_seconds=timeframe_seconds(BASE_TIMEFRAME))
+      self.base_refreshed = None
+
+  def start_stream(self, symbol=None, capacity=None, replay=None, speed=0.0, record_path=None):
+      # Seed the ring buffers from REST history, then keep them current from the
+      # websocket, or from a recorded file when replay is given
+      symbol = symbol or self.symbol
+      self.stream = MarketStream(symbol, capacity, record_path=record_path)
+      now = datetime.utcnow()
+      for timeframe, ring in self.stream.rings.items():
+          start = now - timedelta(seconds=ring.seconds * (ring.capacity - 1))
+          self.stream.seed(timeframe, self.data_history(symbol, timeframe, _format_time(start), _format_time(now)))
+      if replay:
+          self.replay = ReplayFeed(self.stream, path=replay, speed=speed).start()
+      else:
+          self.stream.connect(self.headers["APCA-API-KEY-ID"], self.headers["APCA-API-SECRET-KEY"])
+      return self.stream
+
+  def stop_stream(self):
+      if self.replay is not None:
+          self.replay.stop()
+      if self.stream is not None:
+          self.stream.stop()
+      self.stream = self.replay = None
 
   def cash_crypto_balance(self):
       balance = []
       try:
-          cash = requests.get(os.getenv("BASE_URL"), headers=self.headers)
+          cash = self.session.get(os.getenv("BASE_URL"), headers=self.headers)
           cash = cash.json()
 
           keys_to_keep = [
@@ -30,12 +111,12 @@ class CryptoTrader:
           filtered_data = {key: value for key, value in cash.items() if key in keys_to_keep}
           balance.append(filtered_data)
 
-          cryptos = requests.get(os.getenv("POS_URL"), headers=self.headers)
+          cryptos = self.session.get(os.getenv("POS_URL"), headers=self.headers)
           cryptos = cryptos.json()
 
           if isinstance(cryptos, list):
               for crypto in cryptos:
-                  if crypto["symbol"] == "BTCUSD":
+                  if crypto["symbol"] == self.position_symbol:
                       keys_to_keep = [
                           'symbol', 'qty', 'avg_entry_price', 
                           'side', 'market_value', 'current_price'
@@ -55,55 +136,203 @@ class CryptoTrader:
           return balance
       return balance
     
-  def data_history(self, symbol="BTC/USD", time=None, start=None, end=None):
-    if "/" in symbol:
-        symbol = symbol.replace("/", "%2F")
-    url = (
-        "https://data.alpaca.markets/v1beta3/crypto/us/bars?symbols={symbol}&timeframe={time}&start={start}&end={end}&limit=1000&sort=asc"
-    ).format(symbol=symbol, time=time, start=start, end=end)
+  def data_history(self, symbol=None, time=None, start=None, end=None):
+    symbol = symbol or self.symbol
+    if self.stream is not None and self.stream.covers(symbol, time, start):
+        return self.stream.bars(time, start=start, end=end)
 
+    # Only ask Alpaca for bars after the last stored one, then serve the whole
+    # window from the local store.
+    fetch_start = self.bar_store.fetch_start(symbol, time, start)
     try:
-        response = requests.get(url, headers=self.headers)
-        response.raise_for_status()  # Check if the request was successful
-        data = response.json()
+        bars = self.fetch_bars(symbol=symbol, time=time, start=fetch_start, end=end)
+        self.bar_store.merge(symbol, time, bars, start=fetch_start, end=end)
     except requests.RequestException as e:
         print("Error fetching historical data:", e)
-        return []
+        print("Using stored bars only.")
 
+    return self.bar_store.read(symbol, time, start=start, end=end)
+
+  def fetch_bars(self, symbol=None, time=None, start=None, end=None):
+    symbol = symbol or self.symbol
+    pages = self.iter_bar_pages([symbol], time=time, start=start, end=end)
+    return Bars.concat([Bars.from_records(page.get(symbol, [])) for page in pages])
+
+  def iter_bar_pages(self, symbols, time=None, start=None, end=None, limit=10000, rate_limiter=None, stop=None):
+    # Follow next_page_token and yield one raw page ({symbol: [bars]}) at a time so
+    # long ranges never have to sit in memory as a single response.
+    params = {
+        "symbols": ",".join(symbols),
+        "timeframe": time,
+        "start": start,
+        "end": end,
+        "limit": limit,
+        "sort": "asc"
+    }
     keys_to_keep = ['c', 'h', 'l', 'o', 't', 'v']
-    filtered_bars = [
-        {key: bar[key] for key in keys_to_keep} for bar in data.get('bars', {}).get('BTC/USD', [])
-    ]
-    return json.dumps(filtered_bars, indent=4)
 
-  def last_thirty_days(self, symbol = "BTC/USD", time = "1D"):
+    while True:
+        if stop is not None and stop.is_set():
+            return
+        if rate_limiter is not None:
+            rate_limiter.acquire()
+        response = self.session.get(DATA_URL, params=params, headers=self.headers)
+        response.raise_for_status()  # Check if the request was successful
+        data = response.json()
+
+        page = {
+            symbol: [{key: bar[key] for key in keys_to_keep} for bar in bars]
+            for symbol, bars in (data.get('bars') or {}).items()
+        }
+        if page:
+            yield page
+
+        next_page_token = data.get('next_page_token')
+        if not next_page_token:
+            return
+        params["page_token"] = next_page_token
+
+  def backfill(self, symbols, time="1Min", start=None, end=None, slice_days=30, max_workers=4,
+               requests_per_minute=180, limit=10000):
+    # Bulk history loader: every (symbol, date slice) is fetched by a worker
+    # thread and its pages are handed back as (symbol, bars) chunks. The queue
+    # is bounded, so workers wait while the consumer is busy and memory stays
+    # at a few pages no matter how long the range is.
+    if isinstance(symbols, str):
+        symbols = [symbols]
+    start = _parse_time(start)
+    end = _parse_time(end) if end else datetime.utcnow()
+
+    jobs = []
+    slice_start = start
+    while slice_start < end:
+        slice_end = min(slice_start + timedelta(days=slice_days), end)
+        for symbol in symbols:
+            jobs.append((symbol, _format_time(slice_start), _format_time(slice_end)))
+        slice_start = slice_end
+
+    rate_limiter = RateLimiter(requests_per_minute)
+    chunks = queue.Queue(maxsize=max_workers * 2)
+    stop = threading.Event()
+    done = object()
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                chunks.put(item, timeout=0.5)
+                return
+            except queue.Full:
+                continue
+
+    def worker(symbol, slice_start, slice_end):
+        try:
+            pages = self.iter_bar_pages([symbol], time=time, start=slice_start, end=slice_end,
+                                        limit=limit, rate_limiter=rate_limiter, stop=stop)
+            for page in pages:
+                bars = page.get(symbol, [])
+                # Slices share their boundary, keep the boundary bar in the later slice only
+                if bars and bars[-1]['t'] >= slice_end and slice_end != jobs[-1][2]:
+                    bars = [bar for bar in bars if bar['t'] < slice_end]
+                if bars:
+                    put((symbol, Bars.from_records(bars)))
+        except Exception as e:
+            put(e)
+        finally:
+            put(done)
+
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        for job in jobs:
+            executor.submit(worker, *job)
+        remaining = len(jobs)
+        while remaining:
+            item = chunks.get()
+            if item is done:
+                remaining -= 1
+            elif isinstance(item, Exception):
+                raise item
+            else:
+                yield item
+    finally:
+        stop.set()
+        executor.shutdown(wait=False)
+
+  def history(self, symbol=None, time=None, start=None, end=None):
+    # Bars for the prompt, indicators and chart. For the trader's own symbol
+    # every timeframe is resampled from one base series, so a cycle makes a
+    # single bar request however many timeframes it reads
+    symbol = symbol or self.symbol
+    if BAR_SOURCE != "resample" or symbol != self.symbol or time == BASE_TIMEFRAME:
+        return self.data_history(symbol=symbol, time=time, start=start, end=end)
+    self.refresh_base()
+    return self.resampler.bars(time, start=start, end=end)
+
+  def refresh_base(self, max_age=5):
+    # New base bars since the newest one held (re-read, it may have been
+    # partial); callers within max_age seconds share one refresh
+    with self.resampler.lock:
+        now = _time.monotonic()
+        if self.base_refreshed is not None and now - self.base_refreshed < max_age:
+            return
+        end = datetime.utcnow()
+        last = self.resampler.last()
+        if last is None:
+            start = _format_time(end - timedelta(seconds=self.resampler.history))
+        else:
+            start = str(last) + 'Z'
+        self.resampler.update(self.data_history(time=BASE_TIMEFRAME, start=start, end=_format_time(end)))
+        self.base_refreshed = now
+
+  def last_thirty_days(self, symbol=None, time = "1D"):
     end_date = datetime.now()
     start_date = end_date - timedelta(days=30)
     start_str = start_date.strftime('%Y-%m-%dT00:00:00Z')
     end_str = end_date.strftime('%Y-%m-%dT%H:%M:%SZ')
-    return self.data_history(symbol=symbol, time=time, start=start_str, end=end_str)
+    return self.history(symbol=symbol, time=time, start=start_str, end=end_str)
+
+  def last_24_hours(self, symbol=None, time="1H"):  
+    return self.last_n_hours(24, symbol=symbol, time=time)
 
-  def last_24_hours(self, symbol="BTC/USD", time="1H"):  
+  def last_n_hours(self, hours, symbol=None, time="1H"):
     end_date = datetime.now()
-    start_date = end_date - timedelta(hours=24)
+    start_date = end_date - timedelta(hours=hours)
     start_str = start_date.strftime('%Y-%m-%dT%H:%M:%SZ')
     end_str = end_date.strftime('%Y-%m-%dT%H:%M:%SZ')
-    return self.data_history(symbol=symbol, time=time, start=start_str, end=end_str)
+    return self.history(symbol=symbol, time=time, start=start_str, end=end_str)
 
-  def get_crypto_positions(self):
-    response = requests.get(os.getenv("POS_URL"), headers=self.headers)
+  def get_crypto_positions(self, symbol=None):
+    symbol = symbol or self.position_symbol
+    response = self.session.get(os.getenv("POS_URL"), headers=self.headers)
     positions = response.json()
 
-    if isinstance(positions, list) and positions:
+    if isinstance(positions, list):
         for position in positions:
-            if 'qty' in position:
+            if position.get('symbol') == symbol and 'qty' in position:
                 return float(position['qty'])
+        print("No positions found.")
+        return None
     else:
-        print("Unexpected response format: expected a list or no positions found.")
+        print("Unexpected response format: expected a list.")
         return None
 
+  def account_snapshot(self, symbol=None):
+    # Cash and the symbol's position, picked by key rather than list order;
+    # no position means 0 BTC, priced off the book
+    symbol = symbol or self.position_symbol
+    balances = self.cash_crypto_balance()
+    account = next((item for item in balances if 'cash' in item), None)
+    if account is None:
+        raise RuntimeError("Account balance unavailable")
+    position = next((item for item in balances if item.get('symbol') == symbol), None)
+    if position is None:
+        return {"usd_balance": float(account['cash']), "btc_balance": 0.0, "btc_avg_buy_price": 0.0,
+                "btc_usd_price": self.price_estimate("sell") or 0.0}
+    return {"usd_balance": float(account['cash']), "btc_balance": float(position['qty']),
+            "btc_avg_buy_price": float(position['avg_entry_price']),
+            "btc_usd_price": float(position['current_price'])}
+
   def get_balance(self): 
-    response = requests.get(os.getenv("BASE_URL"), headers=self.headers)
+    response = self.session.get(os.getenv("BASE_URL"), headers=self.headers)
     account_info = response.json()
 
     if 'portfolio_value' in account_info:
@@ -113,43 +342,71 @@ class CryptoTrader:
         return None
   
   def order_book(self):
-    response = requests.get(os.getenv("ORDERBOOK_URL"), headers=self.headers)
+    if self.stream is not None and self.stream.fresh() and self.stream.has_book():
+        return self.stream.order_book()
+    url = os.getenv("ORDERBOOK_URL").split("?")[0]
+    response = self.session.get(url, params={"symbols": self.symbol}, headers=self.headers)
     return response.json()
 
-  def sell_market_order(self, percentage):
+  def _with_book(self, fn):
+    # fn(OrderBook) on the streamed book when live, else on a REST snapshot
+    if self.stream is not None and self.stream.fresh() and self.stream.has_book():
+        with self.stream.lock:
+            return fn(self.stream.book)
+    return fn(OrderBook.from_response(self.order_book(), self.symbol))
+
+  def book_features(self):
+    # Spread, mid, depth, imbalance and fill slippage (see orderbook.py)
+    return self._with_book(lambda book: book.features())
+
+  def price_estimate(self, side, qty=None, notional=None):
+    # Expected fill price of a market order: VWAP over the book for the size,
+    # or the touch price without one. None when that side is empty.
+    return self._with_book(lambda book: book.price_estimate(side, qty=qty, notional=notional))
+
+  def submit_order(self, side, qty=None, notional=None, symbol=None, type="market", time_in_force="ioc"):
+    # One order over the pooled session; returns the order JSON
+    payload = {
+        "side": side,
+        "type": type,
+        "time_in_force": time_in_force,
+        "symbol": symbol or self.symbol,
+    }
+    if qty is not None:
+        payload["qty"] = str(qty)
+    else:
+        payload["notional"] = str(notional)
+    response = self.session.post(os.getenv("ORDER_URL"), json=payload, headers=self.headers)
+    response.raise_for_status()
+    return response.json()
+
+  def get_order(self, order_id):
+    response = self.session.get(f"{os.getenv('ORDER_URL').rstrip('/')}/{order_id}", headers=self.headers)
+    response.raise_for_status()
+    return response.json()
+
+  def sell_market_order(self, percentage, engine=None):
+    # The whole decision is worked by the execution engine, in child orders of
+    # at most 200,000 USD each
     qty = self.get_crypto_positions()
-    data = self.order_book()
-    latest_ask_price = data.get('orderbooks', {}).get('BTC/USD', {}).get('a', [{}])[0].get('p')
+    price = self.price_estimate("sell", qty=qty * (percentage / 100)) if qty else None
 
-    if qty is not None and latest_ask_price and qty * latest_ask_price > 1:
+    if qty is not None and price and qty * price > 1:
         sell_amount = qty * (percentage / 100)
-        if sell_amount * latest_ask_price > 200000:
-            sell_amount = 200000 / latest_ask_price
-        payload = {
-            "side": "sell",
-            "type": "market",
-            "time_in_force": "ioc",
-            "symbol": "BTC/USD",
-            "qty": str(sell_amount)
-        }
-        response = requests.post(os.getenv("ORDER_URL"), json=payload, headers=self.headers)
-        print(response.text)
+        report = (engine or ExecutionEngine(self)).execute("sell", qty=sell_amount)
+        print(report)
+        return report
     else:
-        print("BTC less than $1 or no positions found.")
+        print(f"{self.symbol.split('/')[0]} less than $1 or no positions found.")
 
-  def buy_market_order(self, percentage):
+  def buy_market_order(self, percentage, engine=None):
     balance = self.get_balance()
     if balance and balance > 1:
-        notional_amount = min(balance * (percentage / 100), 200000)
-        payload = {
-            "side": "buy",
-            "type": "market",
-            "time_in_force": "ioc",
-            "symbol": "BTC/USD",
-            "notional": str(notional_amount)
-        }
-        response = requests.post(os.getenv("ORDER_URL"), json=payload, headers=self.headers)
-        print(f"### Buy Order Executed: {percentage}% available USD")
-        print(response.text)
+        notional_amount = balance * (percentage / 100)
+        price = self.price_estimate("buy", notional=notional_amount)
+        print(f"### Buy Order Executed: {percentage}% available USD" + (f", expected fill ~{price:.2f}" if price else ""))
+        report = (engine or ExecutionEngine(self)).execute("buy", notional=notional_amount)
+        print(report)
+        return report
     else:
         print("Insufficient balance to place a buy order.")
@@ -0,0 +1,175 @@
+import numpy as np
+import pandas as pd
+
+from trade_store import DEFAULT_SYMBOL, DEFAULT_ACCOUNT
+
+# Portfolio analytics
+# ------------------------
+# Columnar NumPy over the trades table: one row per logged decision with the
+# balances after it. Everything is computed from running sums and
+# accumulates, so whole-history and rolling figures are O(n).
+
+SECONDS_PER_YEAR = 365 * 24 * 3600
+
+COLUMNS = ['timestamp', 'decision', 'percentage', 'btc_balance', 'usd_balance', 'btc_avg_buy_price', 'btc_usd_price']
+
+class Portfolio:
+    __slots__ = ('t', 'decision', 'percentage', 'btc', 'usd', 'avg', 'price')
+
+    def __init__(self, t, decision, percentage, btc, usd, avg, price):
+        self.t = np.asarray(t, dtype='datetime64[us]')
+        self.decision = np.asarray(decision, dtype=object)
+        self.percentage = np.asarray(percentage, dtype=np.float64)
+        self.btc = np.asarray(btc, dtype=np.float64)
+        self.usd = np.asarray(usd, dtype=np.float64)
+        self.avg = np.asarray(avg, dtype=np.float64)
+        self.price = np.asarray(price, dtype=np.float64)
+
+    def __len__(self):
+        return len(self.t)
+
+def from_frame(df):
+    # Trades frame in any order (get_recent_trades is newest first)
+    if df.empty:
+        return Portfolio(*[[] for _ in COLUMNS])
+    df = df.sort_values('id' if 'id' in df else 'timestamp')
+    times = pd.to_datetime(df['timestamp'], format='ISO8601').to_numpy()
+    numbers = [df[column].fillna(0).to_numpy() for column in COLUMNS[2:]]
+    return Portfolio(times, df['decision'].to_numpy(), *numbers)
+
+def load(conn, start=None, end=None, symbol=DEFAULT_SYMBOL, account=DEFAULT_ACCOUNT):
+    # Straight from SQLite, oldest first, for one symbol and account (balances
+    # of different ones do not add up to a portfolio); start/end are ISO timestamps
+    query = (f"SELECT {', '.join(COLUMNS)} FROM trades WHERE symbol = ? AND account = ? "
+             "AND timestamp >= ? AND timestamp <= ? ORDER BY timestamp")
+    rows = conn.execute(query, (symbol, account, start or '', end or '\uffff')).fetchall()
+    if not rows:
+        return Portfolio(*[[] for _ in COLUMNS])
+    t, decision, percentage, btc, usd, avg, price = zip(*rows)
+    return Portfolio(pd.to_datetime(t, format='ISO8601').to_numpy(), decision,
+                     *(np.array(column, dtype=np.float64) for column in (percentage, btc, usd, avg, price)))
+
+# Series
+# ------------------------
+
+def equity_curve(p):
+    return p.usd + p.btc * p.price
+
+def trade_pnl(p):
+    # Realized PnL per row: BTC sold since the previous row, priced against
+    # the average buy price before the sale. Same rule as the store rollups.
+    prev_btc = np.concatenate(([0.0], p.btc[:-1]))
+    prev_avg = np.concatenate(([0.0], p.avg[:-1]))
+    sold = np.clip(prev_btc - p.btc, 0.0, None)
+    return sold * (p.price - prev_avg)
+
+def unrealized_pnl(p):
+    return p.btc * (p.price - p.avg)
+
+def returns(equity):
+    if len(equity) < 2:
+        return np.zeros(0)
+    previous = equity[:-1]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        r = np.where(previous > 0, equity[1:] / previous - 1, 0.0)
+    return r
+
+def drawdown(equity):
+    # Fraction below the running peak, <= 0
+    if not len(equity):
+        return np.zeros(0)
+    peak = np.maximum.accumulate(equity)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(peak > 0, equity / peak - 1, 0.0)
+
+def exposure(p, equity=None):
+    # Share of equity held in BTC
+    equity = equity_curve(p) if equity is None else equity
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(equity > 0, p.btc * p.price / equity, 0.0)
+
+def periods_per_year(p):
+    # Annualisation from the median spacing between trades
+    if len(p) < 2:
+        return 0.0
+    step = np.median(np.diff(p.t).astype('timedelta64[us]').astype(np.float64)) / 1e6
+    return SECONDS_PER_YEAR / step if step > 0 else 0.0
+
+def _ratio(mean, deviation, scale):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(deviation > 0, mean / deviation * scale, np.nan)
+
+# Summary
+# ------------------------
+
+def summary(p):
+    equity = equity_curve(p)
+    pnl = trade_pnl(p)
+    r = returns(equity)
+    scale = np.sqrt(periods_per_year(p))
+    realized = pnl[pnl != 0]
+    wins = int((realized > 0).sum())
+
+    result = {
+        'trades': len(p),
+        'start_equity': float(equity[0]) if len(p) else 0.0,
+        'end_equity': float(equity[-1]) if len(p) else 0.0,
+        'return_pct': float((equity[-1] / equity[0] - 1) * 100) if len(p) and equity[0] > 0 else 0.0,
+        'max_drawdown_pct': float(drawdown(equity).min() * 100) if len(p) else 0.0,
+        'sharpe': float(_ratio(r.mean(), r.std(), scale)) if len(r) else float('nan'),
+        'sortino': float(_ratio(r.mean(), np.sqrt(np.mean(np.minimum(r, 0) ** 2)), scale)) if len(r) else float('nan'),
+        'realized_pnl': float(pnl.sum()),
+        'unrealized_pnl': float(unrealized_pnl(p)[-1]) if len(p) else 0.0,
+        'closed_trades': len(realized),
+        'wins': wins,
+        'win_rate_pct': wins / len(realized) * 100 if len(realized) else float('nan'),
+        'exposure_pct': float(exposure(p, equity).mean() * 100) if len(p) else 0.0,
+    }
+    return result
+
+def _window_sum(x, window):
+    # Sum of the last `window` values at each row (fewer at the start)
+    c = np.concatenate(([0.0], np.cumsum(x, dtype=np.float64)))
+    lo = np.maximum(np.arange(1, len(x) + 1) - window, 0)
+    return c[1:] - c[lo]
+
+def rolling(p, window):
+    # Per-row figures over the last `window` trades
+    equity = equity_curve(p)
+    n = len(p)
+    if not n:
+        return pd.DataFrame(columns=['timestamp', 'equity', 'return_pct', 'drawdown_pct', 'max_drawdown_pct',
+                                     'sharpe', 'sortino', 'win_rate_pct', 'exposure_pct'])
+    r = np.concatenate(([0.0], returns(equity)))
+    pnl = trade_pnl(p)
+    count = np.minimum(np.arange(1, n + 1), window).astype(np.float64)
+
+    mean = _window_sum(r, window) / count
+    variance = np.maximum(_window_sum(r * r, window) / count - mean ** 2, 0.0)
+    downside = np.sqrt(_window_sum(np.minimum(r, 0) ** 2, window) / count)
+    scale = np.sqrt(periods_per_year(p))
+
+    closed = _window_sum(pnl != 0, window)
+    won = _window_sum(pnl > 0, window)
+
+    # Drawdown against the trailing window's peak
+    peak = pd.Series(equity).rolling(window, min_periods=1).max().to_numpy()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        dd = np.where(peak > 0, equity / peak - 1, 0.0)
+        start = equity[np.maximum(np.arange(n) - window + 1, 0)]
+        window_return = np.where(start > 0, equity / start - 1, 0.0)
+        win_rate = np.where(closed > 0, won / closed * 100, np.nan)
+    # Worst of those drawdowns seen within the window
+    max_dd = pd.Series(dd).rolling(window, min_periods=1).min().to_numpy()
+
+    return pd.DataFrame({
+        'timestamp': p.t,
+        'equity': equity,
+        'return_pct': window_return * 100,
+        'drawdown_pct': dd * 100,
+        'max_drawdown_pct': max_dd * 100,
+        'sharpe': _ratio(mean, np.sqrt(variance), scale),
+        'sortino': _ratio(mean, downside, scale),
+        'win_rate_pct': win_rate,
+        'exposure_pct': _window_sum(exposure(p, equity), window) / count * 100,
+    })
@@ -1,14 +1,19 @@
-import json
+import os
+import hashlib
 import alpaca
 from openai import OpenAI
 import helper
 from pydantic import BaseModel
-from datetime import datetime, timedelta
 import sqlite3
-import time
 import pandas as pd
 import logging
-import schedule
+from gather import Gatherer
+import http_session
+import telemetry
+import prompt
+import trade_store
+import analytics
+from order_tracker import OrderTracker, expected_position
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -18,76 +23,102 @@ class TradingDecision(BaseModel):
   percentage : int
   reason: str
 
-def init_db():
-  conn = sqlite3. connect('bitcoin_trades.db')
-  c = conn. cursor()
-  c. execute('''CREATE TABLE IF NOT EXISTS trades
-  (id INTEGER PRIMARY KEY AUTOINCREMENT, 
-   timestamp TEXT, 
-   decision TEXT, 
-   percentage INTEGER, 
-   reason TEXT, 
-   btc_balance REAL, 
-   usd_balance REAL, 
-   btc_avg_buy_price REAL,
-  btc_usd_price REAL,
-  reflection TEXT)''')
-  conn.commit()
-  return conn
-
-def log_trade(conn, decision, percentage, reason, btc_balance, usd_balance, btc_avg_buy_price, btc_usd_price, reflection):
-    c = conn.cursor()
-    timestamp = datetime.now().isoformat()
-    c.execute('''INSERT INTO trades
-                 (timestamp, decision, percentage, reason, btc_balance, usd_balance, btc_avg_buy_price, btc_usd_price, reflection)
-                 VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)''',
-              (timestamp, decision, percentage, reason, btc_balance, usd_balance, btc_avg_buy_price, btc_usd_price, reflection))
-    conn.commit()
-  
-def get_recent_trades(conn, days=7):
-  c = conn.cursor()
-  seven_days_ago = (datetime.now() - timedelta(days=days)).isoformat()
-  c.execute("SELECT * FROM trades WHERE timestamp >  ? ORDER BY timestamp DESC", (seven_days_ago,))
-  columns = [column[0] for column in c.description]
-  return pd.DataFrame.from_records(data = c.fetchall(), columns = columns)
+def init_db(path=trade_store.DB_PATH):
+  return trade_store.get_store(path)
 
-def get_db_connection():
-   return sqlite3.connect("bitcoin_trades.db")
-
-def calculate_performance(trades_df):
-  if trades_df.empty:
-    return 0
-  
-  initial_balance = trades_df.iloc[-1]['usd_balance'] + trades_df.iloc[-1]['btc_balance'] * trades_df.iloc[-1]['btc_usd_price']
-  final_balance = trades_df.iloc[0]['usd_balance'] + trades_df.iloc[0]['btc_balance'] * trades_df.iloc[0]['btc_usd_price']
+def log_trade(store, decision, percentage, reason, btc_balance, usd_balance, btc_avg_buy_price, btc_usd_price, reflection, fill=None, symbol=trade_store.DEFAULT_SYMBOL, account=trade_store.DEFAULT_ACCOUNT):
+  store.log_trade(decision, percentage, reason, btc_balance, usd_balance, btc_avg_buy_price, btc_usd_price, reflection, fill=fill, symbol=symbol, account=account)
 
-  return (final_balance - initial_balance) / initial_balance * 100
+def get_recent_trades(store, days=7, symbol=trade_store.DEFAULT_SYMBOL, account=trade_store.DEFAULT_ACCOUNT):
+  return store.get_recent_trades(days, symbol, account)
 
-def generate_reflection(trades_df, current_market_data):
-  performance = calculate_performance(trades_df)
+def get_db_connection():
+  # Shared WAL-mode store, kept open for the life of the process
+  return trade_store.get_store()
 
-  client = OpenAI()
-  response = client.chat.completions.create(
+def calculate_performance(trades_df):
+  # Return over the equity curve of the frame, in percent
+  return analytics.summary(analytics.from_frame(trades_df))['return_pct']
+
+# Figures performance_summary takes from the analytics over the trades frame;
+# equity, return, PnL and trade counts come from the store's rollups
+RISK_KEYS = ('max_drawdown_pct', 'sharpe', 'sortino', 'closed_trades', 'wins', 'win_rate_pct', 'exposure_pct')
+
+def performance_summary(trades_df, days=7, symbol=trade_store.DEFAULT_SYMBOL, account=trade_store.DEFAULT_ACCOUNT):
+  # Rollup figures for the window plus drawdown, Sharpe/Sortino, win rate
+  # and exposure over the trades themselves
+  risk = analytics.summary(analytics.from_frame(trades_df))
+  return {**get_db_connection().recent_performance(days, symbol, account), **{key: risk[key] for key in RISK_KEYS}}
+
+def trades_hash(trades_df):
+  ids = sorted(trades_df['id'].tolist()) if not trades_df.empty else []
+  return hashlib.sha256(",".join(str(i) for i in ids).encode()).hexdigest()
+
+def generate_reflection(trades_df, symbol=trade_store.DEFAULT_SYMBOL, account=trade_store.DEFAULT_ACCOUNT):
+  # Reflections are cached on the trades they cover. With no new trade the
+  # stored one is reused; otherwise only the new trades are sent together
+  # with the previous reflection. Market data is left out of the reflection
+  # so a cached one never describes an old market; the decision prompt
+  # carries the current one.
+  input_hash = trades_hash(trades_df)
+  last_trade_id = int(trades_df['id'].max()) if not trades_df.empty else 0
+
+  store = get_db_connection()
+  cached = store.get_cached_reflection(symbol, account)
+  if cached:
+    cached_hash, cached_last_trade_id, cached_content = cached
+    if cached_hash == input_hash or last_trade_id <= cached_last_trade_id:
+      logger.info("Reflection: no new trades, reusing cached reflection")
+      return cached_content
+    new_trades = trades_df[trades_df['id'] > cached_last_trade_id]
+    content = request_reflection(new_trades, performance_summary(trades_df, symbol=symbol, account=account), previous=cached_content)
+  else:
+    content = request_reflection(trades_df, performance_summary(trades_df, symbol=symbol, account=account))
+  store.save_reflection(input_hash, last_trade_id, content, symbol, account)
+  return content
+
+def chat_completion(call, **kwargs):
+  # OpenAI chat call with its latency and token usage recorded under `call`
+  with telemetry.span("llm_seconds", call=call):
+    response = OpenAI().chat.completions.create(**kwargs)
+  telemetry.llm_usage(call, getattr(response, "usage", None))
+  return response
+
+def request_reflection(trades_df, performance, previous=None):
+  # performance: performance_summary() for the last 7 days
+  if previous:
+    trades_section = f"""Previous reflection:
+          {previous}
+
+          New trades since the previous reflection:
+          {prompt.encode_trades(trades_df)}"""
+  else:
+    trades_section = prompt.encode_trades(trades_df)
+
+  response = chat_completion(
+     "reflection",
      model = "gpt-4o",
      messages = [
        {
          "role" : "system",
-         "content" : "You are an AI trading assitant takes with analyzing recent trading performance and current market conditions to generate insights and improvements for future trading decisions."
+         "content" : "You are an AI trading assitant takes with analyzing recent trading performance to generate insights and improvements for future trading decisions."
        },
        {
          "role" : "user",
          "content" : f"""
-          {trades_df.to_json(orient='records')}
-          Current market data:
-          {current_market_data}
+          {trades_section}
 
-          Overall performance in the last 7 days: {performance: .2f}%
+          Overall performance in the last 7 days: {performance['return_pct']: .2f}%
+          Realized PnL: {performance['realized_pnl']:.2f} USD, unrealized PnL: {performance['unrealized_pnl']:.2f} USD
+          Trades: {performance['trades']} ({performance['buys']} buy, {performance['sells']} sell, {performance['holds']} hold)
+          Max drawdown: {performance['max_drawdown_pct']:.2f}%, Sharpe: {performance['sharpe']:.2f}, Sortino: {performance['sortino']:.2f}
+          Win rate: {performance['win_rate_pct']:.1f}% of {performance['closed_trades']} closed trades, average BTC exposure: {performance['exposure_pct']:.1f}%
 
           Please analyze this data and provide:
           1. A brief reflection on the recent trading decisions
           2. Insights on what worked well and what didn't
           3. Suggestions for improvement in future trading decisions
-          4. Any patterns or trends you notice in the market data
+          4. Any patterns or trends you notice in these trades
 
           Limit your response to 250 words or less.
           """
@@ -100,71 +131,163 @@ init_db()
 # Cal Alpaca file
 trader = alpaca.CryptoTrader()
 
-def ai_trading():
-  # 1. Bring data
-
-  # 30 days data
-  df_daily = trader.last_thirty_days()
-  df_daily = helper.add_indicators(df_daily)
-
-  # 24 hours data
-  df_hourly = trader.last_24_hours()
-  df_hourly = helper.add_indicators(df_hourly)
-
-  # Current Balance
-  balances = trader.cash_crypto_balance()
-
-  # Orderbook
-  orderbook = trader.order_book()
-
-  # Fear and Greed Index
-  fear_greed_index = helper.get_fear_and_greed_index()
-
-  # News Headline
-  headlines = helper.get_bitcoin_news()
-
+# Streaming market data: MARKET_STREAM=alpaca for the websocket, or the path
+# of a recorded message file to replay; MARKET_STREAM_RECORD saves the feed
+if os.getenv("MARKET_STREAM"):
+  source = os.getenv("MARKET_STREAM")
+  trader.start_stream(replay=None if source == "alpaca" else source, record_path=os.getenv("MARKET_STREAM_RECORD"))
+
+# Per-source timeouts (seconds) for the gathering stage
+SOURCE_TIMEOUTS = {
+  "daily": 30,
+  "hourly": 30,
+  "balances": 15,
+  "orderbook": 15,
+  "fear_greed_index": 15,
+  "headlines": 20,
+  "chart_image": 20,
+  "recent_trades": 10,
+  "reflection": 90,
+}
+
+# Hourly candles shown in the chart image
+CHART_HOURS = 120
+
+def load_recent_trades(symbol=trade_store.DEFAULT_SYMBOL, account=trade_store.DEFAULT_ACCOUNT):
+  return get_recent_trades(get_db_connection(), symbol=symbol, account=account)
+
+def load_transcript():
   # Youtube Transcript
   # transcript = helper.youtub_transcript("J-7tPXNz30A") : Error Occured with Library
 
   f = open("strategy.txt", "r", encoding="utf-8")
   transcript = f.read()
   f.close()
-
-
-  # Chart Image
-  chart_image = helper.main()
-
-  conn = get_db_connection()
-
-  recent_trades = get_recent_trades(conn)
-
-  current_market_data = {
-    "fear_greed_index" : fear_greed_index,
-    "news_headlines" : headlines,
-    "orderbook" : orderbook,
-    "daily_ohlcv": df_daily.to_dict(),
-    "hourly_ohlcv": df_hourly.to_dict(),
-  }
-  # Reflection
-  reflection = generate_reflection(recent_trades, current_market_data)
+  return transcript
+
+def indicator_state(symbol, timeframe, account=trade_store.DEFAULT_ACCOUNT):
+  # Engine state file per symbol, account and timeframe (BTC/USD on the
+  # default account keeps the original names)
+  if symbol == trade_store.DEFAULT_SYMBOL and not account:
+    return f"indicators_{timeframe}.json"
+  target = symbol.replace('/', '_') + (f"_{account}" if account else "")
+  return f"indicators_{target}_{timeframe}.json"
+
+def gather_shared():
+  # Inputs that are the same for every symbol; runner.py fetches them once per cycle
+  with telemetry.span("stage_seconds", stage="gather_shared"), Gatherer() as gatherer:
+    gatherer.submit("fear_greed_index", helper.get_fear_and_greed_index, timeout=SOURCE_TIMEOUTS["fear_greed_index"])
+    gatherer.submit("headlines", helper.get_bitcoin_news, timeout=SOURCE_TIMEOUTS["headlines"], default=[])
+    return {
+      "fear_greed_index": gatherer.result("fear_greed_index"),
+      "headlines": gatherer.result("headlines"),
+      "transcript": load_transcript(),
+    }
+
+def gather_inputs(crypto_trader=None, shared=None):
+  # 1. Bring data: every independent source is fetched at the same time.
+  # crypto_trader picks the symbol and account (the module trader by default);
+  # shared is gather_shared() output when the caller already has it
+  crypto_trader = crypto_trader or trader
+  symbol, account = crypto_trader.symbol, crypto_trader.account
+  with telemetry.span("stage_seconds", stage="gather_inputs", symbol=symbol), Gatherer() as gatherer:
+    # 30 days data
+    gatherer.submit("daily", lambda: helper.add_indicators(crypto_trader.last_thirty_days(), state_path=indicator_state(symbol, "1D", account)),
+                    timeout=SOURCE_TIMEOUTS["daily"])
+    # 24 hours data
+    gatherer.submit("hourly", lambda: helper.add_indicators(crypto_trader.last_24_hours(), state_path=indicator_state(symbol, "1H", account)),
+                    timeout=SOURCE_TIMEOUTS["hourly"])
+    # Current Balance
+    gatherer.submit("balances", crypto_trader.cash_crypto_balance, timeout=SOURCE_TIMEOUTS["balances"], default=[])
+    # Orderbook features (spread, depth, imbalance, slippage)
+    gatherer.submit("orderbook", crypto_trader.book_features, timeout=SOURCE_TIMEOUTS["orderbook"], default={})
+    if shared is None:
+      # Fear and Greed Index
+      gatherer.submit("fear_greed_index", helper.get_fear_and_greed_index, timeout=SOURCE_TIMEOUTS["fear_greed_index"])
+      # News Headline
+      gatherer.submit("headlines", helper.get_bitcoin_news, timeout=SOURCE_TIMEOUTS["headlines"], default=[])
+    # Chart Image
+    gatherer.submit("chart_image", lambda: helper.main(helper.add_indicators(crypto_trader.last_n_hours(CHART_HOURS)), symbol=symbol, account=account),
+                    timeout=SOURCE_TIMEOUTS["chart_image"])
+    gatherer.submit("recent_trades", load_recent_trades, symbol, account, timeout=SOURCE_TIMEOUTS["recent_trades"], default=pd.DataFrame())
+
+    transcript = shared["transcript"] if shared is not None else load_transcript()
+
+    df_daily = gatherer.result("daily")
+    df_hourly = gatherer.result("hourly")
+    if df_daily is None or df_hourly is None:
+      logger.error("Market data unavailable, skipping this cycle")
+      return None
+
+    orderbook = gatherer.result("orderbook")
+    if shared is None:
+      fear_greed_index = gatherer.result("fear_greed_index")
+      headlines = gatherer.result("headlines")
+    else:
+      fear_greed_index, headlines = shared["fear_greed_index"], shared["headlines"]
+    recent_trades = gatherer.result("recent_trades")
+
+    # Reflection (runs while the chart is still being captured)
+    gatherer.submit("reflection", generate_reflection, recent_trades, symbol, account,
+                    timeout=SOURCE_TIMEOUTS["reflection"], default="")
+
+    market_block, market_tokens = prompt.build_market_block(df_daily, df_hourly, orderbook, fear_greed_index, headlines,
+                                                              symbol=symbol)
+    logger.info(f"Market data prompt: {market_tokens} tokens")
+
+    inputs = {
+      "trader": crypto_trader,
+      "symbol": symbol,
+      "account": account,
+      "df_daily": df_daily,
+      "df_hourly": df_hourly,
+      "balances": gatherer.result("balances"),
+      "orderbook": orderbook,
+      "fear_greed_index": fear_greed_index,
+      "headlines": headlines,
+      "market_block": market_block,
+      "transcript": transcript,
+      "chart_image": gatherer.result("chart_image"),
+      "reflection": gatherer.result("reflection"),
+    }
+    inputs["timings"] = dict(gatherer.timings)
+    logger.info(f"Gathering timings ({symbol}): " + ", ".join(f"{name}={seconds:.2f}s" for name, seconds in gatherer.timings.items()))
+    if gatherer.errors:
+      logger.warning(f"Sources unavailable this cycle: {gatherer.errors}")
+    return inputs
+
+# Name used for the asset in the decision prompt
+ASSET_NAMES = {"BTC/USD": "Bitcoin", "ETH/USD": "Ethereum"}
+
+def get_decision(inputs):
+  symbol = inputs.get("symbol", trade_store.DEFAULT_SYMBOL)
+  base = symbol.split("/")[0]
+  asset = ASSET_NAMES.get(symbol, base)
+  balances = inputs["balances"]
+  transcript = inputs["transcript"]
+  chart_image = inputs["chart_image"]
+  reflection = inputs["reflection"]
+  market_block = inputs["market_block"]
+  if not chart_image:
+    logger.warning("Decision: no chart image this cycle, asking without it")
 
   #2. Get decision from Chat GPT
-  client = OpenAI()
-  response = client.chat.completions.create(
+  response = chat_completion(
+    "decision",
     model="gpt-4o",
     messages=[
       {
         "role": "system",
-        "content": f"""You are an expert in Bitcoin investing. Analyze provided data and determine whether 
-                to buy, sell, or hold Bitcoin. Use the following indicators to guide your decision: 
+        "content": f"""You are an expert in {asset} investing. Analyze provided data and determine whether 
+                to buy, sell, or hold {asset}. Use the following indicators to guide your decision: 
                 
                 - Technical indicators and market data, focusing on both short-term and long-term trends.
-                - Recent news headlines and their potential impact on Bitcoin price.
+                - Recent news headlines and their potential impact on {asset} price.
                 - The Fear and Greed Index: This index gauges market sentiment, ranging from extreme fear to extreme greed.
                   A high "greed" score may indicate overbought conditions, whereas a high "fear" score may suggest oversold
-                  conditions, potentially affecting Bitcoin's price movements.
+                  conditions, potentially affecting {asset}'s price movements.
                 - Overall market sentiment as a reflection of trading volume, volatility, and order book data.
-                - Patterns and trends visible in the BTC/USDT chart image.
+                - Patterns and trends visible in the {base}/USDT chart image.
                 - Recent trading performance and reflection
 
                 Recent trading reflection:
@@ -176,8 +299,8 @@ def ai_trading():
                 {transcript}
                 Response format:
                 1. A decision ("buy", "sell", or "hold").
-                2. If the decision is "buy", provide a percentage (1-100) of available USD to use for buying Bitcoin.
-                   If the decision is "sell," provide a percentage (1-100) of held BTC to sell.
+                2. If the decision is "buy", provide a percentage (1-100) of available USD to use for buying {asset}.
+                   If the decision is "sell," provide a percentage (1-100) of held {base} to sell.
                    If the decision is "hold," set the percentage to 0.
                 3. A reason for your decision, integrating relevant data and analysis as described.
 
@@ -187,14 +310,10 @@ def ai_trading():
       },
       {
         "role": "user",
-        "content": f"""Current investment status: {json.dumps(balances)}
-                Orderbook: {json.dumps(orderbook)}
-                Daily OHLCV with indicators (30 days): {df_daily.to_json()}
-                Hourly OHLCV with indicators (24 hours): {df_hourly.to_json()}
-                Recent news headlines: {json.dumps(headlines)}
-                Fear and Greed Index: {json.dumps(fear_greed_index)}
-                """
+        "content": f"""Current investment status: {prompt.encode_json(balances)}
+{market_block}"""
       },
+    ] + ([
       {
         "role": "user",
         "content": "Chart image included below:",
@@ -202,7 +321,7 @@ def ai_trading():
             "url": f"data:image/png;base64,{chart_image}"
         }
       }
-    ],
+    ] if chart_image else []),
     response_format={
             "type": "json_schema",
             "json_schema": {
@@ -222,59 +341,119 @@ def ai_trading():
         },
         max_tokens=4095
   )
-  result = TradingDecision.model_validate_json(response.choices[0].message.content)
-
+  return TradingDecision.model_validate_json(response.choices[0].message.content)
 
+def execute_decision(result, crypto_trader=None):
   # 3. Based on AI's decision do actual buy/sell/hold
+  # Returns the execution report (None if nothing was sent); the engine has
+  # already waited for every child order to reach a final status
+  crypto_trader = crypto_trader or trader
 
   print(f"### AI Decision: {result.decision.upper()} ###")
   print(f"## Reason: {result.reason} ##")
 
-  order_executed = False
+  report = None
 
   if result.decision == "sell":
-    print(f"### Sell Order Executed: {result.percentage}% of held BTC")
-    if trader.sell_market_order(result.percentage) != "BTC less than $1 or no positions found":
-       order_executed = True
+    print(f"### Sell Order: {result.percentage}% of held {crypto_trader.symbol.split('/')[0]}")
+    report = crypto_trader.sell_market_order(result.percentage)
 
   elif result.decision == "buy":
-    print(f"### Buy Order Executed: {result.percentage}% of available USD")
-    if trader.buy_market_order(result.percentage) != "Insufficient balance to place a buy order.":
-        order_executed = True
+    print(f"### Buy Order: {result.percentage}% of available USD")
+    report = crypto_trader.buy_market_order(result.percentage)
 
   elif result.decision == "hold":
     print("### Hold Order Executed ###")
     print("Hold Reason:", result.reason)
-    order_executed = True
 
-  time.sleep(1)
-  balances = trader.cash_crypto_balance()
-  usd_balance = float(balances[0]['cash'])  # Assuming first entry is USD
-  btc_balance = float(balances[1]['qty'])   # Assuming second entry is BTC
-  btc_avg_buy_price = float(balances[1]['avg_entry_price'])
-  btc_usd_price = float(balances[1]['current_price'])
+  return report
 
+def pre_trade_position(result, crypto_trader=None):
+  # Position right before the orders go out, so reconcile() compares against
+  # the account as it is now rather than at prefetch; None if unreadable
+  if result.decision not in ("buy", "sell"):
+    return None
+  crypto_trader = crypto_trader or trader
   try:
-    conn = get_db_connection()
-    log_trade(conn, result.decision, result.percentage if order_executed else 0, result.reason, 
-                btc_balance,  usd_balance, btc_avg_buy_price, btc_usd_price, reflection)
+    return crypto_trader.account_snapshot()["btc_balance"]
+  except Exception as e:
+    logger.warning(f"Could not read the position before the trade: {e}")
+    return None
+
+def fill_record(report):
+  if not report:
+    return None
+  # Nothing filled: the last child's status says why the execution stopped
+  last_status = report["statuses"][-1] if report["statuses"] else "none"
+  return {
+      "order_status": "filled" if report["complete"] else ("partial" if report["filled_qty"] else last_status),
+      "filled_qty": report["filled_qty"],
+      "filled_avg_price": report["avg_price"],
+      "fees": report["fees"],
+      "order_ids": ",".join(report["order_ids"]),
+  }
+
+def record_trade(result, report, inputs, before=None):
+  # Fills are final once execute_decision returns; re-read the account until
+  # the position reflects them, then log decision, fills and balances together.
+  # before: pre_trade_position(); None skips the wait for the position
+  reflection = inputs["reflection"]
+  crypto_trader = inputs.get("trader") or trader
+  order_executed = result.decision == "hold" or bool(report and report["filled_qty"] > 0)
+
+  try:
+    balances = OrderTracker(crypto_trader).reconcile(expected_position(before, report))
+  except Exception as e:
+    logger.error(f"Could not read balances after the trade: {e}")
+    return
+
+  try:
+    log_trade(get_db_connection(), result.decision, result.percentage if order_executed else 0, result.reason,
+                balances["btc_balance"], balances["usd_balance"], balances["btc_avg_buy_price"],
+                balances["btc_usd_price"], reflection, fill=fill_record(report), symbol=crypto_trader.symbol,
+                account=crypto_trader.account)
   except sqlite3.Error as db_error:
     print(f"Database error: {db_error}")
-  finally:
-    conn.close()
-  
-# def job():
-#   try:
-#     ai_trading()
-#   except Exception as e:
-#     logger.error(f"An Error occrued: {e}")
-  
-#   schedule.every().day.at("9:00").do(job) 
-#   schedule.every().day.at("15:00").do(job) 
-#   schedule.every().day.at("21:00").do(job) 
-
-# while True:
-#   schedule.run_pending()
-#   time.sleep(1)
-
-ai_trading()
+
+def precompute_reflection(inputs):
+  # Reflect on the trade just logged now, so the next cycle finds it cached
+  symbol = inputs.get("symbol", trade_store.DEFAULT_SYMBOL)
+  account = inputs.get("account", trade_store.DEFAULT_ACCOUNT)
+  try:
+    generate_reflection(load_recent_trades(symbol, account), symbol, account)
+  except Exception as e:
+    logger.error(f"Reflection precompute failed: {e}")
+
+def run_cycle(inputs):
+  # Everything after gathering; scheduler.py calls this at the decision time
+  symbol = inputs.get("symbol", trade_store.DEFAULT_SYMBOL)
+  with telemetry.span("stage_seconds", stage="get_decision", symbol=symbol):
+    result = get_decision(inputs)
+  with telemetry.span("stage_seconds", stage="execute_decision", symbol=symbol):
+    before = pre_trade_position(result, inputs.get("trader"))
+    report = execute_decision(result, inputs.get("trader"))
+  with telemetry.span("stage_seconds", stage="record_trade", symbol=symbol):
+    record_trade(result, report, inputs, before)
+  with telemetry.span("stage_seconds", stage="precompute_reflection", symbol=symbol):
+    precompute_reflection(inputs)
+
+  http_session.log_latency(logger)
+
+def ai_trading():
+  with telemetry.cycle():
+    inputs = gather_inputs()
+    if inputs is None:
+      return
+    run_cycle(inputs)
+
+# Scheduled runs (09:00, 15:00 and 21:00 by default): python scheduler.py
+# Several symbols or accounts per cycle: python runner.py --symbols BTC/USD,ETH/USD
+
+if __name__ == "__main__":
+  import argparse
+  parser = argparse.ArgumentParser(description="Run one ai_trading cycle")
+  parser.add_argument("--profile", metavar="DIR", help="write a profile of the cycle to DIR")
+  parser.add_argument("--profiler", choices=["sample", "cprofile"], default="sample")
+  args = parser.parse_args()
+  telemetry.configure(profile_dir=args.profile, profiler=args.profiler)
+  ai_trading()
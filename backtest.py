@@ -0,0 +1,208 @@
+import sys
+import json
+import time
+import argparse
+import logging
+
+import numpy as np
+import pandas as pd
+
+import helper
+import trade_store
+
+logger = logging.getLogger(__name__)
+
+# Backtesting
+# ------------------------
+# Replays historical bars through helper.add_indicators and a decision policy,
+# fills orders the way CryptoTrader.buy_market_order / sell_market_order size
+# them, and writes one row per decision into a trade store with the same
+# schema ai_trading logs to, so the store's performance rollups and
+# streamlit_app.py can read the result unchanged. Each decision fills in full
+# at the bar close: live, the execution engine works it in child orders
+# rather than clipping it to one.
+
+MIN_ORDER_USD = 1
+FEE_RATE = 0.0025          # Alpaca crypto taker fee
+WARMUP_BARS = 33           # MACD signal needs 26 + 9 - 1 bars
+
+TRADE_COLUMNS = trade_store.TRADE_COLUMNS
+
+# Policies
+# ------------------------
+# A policy either decides for all bars at once (decide_all, NumPy over the
+# indicator columns) or is asked bar by bar (decide), like the GPT call.
+
+class RuleBasedPolicy:
+
+    def __init__(self, percentage=30, rsi_low=30, rsi_high=70):
+        self.percentage = percentage
+        self.rsi_low = rsi_low
+        self.rsi_high = rsi_high
+
+    def decide_all(self, df):
+        close = df['c'].to_numpy(dtype=np.float64)
+        rsi = df['rsi'].to_numpy(dtype=np.float64)
+        lower = df['bb_bbl'].to_numpy(dtype=np.float64)
+        upper = df['bb_bbh'].to_numpy(dtype=np.float64)
+
+        buy = (rsi < self.rsi_low) & (close < lower)
+        sell = (rsi > self.rsi_high) & (close > upper)
+
+        decisions = np.where(buy, "buy", np.where(sell, "sell", "hold"))
+        percentages = np.where(buy | sell, self.percentage, 0)
+        reasons = np.where(buy, "RSI oversold below lower Bollinger Band",
+                           np.where(sell, "RSI overbought above upper Bollinger Band", "No signal"))
+        return decisions, percentages, reasons
+
+class LLMStubPolicy:
+    # Offline stand-in for the GPT decision call. The responder gets the
+    # indicator frame and the bar index and returns the same JSON the model
+    # would ({"decision", "percentage", "reason"}); the default always holds.
+
+    def __init__(self, responder=None):
+        self.responder = responder or (lambda df, i: {"decision": "hold", "percentage": 0, "reason": "stub"})
+
+    def decide(self, df, i):
+        response = self.responder(df, i)
+        if isinstance(response, str):
+            response = json.loads(response)
+        return response["decision"], int(response["percentage"]), response["reason"]
+
+POLICIES = {
+    "rule": RuleBasedPolicy,
+    "stub": LLMStubPolicy,
+}
+
+# Simulation
+# ------------------------
+
+def _timestamps(df):
+    if 't' not in df:
+        return np.array([str(i) for i in range(len(df))])
+    times = df['t'].to_numpy()
+    if not np.issubdtype(times.dtype, np.datetime64):
+        times = pd.to_datetime(df['t'], utc=True).dt.tz_localize(None).to_numpy()
+    return np.datetime_as_string(times, unit='s')
+
+def _decisions(policy, df, index):
+    if hasattr(policy, "decide_all"):
+        decisions, percentages, reasons = policy.decide_all(df)
+        return (np.asarray(decisions)[index], np.asarray(percentages, dtype=np.int64)[index],
+                np.asarray(reasons, dtype=object)[index])
+
+    decisions = np.empty(len(index), dtype=object)
+    percentages = np.zeros(len(index), dtype=np.int64)
+    reasons = np.empty(len(index), dtype=object)
+    for k, i in enumerate(index):
+        decisions[k], percentages[k], reasons[k] = policy.decide(df, i)
+    return decisions, percentages, reasons
+
+def simulate(df, policy, initial_usd=10000.0, initial_btc=0.0, fee_rate=FEE_RATE, every=1, warmup=WARMUP_BARS):
+    index = np.arange(min(warmup, len(df)), len(df), every)
+    prices = df['c'].to_numpy(dtype=np.float64)[index]
+    decisions, percentages, reasons = _decisions(policy, df, index)
+
+    # Holds do not move the balances, so only the buy/sell bars are walked;
+    # every other row takes the state of the last fill before it.
+    events = np.flatnonzero((decisions != "hold") & (percentages > 0))
+    event_usd = np.empty(len(events))
+    event_btc = np.empty(len(events))
+    event_avg = np.empty(len(events))
+    executed = np.zeros(len(index), dtype=bool)
+
+    usd, btc, avg_price = float(initial_usd), float(initial_btc), 0.0
+    for k, row in enumerate(events):
+        price = prices[row]
+        percentage = percentages[row]
+        if decisions[row] == "buy":
+            # buy_market_order sizes on portfolio value, limited here to the cash held
+            balance = usd + btc * price
+            if balance > MIN_ORDER_USD:
+                notional = min(balance * (percentage / 100), usd)
+                if notional > 0:
+                    qty = notional * (1 - fee_rate) / price
+                    avg_price = (avg_price * btc + price * qty) / (btc + qty)
+                    btc += qty
+                    usd -= notional
+                    executed[row] = True
+        elif decisions[row] == "sell":
+            if btc * price > MIN_ORDER_USD:
+                qty = btc * (percentage / 100)
+                usd += qty * price * (1 - fee_rate)
+                btc -= qty
+                if btc <= 1e-12:
+                    btc, avg_price = 0.0, 0.0
+                executed[row] = True
+        event_usd[k], event_btc[k], event_avg[k] = usd, btc, avg_price
+
+    last_event = np.searchsorted(events, np.arange(len(index)), side='right') - 1
+    has_event = last_event >= 0
+    safe = np.where(has_event, last_event, 0)
+    usd_balance = np.where(has_event, event_usd[safe] if len(events) else 0.0, initial_usd)
+    btc_balance = np.where(has_event, event_btc[safe] if len(events) else 0.0, initial_btc)
+    avg_buy_price = np.where(has_event, event_avg[safe] if len(events) else 0.0, 0.0)
+
+    # Same convention as ai_trading: percentage is 0 when no order went through
+    return pd.DataFrame({
+        'timestamp': _timestamps(df)[index],
+        'decision': decisions,
+        'percentage': np.where(executed, percentages, 0),
+        'reason': reasons,
+        'btc_balance': btc_balance,
+        'usd_balance': usd_balance,
+        'btc_avg_buy_price': avg_buy_price,
+        'btc_usd_price': prices,
+        'reflection': "",
+    }, columns=TRADE_COLUMNS)
+
+def run_backtest(bars, policy, **kwargs):
+    df = helper.add_indicators(bars)
+    return simulate(df, policy, **kwargs)
+
+def write_trades(trades, path, replace=True, symbol=trade_store.DEFAULT_SYMBOL):
+    store = trade_store.get_store(path)
+    with store.batch():
+        if replace:
+            store.clear_trades()
+        store.log_trades(trades[TRADE_COLUMNS].itertuples(index=False, name=None), symbol=symbol)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Backtest a trading policy over stored Alpaca bars")
+    parser.add_argument("--symbol", default="BTC/USD")
+    parser.add_argument("--timeframe", default="1H")
+    parser.add_argument("--start", required=True, help="e.g. 2022-01-01T00:00:00Z")
+    parser.add_argument("--end", required=True)
+    parser.add_argument("--policy", choices=sorted(POLICIES), default="rule")
+    parser.add_argument("--every", type=int, default=1, help="decide every N bars")
+    parser.add_argument("--initial-usd", type=float, default=10000.0)
+    parser.add_argument("--fee", type=float, default=FEE_RATE)
+    parser.add_argument("--db", default="backtest_trades.db")
+    parser.add_argument("--offline", action="store_true", help="use the local bar store only")
+    args = parser.parse_args(argv)
+
+    if args.offline:
+        from bar_store import BarStore
+        bars = BarStore().read(args.symbol, args.timeframe, start=args.start, end=args.end)
+    else:
+        import alpaca
+        bars = alpaca.CryptoTrader().data_history(symbol=args.symbol, time=args.timeframe, start=args.start, end=args.end)
+    if not len(bars):
+        print("No bars found for this range.")
+        return 1
+
+    started = time.perf_counter()
+    trades = run_backtest(bars, POLICIES[args.policy](), initial_usd=args.initial_usd,
+                          fee_rate=args.fee, every=args.every)
+    elapsed = time.perf_counter() - started
+    write_trades(trades, args.db, symbol=args.symbol)
+
+    performance = trade_store.get_store(args.db).performance(symbol=args.symbol)
+    fills = int((trades['percentage'] > 0).sum())
+    print(f"{len(bars)} bars, {len(trades)} decisions, {fills} fills in {elapsed:.2f}s")
+    print(f"Performance: {performance['return_pct']:.2f}%, realized PnL {performance['realized_pnl']:.2f} USD"
+          f"  ->  {args.db}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,94 @@
+import os
+import sqlite3
+import threading
+
+from bars import Bars
+
+# Local OHLCV bar store
+# ------------------------
+# Bars are kept per (symbol, timeframe) together with the time range that has
+# already been fetched from Alpaca, so data_history only has to ask the API
+# for bars newer than the last stored one.
+
+class BarStore:
+
+  def __init__(self, path=None):
+    self.path = path or os.getenv("BAR_STORE_PATH", "bars.db")
+    self.lock = threading.Lock()
+    self.conn = sqlite3.connect(self.path, check_same_thread=False)
+    self.conn.execute("PRAGMA journal_mode=WAL")
+    self.conn.execute("PRAGMA synchronous=NORMAL")
+    self.conn.execute('''CREATE TABLE IF NOT EXISTS bars
+    (symbol TEXT NOT NULL,
+     timeframe TEXT NOT NULL,
+     t TEXT NOT NULL,
+     o REAL, h REAL, l REAL, c REAL, v REAL,
+     PRIMARY KEY (symbol, timeframe, t)) WITHOUT ROWID''')
+    self.conn.execute('''CREATE TABLE IF NOT EXISTS coverage
+    (symbol TEXT NOT NULL,
+     timeframe TEXT NOT NULL,
+     start TEXT NOT NULL,
+     end TEXT NOT NULL,
+     PRIMARY KEY (symbol, timeframe))''')
+    self.conn.commit()
+
+  def coverage(self, symbol, timeframe):
+    with self.lock:
+      row = self.conn.execute(
+          "SELECT start, end FROM coverage WHERE symbol = ? AND timeframe = ?",
+          (symbol, timeframe)).fetchone()
+    return row if row else (None, None)
+
+  def last_timestamp(self, symbol, timeframe):
+    with self.lock:
+      row = self.conn.execute(
+          "SELECT MAX(t) FROM bars WHERE symbol = ? AND timeframe = ?",
+          (symbol, timeframe)).fetchone()
+    return row[0]
+
+  def fetch_start(self, symbol, timeframe, start):
+    # Where the next API request has to begin so that [start, now] is covered.
+    # The last stored bar is requested again because it may have been partial.
+    covered_start, covered_end = self.coverage(symbol, timeframe)
+    if covered_start is None or start < covered_start or start > covered_end:
+      return start
+    last_t = self.last_timestamp(symbol, timeframe)
+    if last_t is None or last_t < start:
+      return covered_end
+    return last_t
+
+  def merge(self, symbol, timeframe, bars, start, end):
+    rows = zip([symbol] * len(bars), [timeframe] * len(bars), bars.timestamps(),
+               bars.o.tolist(), bars.h.tolist(), bars.l.tolist(), bars.c.tolist(), bars.v.tolist())
+    with self.lock:
+      self.conn.executemany(
+          "INSERT OR REPLACE INTO bars (symbol, timeframe, t, o, h, l, c, v) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+          rows)
+      row = self.conn.execute(
+          "SELECT start, end FROM coverage WHERE symbol = ? AND timeframe = ?",
+          (symbol, timeframe)).fetchone()
+      if row and start <= row[1] and end >= row[0]:
+        # Overlapping or contiguous with what we already have: extend it
+        start, end = min(start, row[0]), max(end, row[1])
+      self.conn.execute(
+          "INSERT OR REPLACE INTO coverage (symbol, timeframe, start, end) VALUES (?, ?, ?, ?)",
+          (symbol, timeframe, start, end))
+      self.conn.commit()
+
+  def read(self, symbol, timeframe, start=None, end=None):
+    query = "SELECT t, o, h, l, c, v FROM bars WHERE symbol = ? AND timeframe = ?"
+    params = [symbol, timeframe]
+    if start is not None:
+      query += " AND t >= ?"
+      params.append(start)
+    if end is not None:
+      query += " AND t <= ?"
+      params.append(end)
+    query += " ORDER BY t ASC"
+    with self.lock:
+      rows = self.conn.execute(query, params).fetchall()
+    return Bars.from_rows(rows)
+
+  def close(self):
+    with self.lock:
+      self.conn.close()
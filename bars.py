@@ -0,0 +1,91 @@
+import json
+
+import numpy as np
+import pandas as pd
+
+# Columnar OHLCV bars
+# ------------------------
+# One NumPy array per field, handed from alpaca.py to helper.py as is.
+# t is UTC, stored as datetime64[s]; prices and volume are float64.
+
+COLUMNS = ('t', 'o', 'h', 'l', 'c', 'v')
+TIME_FORMAT = '%Y-%m-%dT%H:%M:%SZ'
+
+def parse_times(values):
+    # Alpaca timestamps look like 2024-01-01T00:00:00Z; numpy rejects the Z
+    return np.array([value[:-1] if value.endswith('Z') else value for value in values],
+                    dtype='datetime64[s]')
+
+def format_times(values):
+    return [value + 'Z' for value in np.datetime_as_string(values, unit='s')]
+
+class Bars:
+    __slots__ = COLUMNS
+
+    def __init__(self, t=(), o=(), h=(), l=(), c=(), v=()):
+        self.t = np.asarray(t, dtype='datetime64[s]')
+        self.o = np.asarray(o, dtype=np.float64)
+        self.h = np.asarray(h, dtype=np.float64)
+        self.l = np.asarray(l, dtype=np.float64)
+        self.c = np.asarray(c, dtype=np.float64)
+        self.v = np.asarray(v, dtype=np.float64)
+
+    @classmethod
+    def from_records(cls, records):
+        # Records as returned by the Alpaca bars endpoint ({'t', 'o', 'h', 'l', 'c', 'v', ...})
+        n = len(records)
+        return cls(
+            t=parse_times([record['t'] for record in records]),
+            o=np.fromiter((record['o'] for record in records), dtype=np.float64, count=n),
+            h=np.fromiter((record['h'] for record in records), dtype=np.float64, count=n),
+            l=np.fromiter((record['l'] for record in records), dtype=np.float64, count=n),
+            c=np.fromiter((record['c'] for record in records), dtype=np.float64, count=n),
+            v=np.fromiter((record['v'] for record in records), dtype=np.float64, count=n),
+        )
+
+    @classmethod
+    def from_rows(cls, rows):
+        # (t, o, h, l, c, v) tuples, e.g. straight from a SQLite cursor
+        if not rows:
+            return cls()
+        t, o, h, l, c, v = zip(*rows)
+        return cls(t=parse_times(t), o=o, h=h, l=l, c=c, v=v)
+
+    @classmethod
+    def concat(cls, parts):
+        parts = [part for part in parts if len(part)]
+        if not parts:
+            return cls()
+        return cls(**{name: np.concatenate([getattr(part, name) for part in parts]) for name in COLUMNS})
+
+    def __len__(self):
+        return len(self.t)
+
+    def __getitem__(self, index):
+        # Slices are views, no data is copied
+        return Bars(**{name: getattr(self, name)[index] for name in COLUMNS})
+
+    def __repr__(self):
+        if not len(self):
+            return "Bars(0)"
+        return "Bars({n}, {start} .. {end})".format(n=len(self), start=self.t[0], end=self.t[-1])
+
+    @property
+    def nbytes(self):
+        return sum(getattr(self, name).nbytes for name in COLUMNS)
+
+    def timestamps(self):
+        return format_times(self.t)
+
+    def to_frame(self):
+        return pd.DataFrame({name: getattr(self, name) for name in COLUMNS}, copy=False)
+
+    def to_records(self):
+        return [
+            {'t': t, 'o': o, 'h': h, 'l': l, 'c': c, 'v': v}
+            for t, o, h, l, c, v in zip(self.timestamps(), self.o.tolist(), self.h.tolist(),
+                                        self.l.tolist(), self.c.tolist(), self.v.tolist())
+        ]
+
+    def to_json(self):
+        return json.dumps(self.to_records())
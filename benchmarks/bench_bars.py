@@ -0,0 +1,76 @@
+import os
+import sys
+import json
+import time
+import argparse
+import tracemalloc
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+from bars import Bars
+
+# Bar hand-off benchmark
+# ------------------------
+# Old path: list of dicts -> json.dumps(indent=4) -> json.loads -> DataFrame
+# New path: Bars (NumPy columns) -> DataFrame
+# Both start from the same parsed Alpaca response.
+
+def synthetic_response(n, seed=0):
+    rng = np.random.default_rng(seed)
+    close = 60000 + np.cumsum(rng.normal(0, 50, n))
+    start = datetime(2020, 1, 1)
+    return [
+        {
+            "c": float(c), "h": float(c + 25), "l": float(c - 25), "n": 10, "o": float(c - 5),
+            "t": (start + timedelta(minutes=i)).strftime('%Y-%m-%dT%H:%M:%SZ'),
+            "v": 1.5, "vw": float(c)
+        }
+        for i, c in enumerate(close)
+    ]
+
+def old_handoff(raw):
+    keys_to_keep = ['c', 'h', 'l', 'o', 't', 'v']
+    filtered_bars = [{key: bar[key] for key in keys_to_keep} for bar in raw]
+    text = json.dumps(filtered_bars, indent=4)
+    return pd.DataFrame(json.loads(text))
+
+def new_handoff(raw):
+    return Bars.from_records(raw).to_frame()
+
+def measure(fn, raw, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(raw)
+        times.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    result = fn(raw)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return min(times), peak, result
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the alpaca -> helper bar hand-off")
+    parser.add_argument("--bars", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    raw = synthetic_response(args.bars)
+
+    old_time, old_peak, old_df = measure(old_handoff, raw, args.repeat)
+    new_time, new_peak, new_df = measure(new_handoff, raw, args.repeat)
+
+    assert np.allclose(old_df['c'].to_numpy(), new_df['c'].to_numpy())
+
+    print(f"{args.bars} bars, best of {args.repeat}")
+    print(f"{'path':<28}{'time (ms)':>12}{'peak (MB)':>12}")
+    print(f"{'json list-of-dicts':<28}{old_time * 1000:>12.1f}{old_peak / 1e6:>12.1f}")
+    print(f"{'Bars (NumPy columns)':<28}{new_time * 1000:>12.1f}{new_peak / 1e6:>12.1f}")
+    print(f"speedup {old_time / new_time:.1f}x, peak memory {old_peak / new_peak:.1f}x lower")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+import os
+import sys
+import json
+import time
+import shutil
+import logging
+import argparse
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import numpy as np
+import standin_server
+
+# End-to-end cycle benchmark
+# ------------------------
+# Runs ai_trading() against the local stand-in server and reports p50/p99
+# latency for the whole cycle, each stage and each gathered source.
+
+STAGES = ["gather_inputs", "get_decision", "execute_decision", "record_trade", "precompute_reflection"]
+
+def percentile(values, q):
+    return float(np.percentile(values, q)) * 1000 if values else float("nan")
+
+def report(samples):
+    print(f"{'stage':<32}{'n':>5}{'p50 (ms)':>12}{'p99 (ms)':>12}{'max (ms)':>12}")
+    for name, values in samples.items():
+        print(f"{name:<32}{len(values):>5}{percentile(values, 50):>12.1f}{percentile(values, 99):>12.1f}"
+              f"{max(values) * 1000 if values else float('nan'):>12.1f}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time ai_trading() cycles against the local stand-in server")
+    parser.add_argument("--cycles", type=int, default=20)
+    parser.add_argument("--warmup", type=int, default=1, help="cycles run before measuring")
+    parser.add_argument("--latency", action="append", help="as in standin_server.py, e.g. 0.02 or chat=1.0")
+    parser.add_argument("--jitter", type=float, default=0.2)
+    parser.add_argument("--json", help="also write the raw samples to this file")
+    args = parser.parse_args(argv)
+
+    latency = standin_server.parse_latency(args.latency or ["0.02", "chat=0.8", "news=0.3"])
+    server = standin_server.start(latency=latency, jitter=args.jitter)
+    os.environ.update(standin_server.environment(server))
+
+    # Databases, bar store and indicator state go to a scratch directory
+    workdir = tempfile.mkdtemp(prefix="bench_cycle_")
+    strategy = os.path.join(ROOT, "strategy.txt")
+    if os.path.exists(strategy):
+        shutil.copy(strategy, workdir)
+    else:
+        open(os.path.join(workdir, "strategy.txt"), "w").close()
+    os.chdir(workdir)
+
+    logging.disable(logging.INFO)
+    import autotrade
+
+    samples = {"cycle": []}
+    current = {}
+
+    def timed(name, fn):
+        def wrapper(*a, **kw):
+            start = time.perf_counter()
+            try:
+                return fn(*a, **kw)
+            finally:
+                current[name] = time.perf_counter() - start
+        return wrapper
+
+    for stage in STAGES:
+        setattr(autotrade, stage, timed(stage, getattr(autotrade, stage)))
+        samples[stage] = []
+
+    gather_inputs = autotrade.gather_inputs
+
+    def gather_with_sources():
+        inputs = gather_inputs()
+        for source, seconds in (inputs or {}).get("timings", {}).items():
+            current["source:" + source] = seconds
+        return inputs
+    autotrade.gather_inputs = gather_with_sources
+
+    for cycle in range(args.warmup + args.cycles):
+        current.clear()
+        start = time.perf_counter()
+        autotrade.ai_trading()
+        elapsed = time.perf_counter() - start
+        if cycle < args.warmup:
+            continue
+        samples["cycle"].append(elapsed)
+        for name, seconds in current.items():
+            samples.setdefault(name, []).append(seconds)
+
+    print(f"{args.cycles} cycles (+{args.warmup} warm-up), stand-in latency {latency}")
+    report(samples)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(samples, f)
+
+    server.shutdown()
+    shutil.rmtree(workdir, ignore_errors=True)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
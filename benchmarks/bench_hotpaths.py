@@ -0,0 +1,213 @@
+import os
+import sys
+import gc
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import subprocess
+import tracemalloc
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import numpy as np
+import trade_store
+from bars import Bars
+
+# Hot-path micro-benchmarks
+# ------------------------
+# Synthetic bars and trades, no network or services. For every path and size
+# it records best wall time, tracemalloc peak, and memory/blocks still held
+# afterwards, and appends the numbers (tagged with the git commit) to
+# benchmarks/results.jsonl so runs on different commits can be compared.
+
+RESULTS = os.path.join(ROOT, "benchmarks", "results.jsonl")
+DEFAULT_SIZES = [10**3, 10**4, 10**5]
+
+# Synthetic data
+# ------------------------
+
+def make_bars(n, seed=0):
+    rng = np.random.default_rng(seed)
+    close = 60000 * np.exp(np.cumsum(rng.normal(0, 0.002, n)))
+    open_ = np.concatenate([[close[0]], close[:-1]])
+    spread = np.abs(rng.normal(0, 20, n))
+    return Bars(
+        t=np.datetime64('2000-01-01T00:00:00', 's') + np.arange(n) * np.timedelta64(60, 's'),
+        o=open_, h=np.maximum(open_, close) + spread, l=np.minimum(open_, close) - spread,
+        c=close, v=rng.random(n) * 5,
+    )
+
+def make_trades_db(path, n, days=30, seed=0, chunk=100_000):
+    # n trade rows spread evenly over the last `days` days, newest last
+    rng = np.random.default_rng(seed)
+    store = trade_store.TradeStore(path)
+    now = datetime.now()
+    step = timedelta(days=days) / n
+    decisions = np.array(["buy", "sell", "hold"])
+    for offset in range(0, n, chunk):
+        size = min(chunk, n - offset)
+        rows = []
+        picks = rng.integers(0, 3, size)
+        prices = 60000 + rng.normal(0, 1000, size)
+        for i in range(size):
+            k = offset + i
+            rows.append((
+                (now - step * (n - k)).isoformat(), decisions[picks[i]], int(picks[i] != 2) * 20,
+                "synthetic reason", 0.5 + i % 7 * 0.01, 10000.0 + i % 13, 58000.0, float(prices[i]),
+                "synthetic reflection",
+            ))
+        store.log_trades(rows)
+    store.close()
+
+# Measurement
+# ------------------------
+
+def measure(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+        del result
+
+    gc.collect()
+    tracemalloc.start()
+    result = fn()
+    current, peak = tracemalloc.get_traced_memory()
+    blocks = sum(stat.count for stat in tracemalloc.take_snapshot().statistics("filename"))
+    tracemalloc.stop()
+    del result
+    return {
+        "seconds": min(times),
+        "peak_mb": peak / 1e6,
+        "retained_mb": current / 1e6,
+        "retained_blocks": blocks,
+    }
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, text=True).strip()
+    except Exception:
+        return None
+
+def bench_add_indicators(size, workdir, repeat):
+    import helper
+
+    bars = make_bars(size)
+    return measure(lambda: helper.add_indicators(bars), repeat)
+
+def bench_get_recent_trades(size, workdir, repeat):
+    import autotrade
+
+    store = trade_store.get_store(trades_db(size, workdir))
+    return measure(lambda: autotrade.get_recent_trades(store), repeat)
+
+def bench_calculate_performance(size, workdir, repeat):
+    import autotrade
+
+    trades_df = autotrade.get_recent_trades(trade_store.get_store(trades_db(size, workdir)), days=3650)
+    return measure(lambda: autotrade.calculate_performance(trades_df), repeat)
+
+def bench_performance(size, workdir, repeat):
+    store = trade_store.get_store(trades_db(size, workdir))
+    return measure(lambda: store.recent_performance(7), repeat)
+
+def bench_analytics(size, workdir, repeat):
+    import analytics
+
+    portfolio = analytics.load(trade_store.connect_readonly(trades_db(size, workdir)))
+    return measure(lambda: (analytics.summary(portfolio), analytics.rolling(portfolio, 168)), repeat)
+
+def bench_load_data(size, workdir, repeat):
+    import streamlit_app
+
+    # load_data opens bitcoin_trades.db in the working directory
+    directory = os.path.join(workdir, f"load_data_{size}")
+    os.makedirs(directory, exist_ok=True)
+    shutil.copy(trades_db(size, workdir), os.path.join(directory, "bitcoin_trades.db"))
+    cwd = os.getcwd()
+    os.chdir(directory)
+    try:
+        return measure(streamlit_app.load_data, repeat)
+    finally:
+        os.chdir(cwd)
+
+_trade_dbs = {}
+
+def trades_db(size, workdir):
+    if size not in _trade_dbs:
+        path = os.path.join(workdir, f"trades_{size}.db")
+        make_trades_db(path, size)
+        _trade_dbs[size] = path
+    return _trade_dbs[size]
+
+BENCHMARKS = {
+    "helper.add_indicators": bench_add_indicators,
+    "autotrade.get_recent_trades": bench_get_recent_trades,
+    "autotrade.calculate_performance": bench_calculate_performance,
+    "trade_store.performance": bench_performance,
+    "analytics.summary+rolling": bench_analytics,
+    "streamlit_app.load_data": bench_load_data,
+}
+
+def load_previous(commit):
+    # Latest stored result per (path, size) from a different commit
+    previous = {}
+    if not os.path.exists(RESULTS):
+        return previous
+    with open(RESULTS) as f:
+        for line in f:
+            record = json.loads(line)
+            if record.get("commit") != commit:
+                previous[(record["path"], record["size"])] = record
+    return previous
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Micro-benchmarks for the data hot paths")
+    parser.add_argument("--sizes", type=lambda s: [int(float(x)) for x in s.split(",")],
+                        default=DEFAULT_SIZES, help="comma separated, e.g. 1e3,1e4,1e5,1e6,1e7")
+    parser.add_argument("--paths", type=lambda s: s.split(","), default=list(BENCHMARKS),
+                        help="subset of: " + ", ".join(BENCHMARKS))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--no-save", action="store_true", help="do not append to results.jsonl")
+    args = parser.parse_args(argv)
+
+    commit = git_commit()
+    previous = load_previous(commit)
+    workdir = tempfile.mkdtemp(prefix="bench_hotpaths_")
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    records = []
+    try:
+        print(f"{'path':<34}{'size':>10}{'time (ms)':>12}{'peak (MB)':>11}{'kept (MB)':>11}{'blocks':>10}{'vs prev':>9}")
+        for path in args.paths:
+            for size in args.sizes:
+                result = BENCHMARKS[path](size, workdir, args.repeat)
+                record = {
+                    "path": path, "size": size, "commit": commit,
+                    "python": platform.python_version(), "date": datetime.now().isoformat(timespec="seconds"),
+                    **result,
+                }
+                records.append(record)
+                before = previous.get((path, size))
+                change = f"{result['seconds'] / before['seconds']:.2f}x" if before else "-"
+                print(f"{path:<34}{size:>10}{result['seconds'] * 1000:>12.1f}{result['peak_mb']:>11.1f}"
+                      f"{result['retained_mb']:>11.1f}{result['retained_blocks']:>10}{change:>9}")
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if not args.no_save:
+        with open(RESULTS, "a") as f:
+            for record in records:
+                f.write(json.dumps(record) + "\n")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,135 @@
+import io
+import base64
+import math
+
+import numpy as np
+import pandas as pd
+from PIL import Image, ImageDraw, ImageFont
+
+# Chart renderer
+# ------------------------
+# Draws the candlestick chart (with Bollinger Bands and volume) straight from
+# the DataFrame add_indicators returns, instead of screenshotting Upbit.
+
+WIDTH = 1280
+HEIGHT = 720
+
+BACKGROUND = (255, 255, 255)
+GRID = (235, 235, 235)
+TEXT = (60, 60, 60)
+UP = (200, 35, 50)       # Upbit colours: red up, blue down
+DOWN = (20, 90, 200)
+BAND = (255, 140, 0)
+MIDDLE = (140, 60, 200)
+
+MARGIN_LEFT = 10
+MARGIN_RIGHT = 90
+MARGIN_TOP = 40
+MARGIN_BOTTOM = 30
+VOLUME_SHARE = 0.2
+
+def _column(df, name):
+    if name not in df:
+        return np.full(len(df), np.nan)
+    return df[name].to_numpy(dtype=np.float64)
+
+def _time_labels(df):
+    if 't' not in df:
+        return [str(i) for i in range(len(df))]
+    times = pd.to_datetime(df['t'], utc=True)
+    return [time.strftime('%m-%d %H:%M') for time in times]
+
+def _polyline(draw, xs, ys, to_y, fill):
+    # Break the line at NaN (indicator warm-up)
+    points = []
+    for x, y in zip(xs, ys):
+        if math.isnan(y):
+            if len(points) > 1:
+                draw.line(points, fill=fill, width=2)
+            points = []
+            continue
+        points.append((x, to_y(y)))
+    if len(points) > 1:
+        draw.line(points, fill=fill, width=2)
+
+def render_chart(df, title="BTC/USD 1H", width=WIDTH, height=HEIGHT):
+    image = Image.new("RGB", (width, height), BACKGROUND)
+    draw = ImageDraw.Draw(image)
+    font = ImageFont.load_default()
+
+    draw.text((MARGIN_LEFT, 12), title, fill=TEXT, font=font)
+    if df is None or len(df) == 0:
+        draw.text((width // 2 - 40, height // 2), "No data", fill=TEXT, font=font)
+        return image
+
+    o, h, l, c, v = (_column(df, name) for name in ('o', 'h', 'l', 'c', 'v'))
+    upper, middle, lower = (_column(df, name) for name in ('bb_bbh', 'bb_bbm', 'bb_bbl'))
+
+    plot_width = width - MARGIN_LEFT - MARGIN_RIGHT
+    plot_height = height - MARGIN_TOP - MARGIN_BOTTOM
+    price_height = plot_height * (1 - VOLUME_SHARE) - 10
+    volume_top = MARGIN_TOP + price_height + 10
+    volume_height = plot_height * VOLUME_SHARE
+
+    price_low = np.nanmin(np.concatenate([l, lower]))
+    price_high = np.nanmax(np.concatenate([h, upper]))
+    if price_high == price_low:
+        price_high += 1
+        price_low -= 1
+    padding = (price_high - price_low) * 0.05
+    price_low -= padding
+    price_high += padding
+    volume_high = np.nanmax(v) if np.any(v > 0) else 1.0
+
+    def price_y(price):
+        return MARGIN_TOP + (price_high - price) / (price_high - price_low) * price_height
+
+    def volume_y(volume):
+        return volume_top + volume_height - volume / volume_high * volume_height
+
+    n = len(df)
+    step = plot_width / n
+    body = max(1.0, step * 0.7)
+    xs = [MARGIN_LEFT + step * (i + 0.5) for i in range(n)]
+
+    # Grid and price axis
+    for i in range(6):
+        price = price_low + (price_high - price_low) * i / 5
+        y = price_y(price)
+        draw.line([(MARGIN_LEFT, y), (width - MARGIN_RIGHT, y)], fill=GRID)
+        draw.text((width - MARGIN_RIGHT + 6, y - 6), f"{price:,.0f}", fill=TEXT, font=font)
+
+    labels = _time_labels(df)
+    label_every = max(1, n // 8)
+    for i in range(0, n, label_every):
+        draw.line([(xs[i], MARGIN_TOP), (xs[i], volume_top + volume_height)], fill=GRID)
+        draw.text((max(MARGIN_LEFT, xs[i] - 30), height - MARGIN_BOTTOM + 8), labels[i], fill=TEXT, font=font)
+
+    # Bollinger Bands behind the candles
+    _polyline(draw, xs, upper, price_y, BAND)
+    _polyline(draw, xs, lower, price_y, BAND)
+    _polyline(draw, xs, middle, price_y, MIDDLE)
+
+    # Candles and volume
+    for x, open_, high, low, close, volume in zip(xs, o, h, l, c, v):
+        if math.isnan(close):
+            continue
+        colour = UP if close >= open_ else DOWN
+        draw.line([(x, price_y(high)), (x, price_y(low))], fill=colour)
+        top, bottom = price_y(max(open_, close)), price_y(min(open_, close))
+        draw.rectangle([x - body / 2, top, x + body / 2, max(bottom, top + 1)], fill=colour)
+        if not math.isnan(volume):
+            draw.rectangle([x - body / 2, volume_y(volume), x + body / 2, volume_top + volume_height], fill=colour)
+
+    draw.text((width - MARGIN_RIGHT + 6, price_y(c[-1]) - 6), f"{c[-1]:,.0f}", fill=UP if c[-1] >= o[-1] else DOWN, font=font)
+    return image
+
+def render_chart_base64(df, title="BTC/USD 1H", filename=None):
+    image = render_chart(df, title=title)
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG", optimize=False)
+    data = buffer.getvalue()
+    if filename:
+        with open(filename, "wb") as f:
+            f.write(data)
+    return base64.b64encode(data).decode('utf-8')
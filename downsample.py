@@ -0,0 +1,41 @@
+import numpy as np
+
+# Downsampling
+# ------------------------
+# Largest-Triangle-Three-Buckets: keeps the first and last point and, for every
+# bucket in between, the point that spans the largest triangle with the point
+# kept before it and the mean of the next bucket. Peaks and dips survive, which
+# a plain stride would drop.
+
+def lttb_indices(x, y, threshold):
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    kept = np.empty(threshold, dtype=np.int64)
+    kept[0], kept[-1] = 0, n - 1
+
+    a = 0
+    for i in range(threshold - 2):
+        lo, hi = edges[i], edges[i + 1]
+        if i + 2 < len(edges):
+            nxt = slice(edges[i + 1], edges[i + 2])
+            cx, cy = x[nxt].mean(), y[nxt].mean()
+        else:
+            cx, cy = x[-1], y[-1]
+        area = np.abs((x[a] - cx) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (cy - y[a]))
+        a = lo + int(np.nanargmax(area)) if np.isfinite(area).any() else lo
+        kept[i + 1] = a
+    return kept
+
+def lttb(df, x, y, threshold):
+    # Rows of df picked by LTTB on columns x (datetimes or numbers) and y
+    if len(df) <= threshold:
+        return df
+    xs = df[x]
+    if np.issubdtype(xs.dtype, np.datetime64):
+        xs = xs.astype('int64')
+    return df.iloc[lttb_indices(xs.to_numpy(), df[y].to_numpy(), threshold)]
@@ -0,0 +1,124 @@
+import os
+import math
+import time
+import logging
+
+from orderbook import DEPTH_BPS
+from order_tracker import OrderTracker, fill_summary
+
+logger = logging.getLogger(__name__)
+
+# Sliced execution
+# ------------------------
+# Works a whole buy/sell decision as a series of IOC market child orders
+# instead of one order clipped at 200,000 USD.
+#   twap          - slice count fixed up front, children spread evenly over `duration`
+#   participation - each child takes at most `participation` of the depth within
+#                   `depth_bps` of mid, re-read from the book before every child
+#   iceberg       - children of at most `iceberg_usd`, one after another
+# Every strategy also respects the per-order cap. Fills are read back for each
+# child (order_tracker.OrderTracker) and the result is reported against the
+# mid at arrival.
+
+MAX_ORDER_USD = 200000
+MIN_ORDER_USD = 1
+
+STRATEGY = os.getenv("EXECUTION_STRATEGY", "twap")
+DURATION = float(os.getenv("EXECUTION_DURATION", "60"))             # twap horizon, seconds
+PARTICIPATION = float(os.getenv("EXECUTION_PARTICIPATION", "0.25"))  # share of near-touch depth per child
+ICEBERG_USD = float(os.getenv("EXECUTION_ICEBERG_USD", "25000"))
+PAUSE = float(os.getenv("EXECUTION_PAUSE", "1"))                     # between participation/iceberg children
+MAX_FAILURES = 3
+
+class ExecutionEngine:
+
+    def __init__(self, trader, strategy=STRATEGY, duration=DURATION, participation=PARTICIPATION,
+                 depth_bps=DEPTH_BPS[-1], iceberg_usd=ICEBERG_USD, pause=PAUSE, sleep=time.sleep, tracker=None):
+        self.trader = trader
+        self.tracker = tracker or OrderTracker(trader)
+        self.strategy = strategy
+        self.duration = duration
+        self.participation = participation
+        self.depth_bps = depth_bps
+        self.iceberg_usd = iceberg_usd
+        self.pause = pause
+        self.sleep = sleep
+
+    def child_cap(self, side, features):
+        # Largest child in USD right now
+        cap = MAX_ORDER_USD
+        if self.strategy == "iceberg":
+            return min(cap, self.iceberg_usd)
+        depth = features.get(f"depth_{self.depth_bps}bps_{'ask' if side == 'buy' else 'bid'}", 0.0)
+        if depth and features.get("mid"):
+            cap = min(cap, max(self.participation * depth * features["mid"], MIN_ORDER_USD))
+        return cap
+
+    def execute(self, side, qty=None, notional=None):
+        # Sells are sized in BTC (qty), buys in USD (notional)
+        started = time.monotonic()
+        features = self.trader.book_features() or {}
+        arrival = features.get("mid") or self.trader.price_estimate(side)
+        if not arrival:
+            logger.error("Execution: no price available, nothing sent")
+            return None
+        in_usd = notional is not None
+        total = notional if in_usd else qty
+        remaining = total
+        usd = (lambda amount: amount) if in_usd else (lambda amount: amount * (features.get("mid") or arrival))
+
+        slices = max(1, math.ceil(usd(total) / self.child_cap(side, features)))
+        interval = self.duration / slices if self.strategy == "twap" and slices > 1 else self.pause
+        children = []
+        failures = 0
+
+        while usd(remaining) > MIN_ORDER_USD and failures < MAX_FAILURES:
+            cap = self.child_cap(side, features)
+            if self.strategy == "twap":
+                left = max(1, slices - len(children))
+                size = min(remaining / left, cap if in_usd else cap / (features.get("mid") or arrival))
+            else:
+                size = min(remaining, cap if in_usd else cap / (features.get("mid") or arrival))
+
+            fill = self.send(side, size, in_usd)
+            children.append(fill)
+            done = fill["notional"] if in_usd else fill["qty"]
+            if done <= 0:
+                failures += 1
+            remaining = max(0.0, remaining - done)
+
+            if usd(remaining) > MIN_ORDER_USD and failures < MAX_FAILURES:
+                self.sleep(interval)
+                features = self.trader.book_features() or features
+
+        filled_qty = sum(child["qty"] for child in children)
+        filled_notional = sum(child["notional"] for child in children)
+        # Reported fees only; None if any filled child came back without one
+        fees = None if any(child["fee"] is None for child in children) else sum(child["fee"] for child in children)
+        avg_price = filled_notional / filled_qty if filled_qty else None
+        slippage = None
+        if avg_price:
+            slippage = (avg_price / arrival - 1) * 1e4 if side == "buy" else (1 - avg_price / arrival) * 1e4
+        report = {
+            "side": side, "strategy": self.strategy, "requested": total, "unit": "USD" if in_usd else "BTC",
+            "filled_qty": filled_qty, "filled_notional": filled_notional, "avg_price": avg_price, "fees": fees,
+            "fee_estimate": sum(child["fee_estimate"] for child in children),
+            "arrival_mid": arrival, "slippage_bps": slippage, "children": len(children),
+            "order_ids": [child["id"] for child in children if child["id"]],
+            "statuses": [child["status"] for child in children],
+            "seconds": time.monotonic() - started, "complete": usd(remaining) <= MIN_ORDER_USD,
+        }
+        logger.info(f"Execution {side} {self.strategy}: {len(children)} orders, filled {filled_qty:.6f} BTC"
+                    + (f" at {avg_price:.2f}, {slippage:+.1f} bps vs arrival mid {arrival:.2f}" if avg_price else ""))
+        return report
+
+    def send(self, side, size, in_usd):
+        # One child order; returns its fill (qty BTC, notional USD, fee USD)
+        try:
+            order = self.trader.submit_order(side, notional=size) if in_usd else self.trader.submit_order(side, qty=size)
+            order = self.tracker.wait(order)
+        except Exception as e:
+            logger.error(f"Execution: child order failed: {e}")
+            return {"id": None, "status": "error", "qty": 0.0, "avg_price": None, "notional": 0.0, "fee": 0.0,
+                    "fee_estimate": 0.0}
+        return fill_summary(order)
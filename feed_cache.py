@@ -0,0 +1,138 @@
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+from http_session import get_session
+
+logger = logging.getLogger(__name__)
+
+# Feed cache
+# ------------------------
+# TTL cache for slow-changing external feeds (Fear & Greed, news headlines),
+# kept in memory and in a small SQLite file so restarts start warm.
+#   fresh  (age < ttl)         - served from the cache, no request
+#   stale  (age < stale)       - served from the cache at once, refreshed in the background
+#   older, or nothing cached   - fetched, but callers wait at most `wait` seconds;
+#                                after that they get the old value (or None) and
+#                                the fetch finishes in the background
+# Refreshes send If-None-Match / If-Modified-Since when the server gave an
+# ETag or Last-Modified, and a 304 only extends the entry. Failed fetches keep
+# the old value and are not retried for RETRY_AFTER seconds.
+
+CACHE_PATH = os.getenv("FEED_CACHE_PATH", "feed_cache.db")
+WAIT = float(os.getenv("FEED_WAIT", "2"))
+RETRY_AFTER = 60
+
+class FeedCache:
+
+    def __init__(self, path=CACHE_PATH, session=None, workers=2):
+        self.path = path
+        self.session = session or get_session()
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute('''CREATE TABLE IF NOT EXISTS feeds
+        (key TEXT PRIMARY KEY,
+         value TEXT,
+         fetched_at REAL,
+         expires_at REAL,
+         etag TEXT,
+         last_modified TEXT)''')
+        self.conn.commit()
+        self.entries = {}
+        for key, value, fetched_at, expires_at, etag, last_modified in self.conn.execute("SELECT * FROM feeds"):
+            self.entries[key] = {"value": json.loads(value), "fetched_at": fetched_at, "expires_at": expires_at,
+                                 "etag": etag, "last_modified": last_modified}
+        self.pending = {}
+        self.failed = {}
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="feed-cache")
+
+    def get(self, key, url, parse, params=None, ttl=3600, stale=86400, wait=WAIT):
+        # parse(json) -> value; ttl is seconds or ttl(value) -> seconds
+        now = time.time()
+        with self.lock:
+            entry = self.entries.get(key)
+        if entry is not None and now < entry["expires_at"]:
+            return entry["value"]
+        future = self._refresh(key, url, parse, params, ttl)
+        if entry is not None and now - entry["fetched_at"] < stale:
+            return entry["value"]
+        if future is None:
+            return entry["value"] if entry is not None else None
+        try:
+            return future.result(timeout=wait)
+        except TimeoutError:
+            logger.warning(f"Feed {key}: no answer within {wait}s" + (", serving the cached value" if entry else ""))
+        except Exception:
+            pass
+        return entry["value"] if entry is not None else None
+
+    def _refresh(self, key, url, parse, params, ttl):
+        # One fetch per key at a time; None while backing off after a failure
+        with self.lock:
+            future = self.pending.get(key)
+            if future is not None:
+                return future
+            if time.time() < self.failed.get(key, 0):
+                return None
+            future = self.pending[key] = self.executor.submit(self._fetch, key, url, parse, params, ttl)
+        return future
+
+    def _fetch(self, key, url, parse, params, ttl):
+        with self.lock:
+            entry = self.entries.get(key)
+        headers = {}
+        if entry is not None and entry["etag"]:
+            headers["If-None-Match"] = entry["etag"]
+        if entry is not None and entry["last_modified"]:
+            headers["If-Modified-Since"] = entry["last_modified"]
+        try:
+            response = self.session.get(url, params=params, headers=headers)
+            now = time.time()
+            if response.status_code == 304 and entry is not None:
+                value = entry["value"]
+                entry = dict(entry, fetched_at=now, expires_at=now + (ttl(value) if callable(ttl) else ttl))
+            else:
+                response.raise_for_status()
+                value = parse(response.json())
+                entry = {"value": value, "fetched_at": now, "expires_at": now + (ttl(value) if callable(ttl) else ttl),
+                         "etag": response.headers.get("ETag"), "last_modified": response.headers.get("Last-Modified")}
+            self._store(key, entry)
+            return value
+        except Exception as e:
+            logger.error(f"Feed {key} refresh failed: {e}")
+            with self.lock:
+                self.failed[key] = time.time() + RETRY_AFTER
+            raise
+        finally:
+            with self.lock:
+                self.pending.pop(key, None)
+
+    def _store(self, key, entry):
+        with self.lock:
+            self.entries[key] = entry
+            self.failed.pop(key, None)
+            self.conn.execute("INSERT OR REPLACE INTO feeds VALUES (?, ?, ?, ?, ?, ?)",
+                              (key, json.dumps(entry["value"]), entry["fetched_at"], entry["expires_at"],
+                               entry["etag"], entry["last_modified"]))
+            self.conn.commit()
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.conn.execute("DELETE FROM feeds")
+            self.conn.commit()
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_cache():
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = FeedCache()
+        return _cache
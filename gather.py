@@ -0,0 +1,61 @@
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+import telemetry
+
+logger = logging.getLogger(__name__)
+
+# Concurrent data gathering
+# ------------------------
+# Each source runs in its own worker thread with its own timeout. A source that
+# fails or times out gives back its default value instead of failing the cycle.
+
+class Gatherer:
+
+    def __init__(self, max_workers=10):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="gather")
+        self.tasks = {}
+        self.timings = {}
+        self.errors = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def submit(self, name, fn, *args, timeout=None, default=None, **kwargs):
+        def run():
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self.timings[name] = time.perf_counter() - start
+                telemetry.observe("source_seconds", self.timings[name], source=name)
+
+        future = self.executor.submit(run)
+        self.tasks[name] = (future, time.monotonic(), timeout, default)
+        return future
+
+    def result(self, name):
+        future, submitted, timeout, default = self.tasks[name]
+        remaining = None
+        if timeout is not None:
+            remaining = max(0.0, submitted + timeout - time.monotonic())
+        try:
+            return future.result(timeout=remaining)
+        except TimeoutError:
+            # The worker keeps running in the background, we just stop waiting for it
+            self.errors[name] = f"timed out after {timeout}s"
+            logger.warning(f"{name}: timed out after {timeout}s, using default")
+        except Exception as e:
+            self.errors[name] = repr(e)
+            logger.error(f"{name}: {e}")
+        return default
+
+    def results(self):
+        return {name: self.result(name) for name in self.tasks}
+
+    def close(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
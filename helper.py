@@ -1,9 +1,8 @@
 import os
 import json
-import ta
 from ta.utils import dropna
 import pandas as pd
-import requests
+import feed_cache
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
@@ -15,52 +14,75 @@ from youtube_transcript_api import YouTubeTranscriptApi
 import time
 import logging
 import base64
+import indicators
+import chart
+from bars import Bars
 
 # Indicators
-def add_indicators(df):
-  df = json.loads(df)
-  df = pd.DataFrame(df)
+def add_indicators(df, state_path=None):
+  if isinstance(df, Bars):
+    df = df.to_frame()
+  elif isinstance(df, str):
+    df = pd.DataFrame(json.loads(df))
 
-  df = dropna(df)
-
-  # BollingerBands
-  indicator_bb = ta.volatility.BollingerBands(close=df['c'], window=20, window_dev=2)
-  df['bb_bbm'] = indicator_bb.bollinger_mavg()
-  df['bb_bbh'] = indicator_bb.bollinger_hband()
-  df['bb_bbl'] = indicator_bb.bollinger_lband()
-
-  # RSI
-  df['rsi'] = ta.momentum.RSIIndicator(close=df['c'], window=14).rsi()
+  if state_path is None:
+    return indicators.compute(df)
 
-  # MACD
-  macd = ta.trend.MACD(close=df['c'])
-  df['macd'] = macd.macd()
-  df['macd_signal'] = macd.macd_signal()
-  df['macd_diff'] = macd.macd_diff()
-
-  # Trend (SMA/EMA)
-  df['sma_20'] = ta.trend.SMAIndicator(close=df['c'], window=20).sma_indicator()
-  df['ema_12'] = ta.trend.EMAIndicator(close=df['c'], window=12).ema_indicator()
-
-  return df
+  # Incremental: only bars newer than the saved engine state are processed
+  df = dropna(df)
+  if df.empty:
+    return df
+  engine = None
+  if os.path.exists(state_path):
+    engine = indicators.IndicatorEngine.load(state_path)
+    # A gap between the saved state and this window means the state is stale
+    if engine.last_t is None or engine.last_t < indicators.time_key(df['t'].iloc[0]):
+      engine = None
+  if engine is None:
+    engine = indicators.IndicatorEngine(history=max(len(df), 1000))
+  engine.update_many(df.to_dict('records'))
+  engine.save(state_path)
+  return engine.frame(since=indicators.time_key(df['t'].iloc[0]))
+
+# Sentiment feeds go through feed_cache: fresh values come from disk, stale
+# ones are served while a background refresh runs
+FNG_TTL = float(os.getenv("FNG_TTL", "3600"))       # also capped by the API's time_until_update
+FNG_STALE = float(os.getenv("FNG_STALE", "172800"))
+NEWS_TTL = float(os.getenv("NEWS_TTL", "1800"))     # one SerpAPI query per NEWS_TTL at most
+NEWS_STALE = float(os.getenv("NEWS_STALE", "86400"))
 
 # Fear and Greed Index
 
-def get_fear_and_greed_index():
-  url = "https://api.alternative.me/fng/"
-  response = requests.get(url)
-  if response.status_code == 200:
-    data = response.json()
-    return data['data'][0]
+def fng_ttl(index):
+  # The index updates once a day; refresh shortly after the next update
+  until_update = index.get("time_until_update") if index else None
+  if until_update:
+    return min(FNG_TTL, max(60.0, float(until_update) + 60))
+  return FNG_TTL
 
-  else:
-    print(f"failed to fetch Fear and Greed Index. Status code: {response.status_code}")
-    return None
+def get_fear_and_greed_index():
+  url = os.getenv("FNG_URL", "https://api.alternative.me/fng/")
+  index = feed_cache.get_cache().get("fear_greed_index", url, lambda data: data['data'][0],
+                                     ttl=fng_ttl, stale=FNG_STALE)
+  if index is None:
+    print("failed to fetch Fear and Greed Index.")
+  return index
 
 # BTC News
+def parse_headlines(data):
+    news_results = data.get("news_results", [])
+    headlines = []
+    for item in news_results:
+        headlines.append({
+            "title": item.get("title", ""),
+            "date": item.get("date", "")
+        })
+
+    return headlines[:5]  # Moved outside of the loop
+
 def get_bitcoin_news():
     serpapi_key = os.getenv("SERPAPI_API_KEY")
-    url = "https://serpapi.com/search.json"
+    url = os.getenv("SERPAPI_URL", "https://serpapi.com/search.json")
     params = {
         "engine": "google_news",
         # News info 
@@ -68,23 +90,12 @@ def get_bitcoin_news():
         "api_key": serpapi_key
     }
 
-    try:
-        response = requests.get(url, params=params)
-        response.raise_for_status()
-        data = response.json()
-
-        news_results = data.get("news_results", [])
-        headlines = []
-        for item in news_results:
-            headlines.append({
-                "title": item.get("title", ""),
-                "date": item.get("date", "")
-            })
-
-        return headlines[:5]  # Moved outside of the loop
-    except requests.RequestException as e:
-        print(f"Error fetching news: {e}")
+    headlines = feed_cache.get_cache().get(f"news:{params['q']}", url, parse_headlines, params=params,
+                                           ttl=NEWS_TTL, stale=NEWS_STALE)
+    if headlines is None:
+        print("Error fetching news.")
         return []
+    return headlines
     
 # BTC/USDT Chart Image
 # ------------------------
@@ -240,7 +251,18 @@ def capture_full_page_screenshot(driver, url, filename):
         logger.error(f"Error capturing screenshot: {e}")
         raise
     
-def main():
+def main(df=None, symbol="BTC/USD", account=""):
+    # Render the chart locally from add_indicators output; the Upbit screenshot
+    # is only used when no data is given or CHART_SOURCE=upbit (BTC only).
+    # One file per symbol and account, since the runner renders them in parallel
+    if df is None or (os.getenv("CHART_SOURCE") == "upbit" and symbol == "BTC/USD" and not account):
+        return capture_upbit_chart()
+    filename = "BTC_USDT_Chart.png" if symbol == "BTC/USD" else f"{symbol.replace('/', '_')}_Chart.png"
+    if account:
+        filename = filename.replace("_Chart.png", f"_{account}_Chart.png")
+    return chart.render_chart_base64(df, title=f"{symbol} 1H", filename=filename)
+
+def capture_upbit_chart():
     url = "https://upbit.com/full_chart?code=CRIX.UPBIT.USDT-BTC"
     filename = "BTC_USDT_Chart.png"
     driver = None
@@ -0,0 +1,126 @@
+import os
+import re
+import time
+import threading
+from collections import deque
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+import telemetry
+
+# Shared HTTP session
+# ------------------------
+# One pooled keep-alive session for Alpaca, alternative.me and SerpAPI, so
+# connections (and their TLS handshakes) are reused across calls and cycles.
+# GETs are retried with backoff on 429/5xx; order POSTs are never re-sent on
+# a bad status because they are not idempotent.
+
+CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "20"))
+RETRIES = int(os.getenv("HTTP_RETRIES", "3"))
+BACKOFF = float(os.getenv("HTTP_BACKOFF", "0.5"))
+POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "20"))
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+# Order ids and similar path segments are folded so they share one counter
+_ID_SEGMENT = re.compile(r"/[0-9a-fA-F]{8}-[0-9a-fA-F-]{27,}|/\d+(?=/|$)")
+
+def endpoint_name(method, url):
+    parts = urlsplit(url)
+    return f"{method.upper()} {parts.netloc}{_ID_SEGMENT.sub('/{id}', parts.path)}"
+
+class LatencyStats:
+
+    def __init__(self, samples=1000):
+        self.lock = threading.Lock()
+        self.samples = samples
+        self.endpoints = {}
+
+    def record(self, endpoint, seconds, status=None):
+        with self.lock:
+            stats = self.endpoints.get(endpoint)
+            if stats is None:
+                stats = {"count": 0, "errors": 0, "total": 0.0, "max": 0.0,
+                         "statuses": {}, "recent": deque(maxlen=self.samples)}
+                self.endpoints[endpoint] = stats
+            stats["count"] += 1
+            stats["total"] += seconds
+            stats["max"] = max(stats["max"], seconds)
+            stats["recent"].append(seconds)
+            if status is None or status >= 400:
+                stats["errors"] += 1
+            key = str(status) if status is not None else "error"
+            stats["statuses"][key] = stats["statuses"].get(key, 0) + 1
+
+    def summary(self):
+        with self.lock:
+            summary = {}
+            for endpoint, stats in self.endpoints.items():
+                recent = sorted(stats["recent"])
+                summary[endpoint] = {
+                    "count": stats["count"],
+                    "errors": stats["errors"],
+                    "avg_ms": stats["total"] / stats["count"] * 1000,
+                    "p50_ms": recent[len(recent) // 2] * 1000,
+                    "p99_ms": recent[min(len(recent) - 1, int(len(recent) * 0.99))] * 1000,
+                    "max_ms": stats["max"] * 1000,
+                    "statuses": dict(stats["statuses"]),
+                }
+            return summary
+
+    def reset(self):
+        with self.lock:
+            self.endpoints.clear()
+
+class Session(requests.Session):
+
+    def __init__(self, timeout=(CONNECT_TIMEOUT, READ_TIMEOUT), retries=RETRIES, backoff=BACKOFF, pool_size=POOL_SIZE):
+        super().__init__()
+        self.timeout = timeout
+        self.stats = LatencyStats()
+        retry = Retry(
+            total=retries,
+            backoff_factor=backoff,
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=frozenset({"GET", "HEAD", "DELETE"}),
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        self.mount("https://", adapter)
+        self.mount("http://", adapter)
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault("timeout", self.timeout)
+        status = None
+        start = time.perf_counter()
+        try:
+            response = super().request(method, url, **kwargs)
+            status = response.status_code
+            return response
+        finally:
+            seconds = time.perf_counter() - start
+            endpoint = endpoint_name(method, url)
+            self.stats.record(endpoint, seconds, status)
+            telemetry.observe("http_request_seconds", seconds, endpoint=endpoint, status=status or "error")
+
+_session = None
+_session_lock = threading.Lock()
+
+def get_session():
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = Session()
+        return _session
+
+def log_latency(logger):
+    for endpoint, stats in sorted(get_session().stats.summary().items()):
+        logger.info(
+            f"{endpoint}: n={stats['count']} errors={stats['errors']} "
+            f"avg={stats['avg_ms']:.0f}ms p50={stats['p50_ms']:.0f}ms p99={stats['p99_ms']:.0f}ms max={stats['max_ms']:.0f}ms"
+        )
@@ -0,0 +1,237 @@
+import json
+import math
+from collections import deque
+
+import numpy as np
+import pandas as pd
+from ta.utils import dropna
+
+# Streaming indicators
+# ------------------------
+# Same indicators (and warm-up periods) as the ta calls helper.add_indicators
+# used to make, updated in O(1) per bar:
+#   Bollinger Bands (20, 2), RSI (14), MACD (12, 26, 9), SMA 20, EMA 12
+
+BB_WINDOW = 20
+BB_DEV = 2
+RSI_WINDOW = 14
+MACD_FAST = 12
+MACD_SLOW = 26
+MACD_SIGNAL = 9
+SMA_WINDOW = 20
+EMA_WINDOW = 12
+
+INDICATOR_COLUMNS = [
+    'bb_bbm', 'bb_bbh', 'bb_bbl', 'rsi',
+    'macd', 'macd_signal', 'macd_diff',
+    'sma_20', 'ema_12'
+]
+
+NAN = float('nan')
+
+def time_key(t):
+    # Bar times are compared and saved as ISO strings, whatever type they came in as
+    if t is None or isinstance(t, str):
+        return t
+    return pd.Timestamp(t).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+def _ema_step(prev, value, alpha):
+    # pandas ewm(adjust=False): y0 = x0, yt = (1 - a) * yt-1 + a * xt
+    if prev is None:
+        return value
+    return prev + alpha * (value - prev)
+
+class IndicatorEngine:
+
+    def __init__(self, history=1000):
+        self.history = history
+        self.reset()
+
+    def reset(self):
+        self.count = 0
+        self.last_t = None
+        self.window = deque(maxlen=BB_WINDOW)
+        self.prev_close = None
+        self.avg_gain = None
+        self.avg_loss = None
+        self.ema_fast = None
+        self.ema_slow = None
+        self.ema_12 = None
+        self.signal = None
+        self.signal_count = 0
+        self.rows = deque(maxlen=self.history)
+        self._undo = None
+
+    # State
+    def _core_state(self):
+        return {
+            "count": self.count,
+            "last_t": self.last_t,
+            "window": list(self.window),
+            "prev_close": self.prev_close,
+            "avg_gain": self.avg_gain,
+            "avg_loss": self.avg_loss,
+            "ema_fast": self.ema_fast,
+            "ema_slow": self.ema_slow,
+            "ema_12": self.ema_12,
+            "signal": self.signal,
+            "signal_count": self.signal_count,
+        }
+
+    def _load_core_state(self, state):
+        self.count = state["count"]
+        self.last_t = state["last_t"]
+        self.window = deque(state["window"], maxlen=BB_WINDOW)
+        self.prev_close = state["prev_close"]
+        self.avg_gain = state["avg_gain"]
+        self.avg_loss = state["avg_loss"]
+        self.ema_fast = state["ema_fast"]
+        self.ema_slow = state["ema_slow"]
+        self.ema_12 = state["ema_12"]
+        self.signal = state["signal"]
+        self.signal_count = state["signal_count"]
+
+    def state(self):
+        state = self._core_state()
+        state["history"] = self.history
+        state["rows"] = list(self.rows)
+        state["undo"] = self._undo
+        return state
+
+    @classmethod
+    def from_state(cls, state):
+        engine = cls(history=state.get("history", 1000))
+        engine._load_core_state(state)
+        engine.rows = deque(state.get("rows", []), maxlen=engine.history)
+        engine._undo = state.get("undo")
+        return engine
+
+    def save(self, path):
+        # NaN is written as null so the file stays valid JSON
+        rows = [{k: (None if isinstance(v, float) and math.isnan(v) else v) for k, v in row.items()}
+                for row in self.rows]
+        state = self.state()
+        state["rows"] = rows
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "r", encoding="utf-8") as f:
+            state = json.load(f)
+        state["rows"] = [{k: (NAN if v is None else v) for k, v in row.items()} for row in state.get("rows", [])]
+        return cls.from_state(state)
+
+    # Updates
+    def update(self, bar):
+        t = time_key(bar.get('t'))
+        if t is not None and self.last_t is not None:
+            if t < self.last_t:
+                return None
+            if t == self.last_t:
+                # Same bar again (the still-forming bar): roll back and re-apply
+                if self._undo is None:
+                    return None
+                self._load_core_state(self._undo)
+                if self.rows:
+                    self.rows.pop()
+        self._undo = self._core_state()
+
+        close = float(bar['c'])
+        self.count += 1
+        self.last_t = t
+
+        # Rolling window for Bollinger Bands / SMA. The window is fixed at 20
+        # closes, so summing it directly is still constant work per bar and
+        # avoids the drift of a running sum of squares.
+        self.window.append(close)
+
+        if len(self.window) == BB_WINDOW:
+            mean = math.fsum(self.window) / BB_WINDOW
+            std = math.sqrt(math.fsum((x - mean) ** 2 for x in self.window) / BB_WINDOW)
+            bb_bbm, bb_bbh, bb_bbl = mean, mean + BB_DEV * std, mean - BB_DEV * std
+            sma_20 = mean
+        else:
+            bb_bbm = bb_bbh = bb_bbl = sma_20 = NAN
+
+        # RSI (Wilder smoothing as ewm(alpha=1/14, adjust=False)); like ta, the
+        # first bar counts as a zero gain / zero loss
+        diff = close - self.prev_close if self.prev_close is not None else 0.0
+        alpha = 1.0 / RSI_WINDOW
+        self.avg_gain = _ema_step(self.avg_gain, max(diff, 0.0), alpha)
+        self.avg_loss = _ema_step(self.avg_loss, max(-diff, 0.0), alpha)
+        rsi = NAN
+        if self.count >= RSI_WINDOW:
+            if self.avg_loss == 0:
+                rsi = 100.0
+            else:
+                rsi = 100 - 100 / (1 + self.avg_gain / self.avg_loss)
+        self.prev_close = close
+
+        # MACD / EMA
+        self.ema_fast = _ema_step(self.ema_fast, close, 2 / (MACD_FAST + 1))
+        self.ema_slow = _ema_step(self.ema_slow, close, 2 / (MACD_SLOW + 1))
+        self.ema_12 = _ema_step(self.ema_12, close, 2 / (EMA_WINDOW + 1))
+        ema_12 = self.ema_12 if self.count >= EMA_WINDOW else NAN
+
+        macd = macd_signal = macd_diff = NAN
+        if self.count >= MACD_SLOW:
+            macd = self.ema_fast - self.ema_slow
+            self.signal = _ema_step(self.signal, macd, 2 / (MACD_SIGNAL + 1))
+            self.signal_count += 1
+            if self.signal_count >= MACD_SIGNAL:
+                macd_signal = self.signal
+                macd_diff = macd - macd_signal
+
+        row = dict(bar)
+        row['t'] = t
+        row.update({
+            'bb_bbm': bb_bbm, 'bb_bbh': bb_bbh, 'bb_bbl': bb_bbl,
+            'rsi': rsi,
+            'macd': macd, 'macd_signal': macd_signal, 'macd_diff': macd_diff,
+            'sma_20': sma_20, 'ema_12': ema_12,
+        })
+        self.rows.append(row)
+        return row
+
+    def update_many(self, bars):
+        return [row for row in (self.update(bar) for bar in bars) if row is not None]
+
+    def frame(self, since=None):
+        rows = list(self.rows)
+        if since is not None:
+            rows = [row for row in rows if row.get('t') is not None and row['t'] >= since]
+        return pd.DataFrame(rows)
+
+# Batch mode: full recompute with pandas rolling/ewm, matches the ta output
+# and IndicatorEngine; the engine is only for incremental updates
+def compute(df):
+    df = dropna(df).copy()
+    close = df['c'].astype(np.float64)
+
+    rolling = close.rolling(BB_WINDOW, min_periods=BB_WINDOW)
+    mean = rolling.mean()
+    std = rolling.std(ddof=0)
+    df['bb_bbm'] = mean
+    df['bb_bbh'] = mean + BB_DEV * std
+    df['bb_bbl'] = mean - BB_DEV * std
+
+    # First bar counts as a zero gain / zero loss, as in ta and the engine
+    diff = close.diff().fillna(0.0)
+    gain = diff.clip(lower=0.0).ewm(alpha=1.0 / RSI_WINDOW, min_periods=RSI_WINDOW, adjust=False).mean()
+    loss = (-diff).clip(lower=0.0).ewm(alpha=1.0 / RSI_WINDOW, min_periods=RSI_WINDOW, adjust=False).mean()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        df['rsi'] = np.where(loss == 0, 100.0, 100 - 100 / (1 + gain / loss))
+    df.loc[loss.isna(), 'rsi'] = NAN
+
+    def ema(series, span):
+        return series.ewm(span=span, min_periods=span, adjust=False).mean()
+
+    macd = ema(close, MACD_FAST) - ema(close, MACD_SLOW)
+    signal = ema(macd, MACD_SIGNAL)
+    df['macd'] = macd
+    df['macd_signal'] = signal
+    df['macd_diff'] = macd - signal
+    df['sma_20'] = mean
+    df['ema_12'] = ema(close, EMA_WINDOW)
+    return df
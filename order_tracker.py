@@ -0,0 +1,101 @@
+import os
+import time
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Order tracking
+# ------------------------
+# Follows an order from the POST reply to a terminal status by polling
+# GET /v2/orders/{id} with exponential backoff. A push source (e.g. an Alpaca
+# trade_updates listener) can call update() to wake the waiter early. Once the
+# fill is known, reconcile() re-reads the account until the position shows it.
+
+TERMINAL = ("filled", "canceled", "expired", "rejected", "done_for_day")
+FEE_RATE = float(os.getenv("TAKER_FEE_RATE", "0.0025"))   # Alpaca crypto taker fee, for fee_estimate only
+
+def fill_summary(order):
+    # Filled qty, average price, notional and fee of an order JSON. fee is the
+    # commission the order reports (0 with nothing filled, None when a fill has
+    # none); fee_estimate falls back to notional * FEE_RATE and is never stored
+    qty = float(order.get("filled_qty") or 0)
+    price = float(order.get("filled_avg_price") or 0)
+    notional = qty * price
+    commission = order.get("commission")
+    if commission not in (None, ""):
+        fee = float(commission)
+    else:
+        fee = 0.0 if not qty else None
+    return {
+        "id": order.get("id"),
+        "status": order.get("status"),
+        "qty": qty,
+        "avg_price": price if qty else None,
+        "notional": notional,
+        "fee": fee,
+        "fee_estimate": fee if fee is not None else notional * FEE_RATE,
+    }
+
+def expected_position(before, report):
+    # Position the report's fills imply; None when the pre-trade position is
+    # unknown or nothing filled, so reconcile() takes the first snapshot
+    if before is None or not report or not report["filled_qty"]:
+        return None
+    return before + report["filled_qty"] if report["side"] == "buy" else before - report["filled_qty"]
+
+class OrderTracker:
+
+    def __init__(self, trader, initial_delay=0.05, max_delay=2.0, timeout=30.0):
+        self.trader = trader
+        self.initial_delay = initial_delay
+        self.max_delay = max_delay
+        self.timeout = timeout
+        self.orders = {}
+        self.changed = threading.Condition()
+
+    def update(self, order):
+        # Pushed status; wakes wait() for that order
+        with self.changed:
+            self.orders[order.get("id")] = order
+            self.changed.notify_all()
+
+    def wait(self, order, timeout=None):
+        # Order JSON once terminal, or the latest one seen at timeout
+        order_id = order.get("id")
+        if not order_id:
+            return order
+        deadline = time.monotonic() + (timeout or self.timeout)
+        delay = self.initial_delay
+        while order.get("status") not in TERMINAL:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                logger.warning(f"Order {order_id} still {order.get('status')} after {timeout or self.timeout}s")
+                break
+            with self.changed:
+                self.changed.wait_for(lambda: self.orders.get(order_id, {}).get("status") in TERMINAL,
+                                      min(delay, remaining))
+                pushed = self.orders.pop(order_id, None)
+            if pushed and pushed.get("status") in TERMINAL:
+                order = pushed
+                break
+            try:
+                order = self.trader.get_order(order_id)
+            except Exception as e:
+                logger.warning(f"Order {order_id} status check failed: {e}")
+            delay = min(delay * 2, self.max_delay)
+        return order
+
+    def reconcile(self, expected_btc=None, tolerance=1e-8, timeout=None):
+        # Account snapshot once the BTC position matches what the fills imply
+        deadline = time.monotonic() + (timeout or self.timeout)
+        delay = self.initial_delay
+        while True:
+            snapshot = self.trader.account_snapshot()
+            if expected_btc is None or abs(snapshot["btc_balance"] - expected_btc) <= max(tolerance, abs(expected_btc) * 1e-6):
+                return snapshot
+            if time.monotonic() + delay > deadline:
+                logger.warning(f"Position {snapshot['btc_balance']} BTC does not match the fills ({expected_btc} BTC)")
+                return snapshot
+            time.sleep(delay)
+            delay = min(delay * 2, self.max_delay)
@@ -0,0 +1,204 @@
+import numpy as np
+
+# L2 order book
+# ------------------------
+# Each side keeps its levels in preallocated sorted arrays (bids stored with
+# negated prices so both sides sort ascending, best level first). Updates
+# shift the arrays in place; cumulative size and notional are rebuilt lazily,
+# once per batch of updates, and every feature below is a searchsorted over
+# them. Prices and sizes are the Alpaca orderbook fields p and s.
+
+DEPTH_BPS = (10, 50)        # depth bands reported in features()
+FILL_NOTIONALS = (10000, 100000)   # USD order sizes for the VWAP-to-fill features, any symbol
+
+class BookSide:
+
+    def __init__(self, descending, capacity=2000):
+        self.sign = -1.0 if descending else 1.0
+        self.keys = np.empty(capacity)
+        self.sizes = np.empty(capacity)
+        self.n = 0
+        self._cumulative = None
+
+    def __len__(self):
+        return self.n
+
+    def clear(self):
+        self.n = 0
+        self._cumulative = None
+
+    def load(self, prices, sizes):
+        keys = np.asarray(prices, dtype=np.float64) * self.sign
+        sizes = np.asarray(sizes, dtype=np.float64)
+        order = np.argsort(keys, kind='stable')
+        keep = order[sizes[order] > 0][:len(self.keys)]
+        self.n = len(keep)
+        self.keys[:self.n] = keys[keep]
+        self.sizes[:self.n] = sizes[keep]
+        self._cumulative = None
+
+    def set(self, price, size):
+        # size 0 removes the level
+        key = price * self.sign
+        k = int(np.searchsorted(self.keys[:self.n], key))
+        exists = k < self.n and self.keys[k] == key
+        if exists and size > 0:
+            self.sizes[k] = size
+        elif exists:
+            self.keys[k:self.n - 1] = self.keys[k + 1:self.n]
+            self.sizes[k:self.n - 1] = self.sizes[k + 1:self.n]
+            self.n -= 1
+        elif size > 0:
+            if self.n == len(self.keys):
+                if k == self.n:
+                    return      # worse than every level we keep
+                self.n -= 1     # drop the worst level
+            self.keys[k + 1:self.n + 1] = self.keys[k:self.n]
+            self.sizes[k + 1:self.n + 1] = self.sizes[k:self.n]
+            self.keys[k], self.sizes[k] = key, size
+            self.n += 1
+        else:
+            return
+        self._cumulative = None
+
+    @property
+    def prices(self):
+        return self.keys[:self.n] * self.sign
+
+    def best(self):
+        return float(self.keys[0] * self.sign) if self.n else None
+
+    def cumulative(self):
+        # Running size and notional from the best level outwards
+        if self._cumulative is None:
+            sizes = self.sizes[:self.n]
+            self._cumulative = (np.cumsum(sizes), np.cumsum(sizes * self.prices))
+        return self._cumulative
+
+    def depth(self, limit):
+        # Size at prices no worse than limit
+        k = np.searchsorted(self.keys[:self.n], limit * self.sign, side='right')
+        return float(self.cumulative()[0][k - 1]) if k else 0.0
+
+    def vwap(self, qty=None, notional=None):
+        # Average price and size filled when taking qty base units (or notional USD)
+        # from this side; fills less than asked when the book runs out
+        if not self.n:
+            return None, 0.0
+        sizes, notionals = self.cumulative()
+        prices = self.prices
+        if notional is not None:
+            k = int(np.searchsorted(notionals, notional))
+            if k >= self.n:
+                return float(notionals[-1] / sizes[-1]), float(sizes[-1])
+            before_size = sizes[k - 1] if k else 0.0
+            before_notional = notionals[k - 1] if k else 0.0
+            filled = before_size + (notional - before_notional) / prices[k]
+            return float(notional / filled), float(filled)
+        k = int(np.searchsorted(sizes, qty))
+        if k >= self.n:
+            return float(notionals[-1] / sizes[-1]), float(sizes[-1])
+        before_size = sizes[k - 1] if k else 0.0
+        before_notional = notionals[k - 1] if k else 0.0
+        cost = before_notional + (qty - before_size) * prices[k]
+        return float(cost / qty), float(qty)
+
+    def levels(self, count):
+        return [{"p": float(p), "s": float(s)} for p, s in zip(self.prices[:count], self.sizes[:min(count, self.n)])]
+
+class OrderBook:
+
+    def __init__(self, symbol="BTC/USD", capacity=2000):
+        self.symbol = symbol
+        self.bids = BookSide(descending=True, capacity=capacity)
+        self.asks = BookSide(descending=False, capacity=capacity)
+        self.t = None
+
+    @classmethod
+    def from_response(cls, response, symbol="BTC/USD"):
+        # REST latest/orderbooks response ({"orderbooks": {symbol: {"a", "b", "t"}}})
+        book = cls(symbol)
+        data = (response or {}).get('orderbooks', {}).get(symbol)
+        if data:
+            book.apply({"r": True, **data})
+        return book
+
+    def apply(self, message):
+        # Snapshot when message["r"] is true, otherwise changed levels only
+        for side, levels in ((self.bids, message.get('b') or []), (self.asks, message.get('a') or [])):
+            if message.get('r'):
+                side.load([level['p'] for level in levels], [level['s'] for level in levels])
+            else:
+                for level in levels:
+                    side.set(float(level['p']), float(level['s']))
+        self.t = message.get('t', self.t)
+
+    def ready(self):
+        return bool(len(self.bids) and len(self.asks))
+
+    # Features
+    @property
+    def best_bid(self):
+        return self.bids.best()
+
+    @property
+    def best_ask(self):
+        return self.asks.best()
+
+    @property
+    def mid(self):
+        return (self.best_bid + self.best_ask) / 2 if self.ready() else None
+
+    @property
+    def spread(self):
+        return self.best_ask - self.best_bid if self.ready() else None
+
+    def spread_bps(self):
+        return self.spread / self.mid * 1e4 if self.ready() else None
+
+    def depth(self, bps):
+        # (bid size, ask size) within bps of mid
+        if not self.ready():
+            return 0.0, 0.0
+        mid = self.mid
+        return self.bids.depth(mid * (1 - bps / 1e4)), self.asks.depth(mid * (1 + bps / 1e4))
+
+    def imbalance(self, bps=10):
+        # +1 all bids, -1 all asks, within bps of mid
+        bid, ask = self.depth(bps)
+        return (bid - ask) / (bid + ask) if bid + ask else 0.0
+
+    def vwap(self, side, qty=None, notional=None):
+        # Expected average fill price of a market order; side is the order's side
+        book = self.asks if side == "buy" else self.bids
+        return book.vwap(qty=qty, notional=notional)
+
+    def price_estimate(self, side, qty=None, notional=None):
+        # VWAP to fill when a size is given, else the touch price
+        if qty is None and notional is None:
+            return self.best_ask if side == "buy" else self.best_bid
+        return self.vwap(side, qty=qty, notional=notional)[0]
+
+    def features(self, depth_bps=DEPTH_BPS, fill_notionals=FILL_NOTIONALS):
+        if not self.ready():
+            return {}
+        mid = self.mid
+        result = {'t': self.t, 'bid': self.best_bid, 'ask': self.best_ask, 'mid': mid,
+                  'spread': self.spread, 'spread_bps': self.spread_bps()}
+        for bps in depth_bps:
+            bid, ask = self.depth(bps)
+            result[f'depth_{bps}bps_bid'] = bid
+            result[f'depth_{bps}bps_ask'] = ask
+            result[f'imbalance_{bps}bps'] = (bid - ask) / (bid + ask) if bid + ask else 0.0
+        for notional in fill_notionals:
+            buy, bought = self.vwap("buy", notional=notional)
+            sell, sold = self.vwap("sell", notional=notional)
+            # Slippage against mid in bps; None if the book is too thin
+            full = lambda price, filled: price is not None and price * filled >= notional * (1 - 1e-9)
+            result[f'buy_{notional:g}usd_bps'] = (buy / mid - 1) * 1e4 if full(buy, bought) else None
+            result[f'sell_{notional:g}usd_bps'] = (1 - sell / mid) * 1e4 if full(sell, sold) else None
+        return result
+
+    def to_response(self, levels=20):
+        # Same shape as the REST latest/orderbooks response
+        return {"orderbooks": {self.symbol: {"t": self.t, "b": self.bids.levels(levels), "a": self.asks.levels(levels)}}}
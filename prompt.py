@@ -0,0 +1,193 @@
+import os
+import json
+import math
+import logging
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Prompt assembly
+# ------------------------
+# Bars, indicators, order book and trades go into the LLM calls as small
+# fixed-precision tables instead of DataFrame.to_json() dumps. The market block
+# is built once per cycle for the decision call (reflections are cached across
+# cycles and leave it out), and trimmed (oldest bars first) to stay inside
+# PROMPT_TOKEN_BUDGET.
+
+PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "6000"))
+
+BAR_COLUMNS = ['t', 'o', 'h', 'l', 'c', 'v', 'bb_bbm', 'bb_bbh', 'bb_bbl', 'rsi',
+               'macd', 'macd_signal', 'macd_diff', 'sma_20', 'ema_12']
+
+# Digits after the decimal point per column
+PRECISION = {'v': 3, 'rsi': 1, 'percentage': 0, 'btc_balance': 6, 'usd_balance': 2}
+
+# Price columns keep PRICE_SIGNIFICANT digits of the table's largest price
+# instead (0 decimals for BTC, 1 for ETH, 5 for a 0.5 USD coin); differences
+# of prices get one decimal more
+PRICE_COLUMNS = ('o', 'h', 'l', 'c', 'bb_bbm', 'bb_bbh', 'bb_bbl', 'sma_20', 'ema_12',
+                 'btc_avg_buy_price', 'btc_usd_price')
+PRICE_DIFF_COLUMNS = ('macd', 'macd_signal', 'macd_diff')
+PRICE_SIGNIFICANT = 5
+
+TRADE_COLUMNS = ['timestamp', 'decision', 'percentage', 'btc_balance', 'usd_balance',
+                 'btc_avg_buy_price', 'btc_usd_price', 'reason']
+REASON_CHARS = 160
+ORDERBOOK_LEVELS = 10
+
+try:
+    import tiktoken
+    _encoding = tiktoken.get_encoding("o200k_base")
+except Exception as e:
+    _encoding = None
+    logger.warning(f"tiktoken unavailable ({e}); prompt token counts are estimated at 3.5 characters per token")
+
+def count_tokens(text):
+    if _encoding is not None:
+        return len(_encoding.encode(text))
+    # Rough estimate for numeric/CSV text without tiktoken installed
+    return math.ceil(len(text) / 3.5)
+
+def format_value(value, digits=None):
+    if value is None:
+        return ""
+    if isinstance(value, float):
+        if math.isnan(value):
+            return ""
+        if digits is not None:
+            return f"{value:.{digits}f}"
+        return f"{value:.6g}"
+    if isinstance(value, pd.Timestamp):
+        return value.strftime('%Y-%m-%dT%H:%M')
+    return str(value).replace("|", "/").replace("\n", " ")
+
+def price_digits(values, significant=PRICE_SIGNIFICANT):
+    magnitude = max((abs(value) for value in values
+                     if isinstance(value, (int, float)) and not math.isnan(value)), default=0)
+    if not magnitude:
+        return 0
+    return max(0, significant - 1 - math.floor(math.log10(magnitude)))
+
+def format_time(value):
+    # 2024-01-01T00:00:00Z -> 2024-01-01T00:00
+    if isinstance(value, str):
+        return value[:16]
+    return pd.Timestamp(value).strftime('%Y-%m-%dT%H:%M')
+
+class Table:
+
+    def __init__(self, name, columns, rows):
+        self.name = name
+        self.columns = columns
+        self.rows = rows
+
+    def text(self):
+        lines = [f"{self.name} ({len(self.rows)} rows, oldest first)", "|".join(self.columns)]
+        lines.extend(self.rows)
+        return "\n".join(lines)
+
+    def drop_oldest(self, count):
+        self.rows = self.rows[count:]
+
+def encode_table(name, df, columns):
+    columns = [column for column in columns if column in df]
+    digits = price_digits([value for column in columns if column in PRICE_COLUMNS for value in df[column].tolist()])
+    formatted = []
+    for column in columns:
+        values = df[column].tolist()
+        if column in ('t', 'timestamp'):
+            formatted.append([format_time(value) for value in values])
+        elif column == 'reason':
+            formatted.append([format_value(value)[:REASON_CHARS] for value in values])
+        elif column in PRICE_COLUMNS or column in PRICE_DIFF_COLUMNS:
+            formatted.append([format_value(value, digits + (column in PRICE_DIFF_COLUMNS)) for value in values])
+        else:
+            formatted.append([format_value(value, PRECISION.get(column)) for value in values])
+    rows = ["|".join(values) for values in zip(*formatted)]
+    return Table(name, columns, rows)
+
+def encode_bars(name, df):
+    return encode_table(name, df, BAR_COLUMNS)
+
+def encode_trades(trades_df):
+    if trades_df is None or trades_df.empty:
+        return "No trades in this period."
+    # Newest first in the table coming from get_recent_trades
+    trades = trades_df.iloc[::-1]
+    return encode_table("Trades", trades, TRADE_COLUMNS).text()
+
+# Book prices are shown two decimals finer than bar prices (cents for BTC)
+BOOK_EXTRA_DIGITS = 2
+
+def encode_orderbook(orderbook, levels=ORDERBOOK_LEVELS, base="BTC"):
+    if not orderbook:
+        return "Orderbook: unavailable"
+    if 'orderbooks' not in orderbook:
+        return encode_book_features(orderbook, base)
+    books = orderbook.get('orderbooks', {})
+    lines = []
+    for symbol, book in books.items():
+        digits = price_digits([level['p'] for level in book.get('a', [])[:1] + book.get('b', [])[:1]]) + BOOK_EXTRA_DIGITS
+        asks = " ".join(f"{level['p']:.{digits}f}x{level['s']:.4f}" for level in book.get('a', [])[:levels])
+        bids = " ".join(f"{level['p']:.{digits}f}x{level['s']:.4f}" for level in book.get('b', [])[:levels])
+        lines.append(f"Orderbook {symbol} (price x size, best first)")
+        lines.append(f"asks: {asks}")
+        lines.append(f"bids: {bids}")
+    return "\n".join(lines) if lines else "Orderbook: unavailable"
+
+def encode_book_features(features, base="BTC"):
+    # OrderBook.features(): one line each for touch, depth bands and fill
+    # slippage; depth is in units of the base asset, fill sizes in USD
+    digits = price_digits([features['mid']]) + BOOK_EXTRA_DIGITS
+    depth = []
+    slippage = []
+    for key, value in features.items():
+        if key.startswith('depth_') and key.endswith('_bid'):
+            band = key[len('depth_'):-len('_bid')]
+            depth.append(f"±{band} bid {value:.3f} / ask {features[f'depth_{band}_ask']:.3f} {base}"
+                         f" (imbalance {features[f'imbalance_{band}']:+.2f})")
+        elif key.startswith('buy_') and key.endswith('usd_bps'):
+            size = key[len('buy_'):-len('usd_bps')]
+            buy, sell = value, features.get(f'sell_{size}usd_bps')
+            slippage.append(f"{size} USD buy {format_value(buy, 1) or 'n/a'} / sell {format_value(sell, 1) or 'n/a'}")
+    return "\n".join([
+        f"Orderbook: bid {features['bid']:.{digits}f} ask {features['ask']:.{digits}f} mid {features['mid']:.{digits}f}"
+        f" spread {features['spread']:.{digits}f} ({features['spread_bps']:.2f} bps)",
+        "Depth within mid: " + "; ".join(depth),
+        "Slippage vs mid to fill (bps): " + "; ".join(slippage),
+    ])
+
+def encode_json(data):
+    return json.dumps(data, separators=(",", ":"), ensure_ascii=False)
+
+def fit_to_budget(header, tables, budget):
+    # Drop the oldest rows of the largest table until everything fits
+    def render():
+        return "\n\n".join([header] + [table.text() for table in tables])
+
+    text = render()
+    tokens = count_tokens(text)
+    while tokens > budget:
+        table = max(tables, key=lambda table: len(table.rows))
+        if len(table.rows) <= 1:
+            break
+        # Drop in proportion to how far over budget we are
+        overshoot = (tokens - budget) / tokens
+        table.drop_oldest(max(1, int(len(table.rows) * overshoot)))
+        text = render()
+        tokens = count_tokens(text)
+    return text, tokens
+
+def build_market_block(df_daily, df_hourly, orderbook, fear_greed_index, headlines, budget=PROMPT_TOKEN_BUDGET,
+                       symbol="BTC/USD"):
+    header = "\n".join([
+        "Fear and Greed Index: " + encode_json(fear_greed_index),
+        "Recent news headlines: " + encode_json(headlines),
+        encode_orderbook(orderbook, base=symbol.split("/")[0]),
+    ])
+    tables = [
+        encode_bars("Daily OHLCV with indicators (30 days)", df_daily),
+        encode_bars("Hourly OHLCV with indicators (24 hours)", df_hourly),
+    ]
+    return fit_to_budget(header, tables, budget)
@@ -0,0 +1,103 @@
+import os
+import re
+import threading
+
+import numpy as np
+
+from bars import Bars
+
+# Multi-timeframe resampling
+# ------------------------
+# Every timeframe is built locally from one base series (1-minute bars), so
+# daily, hourly and any other bars agree with each other at the boundaries
+# and adding a timeframe costs no request. Buckets start at multiples of the
+# timeframe since the epoch (UTC midnight for 1D), shifted by RESAMPLE_OFFSET
+# seconds. The last bar of each timeframe is the current partial one.
+# Resampler keeps the base series and every derived timeframe in memory and,
+# when new base bars arrive, rebuilds only the buckets they touch.
+
+BASE_TIMEFRAME = os.getenv("RESAMPLE_BASE", "1Min")
+OFFSET = int(os.getenv("RESAMPLE_OFFSET", "0"))
+HISTORY = 31 * 86400        # seconds of base bars kept
+
+UNITS = {"min": 60, "t": 60, "h": 3600, "hour": 3600, "d": 86400, "day": 86400, "w": 604800, "week": 604800}
+
+def timeframe_seconds(timeframe):
+    # "1Min", "15Min", "1H", "4Hour", "1D", "1Week" -> seconds
+    match = re.fullmatch(r"(\d*)\s*([A-Za-z]+)", timeframe.strip())
+    unit = UNITS.get(match.group(2).lower()) if match else None
+    if unit is None:
+        raise ValueError(f"Unknown timeframe: {timeframe}")
+    return int(match.group(1) or 1) * unit
+
+def resample(bars, seconds, offset=OFFSET):
+    # OHLCV bars of `seconds` from sorted finer bars; empty buckets are skipped
+    if not len(bars):
+        return Bars()
+    t = bars.t.astype(np.int64)
+    bucket = t - (t - offset) % seconds
+    starts = np.flatnonzero(np.r_[True, bucket[1:] != bucket[:-1]])
+    ends = np.r_[starts[1:], len(t)] - 1
+    return Bars(t=bucket[starts].astype('datetime64[s]'), o=bars.o[starts],
+                h=np.maximum.reduceat(bars.h, starts), l=np.minimum.reduceat(bars.l, starts),
+                c=bars.c[ends], v=np.add.reduceat(bars.v, starts))
+
+class Resampler:
+
+    def __init__(self, base_seconds=60, history=HISTORY, offset=OFFSET):
+        self.base_seconds = base_seconds
+        self.history = history
+        self.offset = offset
+        self.base = Bars()
+        self.frames = {}            # seconds -> Bars
+        self.lock = threading.RLock()
+
+    def __len__(self):
+        return len(self.base)
+
+    def last(self):
+        # Start of the newest base bar, or None
+        return self.base.t[-1] if len(self.base) else None
+
+    def update(self, bars):
+        # Sorted base bars; ones at or after bars.t[0] replace what is held
+        # (the newest stored bar may have been partial)
+        if not len(bars):
+            return
+        with self.lock:
+            first = int(bars.t[0].astype(np.int64))
+            keep = int(np.searchsorted(self.base.t, bars.t[0]))
+            base = Bars.concat([self.base[:keep], bars])
+            horizon = base.t[-1] - np.timedelta64(self.history, 's')
+            self.base = base[int(np.searchsorted(base.t, horizon)):]
+            for seconds, frame in self.frames.items():
+                self.frames[seconds] = self._extend(frame, seconds, first)
+
+    def _extend(self, frame, seconds, first):
+        # Buckets before the one holding `first` stay; the rest are rebuilt
+        cut = np.datetime64(first - (first - self.offset) % seconds, 's')
+        tail = resample(self.base[int(np.searchsorted(self.base.t, cut)):], seconds, self.offset)
+        frame = Bars.concat([frame[:int(np.searchsorted(frame.t, cut))], tail])
+        # Drop buckets older than the base series now reaches
+        oldest = int(self.base.t[0].astype(np.int64))
+        return frame[int(np.searchsorted(frame.t, np.datetime64(oldest - (oldest - self.offset) % seconds, 's'))):]
+
+    def bars(self, timeframe, start=None, end=None):
+        # Bars of `timeframe` whose start lies in [start, end]; start/end are
+        # datetime64 or ISO strings, None for open ends
+        seconds = timeframe_seconds(timeframe) if isinstance(timeframe, str) else timeframe
+        with self.lock:
+            if seconds == self.base_seconds:
+                frame = self.base
+            else:
+                frame = self.frames.get(seconds)
+                if frame is None:
+                    frame = self.frames[seconds] = resample(self.base, seconds, self.offset)
+            lo = np.searchsorted(frame.t, _time(start)) if start is not None else 0
+            hi = np.searchsorted(frame.t, _time(end), side='right') if end is not None else len(frame)
+            return frame[lo:hi]
+
+def _time(value):
+    if isinstance(value, str):
+        return np.datetime64(value.rstrip('Z'), 's')
+    return np.datetime64(value, 's')
@@ -0,0 +1,125 @@
+import os
+import sys
+import logging
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+import alpaca
+import telemetry
+
+logger = logging.getLogger(__name__)
+
+# Multi-symbol runner
+# ------------------------
+# Trades several symbols, optionally on several accounts, in one cycle. The
+# inputs every symbol shares (Fear & Greed, headlines, strategy transcript)
+# are fetched once; each symbol's bars, book, balances, chart and reflection
+# are then gathered on a thread pool, and the decisions, orders and trade
+# logging run in parallel as well. A cycle takes about as long as the slowest
+# symbol rather than the sum of all of them. Trades, reflections, rollups,
+# indicator state and chart files are kept per symbol and account, so two
+# accounts trading the same symbol never share a position.
+#
+# Targets are "SYMBOL" or "SYMBOL@ACCOUNT"; ACCOUNT reads its keys from
+# APCA_API_KEY_ID_<ACCOUNT> / APCA_API_SECRET_KEY_<ACCOUNT>.
+
+TRADE_SYMBOLS = os.getenv("TRADE_SYMBOLS", "BTC/USD")
+MAX_WORKERS = int(os.getenv("RUNNER_WORKERS", "32"))   # threads; the work is mostly waiting on HTTP
+
+def parse_targets(value):
+    # "BTC/USD,ETH/USD@alt" -> [("BTC/USD", None), ("ETH/USD", "alt")]
+    targets = []
+    for item in value.split(","):
+        symbol, _, account = item.strip().partition("@")
+        if not symbol:
+            continue
+        if (symbol, account or None) in targets:
+            raise ValueError(f"{item.strip()} is listed twice")
+        targets.append((symbol, account or None))
+    return targets
+
+def target_name(symbol, account):
+    return f"{symbol}@{account}" if account else symbol
+
+def account_credentials(account):
+    if account is None:
+        return None, None
+    suffix = account.upper()
+    key, secret = os.getenv(f"APCA_API_KEY_ID_{suffix}"), os.getenv(f"APCA_API_SECRET_KEY_{suffix}")
+    if not key or not secret:
+        raise ValueError(f"No credentials for account {account} (APCA_API_KEY_ID_{suffix} / APCA_API_SECRET_KEY_{suffix})")
+    return key, secret
+
+class Runner:
+
+    def __init__(self, targets, max_workers=MAX_WORKERS):
+        import autotrade
+        self.autotrade = autotrade
+        primary = autotrade.trader
+        self.traders = []
+        for symbol, account in targets:
+            if symbol == primary.symbol and account is None:
+                self.traders.append(primary)     # keeps the market stream, if any
+                continue
+            key, secret = account_credentials(account)
+            self.traders.append(alpaca.CryptoTrader(symbol=symbol, key=key, secret=secret, bar_store=primary.bar_store,
+                                                    account=account or ""))
+        self.pool = ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(self.traders))),
+                                       thread_name_prefix="runner")
+
+    def gather(self):
+        # Inputs for every symbol that has market data, or None if none has
+        shared = self.autotrade.gather_shared()
+        futures = [self.pool.submit(self.autotrade.gather_inputs, trader, shared) for trader in self.traders]
+        batch = []
+        for trader, future in zip(self.traders, futures):
+            try:
+                inputs = future.result()
+            except Exception as e:
+                logger.error(f"Gathering failed for {target_name(trader.symbol, trader.account)}: {e}")
+                continue
+            if inputs is not None:
+                batch.append(inputs)
+        return batch or None
+
+    def decide(self, batch):
+        # Runs every symbol's cycle; raises once all are done if any failed
+        futures = [(target_name(inputs["symbol"], inputs["account"]), self.pool.submit(self.autotrade.run_cycle, inputs))
+                   for inputs in batch]
+        failed = []
+        for name, future in futures:
+            try:
+                future.result()
+            except Exception as e:
+                logger.error(f"Cycle failed for {name}: {e}")
+                failed.append(f"{name}: {e}")
+        if failed:
+            raise RuntimeError("; ".join(failed))
+
+    def run_once(self):
+        with telemetry.cycle():
+            batch = self.gather()
+            if batch is not None:
+                self.decide(batch)
+
+    def close(self):
+        self.pool.shutdown(wait=True)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run one ai_trading cycle for several symbols or accounts at once")
+    parser.add_argument("--symbols", default=TRADE_SYMBOLS, help="e.g. BTC/USD,ETH/USD or BTC/USD@main,BTC/USD@alt")
+    parser.add_argument("--workers", type=int, default=MAX_WORKERS)
+    parser.add_argument("--profile", metavar="DIR", help="write a profile of the cycle to DIR")
+    parser.add_argument("--profiler", choices=["sample", "cprofile"], default="sample")
+    args = parser.parse_args(argv)
+    telemetry.configure(profile_dir=args.profile, profiler=args.profiler)
+
+    runner = Runner(parse_targets(args.symbols), max_workers=args.workers)
+    try:
+        runner.run_once()
+    finally:
+        runner.close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,184 @@
+import os
+import sys
+import logging
+import argparse
+import threading
+from datetime import datetime, timedelta
+
+import telemetry
+import trade_store
+
+logger = logging.getLogger(__name__)
+
+# Scheduler daemon
+# ------------------------
+# Decisions happen at fixed times of day. Gathering (market data, chart,
+# reflection) starts PREFETCH_LEAD seconds before each one, so the decision
+# call runs on inputs that are ready and a couple of minutes old at most.
+# Cycles run one after another on a single thread and never overlap. A
+# deadline that is more than GRACE seconds behind by the time its turn comes
+# is recorded as missed and skipped. Every deadline gets a row in the store's
+# cycles table with its status and how late the decision ran.
+
+DECISION_TIMES = os.getenv("DECISION_TIMES", "09:00,15:00,21:00")
+PREFETCH_LEAD = float(os.getenv("PREFETCH_LEAD", "120"))
+GRACE = float(os.getenv("DEADLINE_GRACE", "300"))
+
+def parse_times(value):
+    # "09:00,15:00" -> [(9, 0), (15, 0)]
+    times = []
+    for item in value.split(","):
+        hour, _, minute = item.strip().partition(":")
+        times.append((int(hour), int(minute or 0)))
+    return sorted(times)
+
+def next_deadline(after, times=None, interval=None):
+    # First decision time strictly after `after`; either times of day or
+    # every `interval` seconds since midnight
+    if interval:
+        midnight = after.replace(hour=0, minute=0, second=0, microsecond=0)
+        elapsed = (after - midnight).total_seconds()
+        return midnight + timedelta(seconds=(int(elapsed // interval) + 1) * interval)
+    for day in (0, 1):
+        date = after.date() + timedelta(days=day)
+        for hour, minute in times:
+            deadline = datetime(date.year, date.month, date.day, hour, minute)
+            if deadline > after:
+                return deadline
+
+class Scheduler:
+
+    def __init__(self, prefetch, decide, times=None, interval=None, lead=PREFETCH_LEAD, grace=GRACE, store=None):
+        # prefetch() -> inputs or None; decide(inputs) runs the rest of the cycle
+        self.prefetch = prefetch
+        self.decide = decide
+        self.times = times or parse_times(DECISION_TIMES)
+        self.interval = interval
+        self.lead = lead
+        self.grace = grace
+        self.store = store or trade_store.get_store()
+        self.running = threading.Lock()
+        self.stopped = threading.Event()
+
+    def next_deadline(self, after):
+        return next_deadline(after, self.times, self.interval)
+
+    def wait_until(self, when):
+        # False if stopped first
+        while not self.stopped.is_set():
+            remaining = (when - datetime.now()).total_seconds()
+            if remaining <= 0:
+                return True
+            self.stopped.wait(min(remaining, 60))
+        return False
+
+    def stop(self):
+        self.stopped.set()
+
+    def record(self, deadline, status, **fields):
+        logger.info(f"Cycle {deadline.isoformat()}: {status}"
+                    + (f", {fields['lateness']:.2f}s late" if fields.get('lateness') is not None else ""))
+        try:
+            self.store.log_cycle(deadline.isoformat(), status, **fields)
+        except Exception as e:
+            logger.error(f"Could not record cycle: {e}")
+
+    def run_cycle(self, deadline):
+        if not self.running.acquire(blocking=False):
+            self.record(deadline, "overlap")
+            return
+        try:
+            with telemetry.cycle(deadline.isoformat()):
+                self._run_cycle(deadline)
+        finally:
+            self.running.release()
+
+    def _run_cycle(self, deadline):
+        started = datetime.now()
+        try:
+            inputs = self.prefetch()
+        except Exception as e:
+            logger.error(f"Prefetch failed: {e}")
+            inputs, error = None, str(e)
+        else:
+            error = None
+        prefetch_seconds = (datetime.now() - started).total_seconds()
+        fields = {"prefetch_started": started.isoformat(), "prefetch_seconds": prefetch_seconds}
+        if inputs is None:
+            self.record(deadline, "no_inputs", error=error, **fields)
+            return
+
+        if not self.wait_until(deadline):
+            return
+        decided = datetime.now()
+        lateness = (decided - deadline).total_seconds()
+        if lateness > self.grace:
+            # Prefetch overran the deadline by too much; inputs are stale
+            self.record(deadline, "missed", lateness=lateness, **fields)
+            return
+
+        try:
+            self.decide(inputs)
+            status, error = "ok", None
+        except Exception as e:
+            logger.error(f"An Error occrued: {e}")
+            status, error = "error", str(e)
+        self.record(deadline, status, decided_at=decided.isoformat(), lateness=lateness,
+                    cycle_seconds=(datetime.now() - decided).total_seconds(), error=error, **fields)
+
+    def run_now(self):
+        # Event-driven cycle: the deadline is now, lateness is the prefetch time
+        self.run_cycle(datetime.now())
+
+    def run(self):
+        deadline = self.next_deadline(datetime.now() + timedelta(seconds=self.lead))
+        logger.info(f"Scheduler started, next decision at {deadline.isoformat()}")
+        while not self.stopped.is_set():
+            if not self.wait_until(deadline - timedelta(seconds=self.lead)):
+                break
+            self.run_cycle(deadline)
+
+            # Deadlines that went by while this cycle ran
+            following = self.next_deadline(deadline)
+            now = datetime.now()
+            while following + timedelta(seconds=self.grace) < now:
+                self.record(following, "missed", lateness=(now - following).total_seconds())
+                following = self.next_deadline(following)
+            deadline = following
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run ai_trading on a schedule, gathering inputs ahead of each decision")
+    parser.add_argument("--times", default=DECISION_TIMES, help="decision times of day, e.g. 09:00,15:00,21:00")
+    parser.add_argument("--interval", type=float, help="decide every N seconds instead of at --times")
+    parser.add_argument("--lead", type=float, default=PREFETCH_LEAD, help="seconds to start gathering before each decision")
+    parser.add_argument("--grace", type=float, default=GRACE, help="seconds after a deadline it still counts as on time")
+    parser.add_argument("--symbols", help="trade several symbols/accounts per cycle (see runner.py), e.g. BTC/USD,ETH/USD")
+    parser.add_argument("--on-bar", help="with MARKET_STREAM set, also decide whenever a bar of this timeframe closes, e.g. 1H")
+    parser.add_argument("--profile", metavar="DIR", help="write a profile of every cycle to DIR")
+    parser.add_argument("--profiler", choices=["sample", "cprofile"], default="sample",
+                        help="sample: every thread's stacks (collapsed); cprofile: the cycle thread only")
+    args = parser.parse_args(argv)
+    telemetry.configure(profile_dir=args.profile, profiler=args.profiler)
+
+    import autotrade
+
+    prefetch, decide = autotrade.gather_inputs, autotrade.run_cycle
+    if args.symbols:
+        import runner
+        batch_runner = runner.Runner(runner.parse_targets(args.symbols))
+        prefetch, decide = batch_runner.gather, batch_runner.decide
+    scheduler = Scheduler(prefetch, decide, times=parse_times(args.times),
+                          interval=args.interval, lead=args.lead, grace=args.grace)
+    if args.on_bar:
+        if autotrade.trader.stream is None:
+            parser.error("--on-bar needs MARKET_STREAM")
+        autotrade.trader.stream.on("bar", lambda timeframe, start: timeframe == args.on_bar and
+                                   threading.Thread(target=scheduler.run_now, daemon=True).start())
+    try:
+        scheduler.run()
+    except KeyboardInterrupt:
+        scheduler.stop()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,314 @@
+import sys
+import json
+import math
+import hashlib
+import time
+import uuid
+import random
+import sqlite3
+import argparse
+import threading
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+# Local stand-in server
+# ------------------------
+# Answers the Alpaca (account, positions, bars, order book, orders), OpenAI
+# chat completions, alternative.me and SerpAPI endpoints the bot calls, with
+# synthetic or recorded data and a configurable delay per route, so a full
+# ai_trading cycle can run offline. environment() gives the variables that
+# point the bot at it.
+
+TIMEFRAMES = {
+    "1Min": 60, "5Min": 300, "15Min": 900, "30Min": 1800,
+    "1H": 3600, "1Hour": 3600, "4H": 14400, "1D": 86400, "1Day": 86400,
+}
+
+DECISION = {"decision": "hold", "percentage": 0, "reason": "Stand-in decision."}
+REFLECTION = "Stand-in reflection: performance was flat, keep position sizes small."
+
+# Price level of each symbol relative to BTC/USD; others default to 1%
+SCALES = {"BTC/USD": 1.0, "ETH/USD": 0.05}
+
+def synthetic_price(seconds, symbol="BTC/USD"):
+    # Deterministic random-ish walk around 60k (scaled per symbol), the same for every request
+    scale = SCALES.get(symbol, 0.01)
+    return scale * (60000 + 2500 * math.sin(seconds / 86400 / 3) + 400 * math.sin(seconds / 3600 / 5) + 50 * math.sin(seconds / 97))
+
+def parse_time(value):
+    return datetime.strptime(value, '%Y-%m-%dT%H:%M:%SZ').replace(tzinfo=timezone.utc)
+
+class StandInState:
+
+    def __init__(self, cash=100000.0, btc_qty=0.5, btc_avg_price=58000.0, bars_db=None):
+        self.lock = threading.Lock()
+        self.cash = cash
+        self.holdings = {"BTC/USD": [btc_qty, btc_avg_price]}   # symbol -> [qty, avg entry price]
+        self.orders = {}
+        self.bars_db = bars_db
+
+    def price(self, symbol="BTC/USD"):
+        return synthetic_price(time.time(), symbol)
+
+    def account(self):
+        with self.lock:
+            value = sum(qty * self.price(symbol) for symbol, (qty, _) in self.holdings.items())
+            equity = self.cash + value
+            return {
+                "status": "ACTIVE", "crypto_status": "ACTIVE", "currency": "USD",
+                "buying_power": str(self.cash), "cash": str(self.cash),
+                "portfolio_value": str(equity), "equity": str(equity),
+                "long_market_value": str(value),
+                "position_market_value": str(value),
+                "shorting_enabled": False,
+            }
+
+    def positions(self):
+        with self.lock:
+            positions = []
+            for symbol, (qty, avg) in self.holdings.items():
+                if qty <= 0:
+                    continue
+                price = self.price(symbol)
+                positions.append({
+                    "symbol": symbol.replace("/", ""), "qty": str(qty), "avg_entry_price": str(avg),
+                    "side": "long", "market_value": str(qty * price), "current_price": str(price),
+                })
+            return positions
+
+    def orderbook(self, symbols=("BTC/USD",), levels=20):
+        books = {}
+        for symbol in symbols:
+            mid = self.price(symbol)
+            tick = SCALES.get(symbol, 0.01)
+            books[symbol] = {
+                "t": datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%fZ'),
+                "a": [{"p": round(mid + (5 + i * 7.5) * tick, 2), "s": round((0.05 + 0.03 * i) / tick, 4)} for i in range(levels)],
+                "b": [{"p": round(mid - (5 + i * 7.5) * tick, 2), "s": round((0.05 + 0.03 * i) / tick, 4)} for i in range(levels)],
+            }
+        return {"orderbooks": books}
+
+    def place_order(self, payload):
+        # Market orders fill immediately at the synthetic price
+        with self.lock:
+            symbol = payload.get("symbol") or "BTC/USD"
+            price = self.price(symbol)
+            holding = self.holdings.setdefault(symbol, [0.0, 0.0])
+            side = payload.get("side")
+            if side == "buy":
+                notional = min(float(payload.get("notional") or float(payload.get("qty", 0)) * price), self.cash)
+                qty = notional / price
+                if qty > 0:
+                    holding[1] = (holding[1] * holding[0] + price * qty) / (holding[0] + qty)
+                holding[0] += qty
+                self.cash -= notional
+            else:
+                qty = min(float(payload.get("qty", 0)), holding[0])
+                holding[0] -= qty
+                self.cash += qty * price
+            now = datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%fZ')
+            order = {
+                "id": str(uuid.uuid4()), "client_order_id": str(uuid.uuid4()),
+                "created_at": now, "submitted_at": now, "filled_at": now, "updated_at": now,
+                "symbol": payload.get("symbol"), "side": side, "type": payload.get("type"),
+                "time_in_force": payload.get("time_in_force"),
+                "qty": str(qty), "notional": payload.get("notional"),
+                "filled_qty": str(qty), "filled_avg_price": str(price), "status": "filled",
+            }
+            self.orders[order["id"]] = order
+            return order
+
+    def bars(self, symbols, timeframe, start, end, limit, page_token):
+        step = TIMEFRAMES.get(timeframe, 3600)
+        start_ts = math.ceil(parse_time(start).timestamp() / step) * step
+        end_ts = min(parse_time(end).timestamp(), time.time())
+        offset = int(page_token or 0)
+        result = {}
+        count = 0
+        for symbol in symbols:
+            if self.bars_db:
+                bars = self.recorded_bars(symbol, timeframe, start, end)
+            else:
+                bars = []
+                t = start_ts
+                while t <= end_ts:
+                    o, c = synthetic_price(t, symbol), synthetic_price(t + step - 1, symbol)
+                    wick = 20 * SCALES.get(symbol, 0.01)
+                    bars.append({
+                        "t": datetime.fromtimestamp(t, timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ'),
+                        "o": o, "h": max(o, c) + wick, "l": min(o, c) - wick, "c": c,
+                        "v": 1 + abs(math.sin(t)), "n": 10, "vw": (o + c) / 2,
+                    })
+                    t += step
+            page = bars[offset:offset + limit]
+            count = max(count, len(bars))
+            if page:
+                result[symbol] = page
+        next_token = str(offset + limit) if offset + limit < count else None
+        return {"bars": result, "next_page_token": next_token}
+
+    def recorded_bars(self, symbol, timeframe, start, end):
+        conn = sqlite3.connect(self.bars_db)
+        try:
+            rows = conn.execute(
+                "SELECT t, o, h, l, c, v FROM bars WHERE symbol = ? AND timeframe = ? AND t >= ? AND t <= ? ORDER BY t",
+                (symbol, timeframe, start, end)).fetchall()
+        finally:
+            conn.close()
+        return [dict(zip(("t", "o", "h", "l", "c", "v"), row)) for row in rows]
+
+def chat_completion(request):
+    structured = "response_format" in request
+    content = json.dumps(DECISION) if structured else REFLECTION
+    prompt_chars = sum(len(str(message.get("content", ""))) for message in request.get("messages", []))
+    prompt_tokens = prompt_chars // 4
+    completion_tokens = len(content) // 4
+    return {
+        "id": "chatcmpl-" + uuid.uuid4().hex, "object": "chat.completion", "created": int(time.time()),
+        "model": request.get("model", "gpt-4o"),
+        "choices": [{"index": 0, "finish_reason": "stop",
+                     "message": {"role": "assistant", "content": content}}],
+        "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                  "total_tokens": prompt_tokens + completion_tokens},
+    }
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    state = None
+    latency = {}
+    jitter = 0.0
+    counts = {}     # requests answered per route
+
+    def log_message(self, format, *args):
+        pass
+
+    def route(self, method):
+        parts = urlsplit(self.path)
+        path = parts.path.rstrip("/")
+        query = {key: values[0] for key, values in parse_qs(parts.query).items()}
+
+        if method == "GET" and path == "/v2/account":
+            return "account", self.state.account()
+        if method == "GET" and path == "/v2/positions":
+            return "positions", self.state.positions()
+        if method == "GET" and path == "/v1beta3/crypto/us/latest/orderbooks":
+            return "orderbook", self.state.orderbook(query.get("symbols", "BTC/USD").split(","))
+        if method == "GET" and path == "/v1beta3/crypto/us/bars":
+            return "bars", self.state.bars(
+                query.get("symbols", "BTC/USD").split(","), query.get("timeframe", "1H"),
+                query["start"], query["end"], int(query.get("limit", 1000)), query.get("page_token"))
+        if method == "POST" and path == "/v2/orders":
+            return "orders", self.state.place_order(self.read_json())
+        if method == "GET" and path.startswith("/v2/orders/"):
+            order = self.state.orders.get(path.rsplit("/", 1)[1])
+            return "order_status", order
+        if method == "POST" and path.endswith("/chat/completions"):
+            return "chat", chat_completion(self.read_json())
+        if method == "GET" and path == "/fng":
+            # Daily index, like alternative.me
+            day = int(time.time()) // 86400 * 86400
+            return "fng", {"name": "Fear and Greed Index", "data": [
+                {"value": "55", "value_classification": "Greed", "timestamp": str(day),
+                 "time_until_update": str(day + 86400 - int(time.time()))}]}
+        if method == "GET" and path == "/search.json":
+            return "news", {"news_results": [
+                {"title": f"Bitcoin stand-in headline {i}", "date": datetime.now().strftime('%m/%d/%Y')} for i in range(10)]}
+        return None, None
+
+    def read_json(self):
+        length = int(self.headers.get("Content-Length", 0))
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def respond(self, method):
+        name, body = self.route(method)
+        delay = self.latency.get(name, self.latency.get("default", 0.0))
+        if delay:
+            time.sleep(max(0.0, delay + random.uniform(-self.jitter, self.jitter) * delay))
+        status = 200 if body is not None else 404
+        payload = json.dumps(body if body is not None else {"message": "not found"}).encode()
+        # Conditional GETs for the feeds: strong ETag over the body minus volatile fields
+        etag = None
+        if name in ("fng", "news"):
+            stable = json.dumps(body, sort_keys=True).encode() if name == "news" else json.dumps(
+                [{k: v for k, v in item.items() if k != "time_until_update"} for item in body["data"]]).encode()
+            etag = '"' + hashlib.sha1(stable).hexdigest() + '"'
+            if self.headers.get("If-None-Match") == etag:
+                status, payload = 304, b""
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        if etag:
+            self.send_header("ETag", etag)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+        self.counts[name] = self.counts.get(name, 0) + 1
+
+    def do_GET(self):
+        self.respond("GET")
+
+    def do_POST(self):
+        self.respond("POST")
+
+def start(host="127.0.0.1", port=0, latency=None, jitter=0.0, bars_db=None):
+    # Runs in a daemon thread; port=0 picks a free port
+    handler = type("Handler", (StandInHandler,), {
+        "state": StandInState(bars_db=bars_db),
+        "latency": dict(latency or {}),
+        "jitter": jitter,
+        "counts": {},
+    })
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def environment(server):
+    host, port = server.server_address[:2]
+    base = f"http://{host}:{port}"
+    return {
+        "BASE_URL": f"{base}/v2/account",
+        "POS_URL": f"{base}/v2/positions",
+        "ORDERBOOK_URL": f"{base}/v1beta3/crypto/us/latest/orderbooks?symbols=BTC/USD",
+        "ORDER_URL": f"{base}/v2/orders",
+        "DATA_URL": f"{base}/v1beta3/crypto/us/bars",
+        "FNG_URL": f"{base}/fng/",
+        "SERPAPI_URL": f"{base}/search.json",
+        "OPENAI_BASE_URL": f"{base}/v1",
+        "OPENAI_API_KEY": "stand-in",
+        "SERPAPI_API_KEY": "stand-in",
+        "APCA_API_KEY_ID": "stand-in",
+        "APCA_API_SECRET_KEY": "stand-in",
+    }
+
+def parse_latency(values):
+    # ["0.05", "chat=1.5", "bars=0.2"] -> {"default": 0.05, "chat": 1.5, "bars": 0.2}
+    latency = {}
+    for value in values or []:
+        name, _, seconds = value.rpartition("=")
+        latency[name or "default"] = float(seconds)
+    return latency
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local stand-in for Alpaca, OpenAI, alternative.me and SerpAPI")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8700)
+    parser.add_argument("--latency", action="append",
+                        help="seconds, either a default (0.05) or per route (chat=1.5); routes: "
+                             "account positions orderbook bars orders order_status chat fng news")
+    parser.add_argument("--jitter", type=float, default=0.0, help="relative latency jitter, e.g. 0.2")
+    parser.add_argument("--bars-db", help="serve recorded bars from a bar store database")
+    args = parser.parse_args(argv)
+
+    server = start(args.host, args.port, parse_latency(args.latency), args.jitter, args.bars_db)
+    for key, value in environment(server).items():
+        print(f"{key}={value}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,341 @@
+import os
+import json
+import time
+import logging
+import threading
+
+import numpy as np
+
+from bars import Bars
+from orderbook import OrderBook
+
+try:
+    import websocket
+except ImportError:
+    websocket = None
+
+logger = logging.getLogger(__name__)
+
+# Streaming market data
+# ------------------------
+# MarketStream keeps the latest market state in memory: one fixed-size ring
+# buffer of bars per timeframe, built from trade ticks, plus the current
+# order book (orderbook.OrderBook) and the last trade and quote. It is fed either by the Alpaca
+# crypto websocket (needs the optional websocket-client package) or by
+# ReplayFeed, which plays back recorded messages for tests and offline runs.
+# Messages use the Alpaca v1beta3 format: lists of {"T": "t" | "q" | "b" | "o", "S": symbol, ...}.
+
+STREAM_URL = os.getenv("STREAM_URL", "wss://stream.data.alpaca.markets/v1beta3/crypto/us")
+
+TIMEFRAMES = {
+    "1Min": 60, "5Min": 300, "15Min": 900, "30Min": 1800,
+    "1H": 3600, "1Hour": 3600, "4H": 14400, "1D": 86400, "1Day": 86400,
+}
+
+EVENTS = {"t": "trade", "q": "quote", "o": "book"}
+
+# Bars kept per timeframe
+DEFAULT_CAPACITY = {"1Min": 1440, "1H": 720, "1D": 120}
+
+def epoch(value):
+    # RFC 3339 (nanoseconds allowed), 'Z' suffix -> seconds since the epoch
+    return int(np.datetime64(value.rstrip('Z'), 's').astype(np.int64))
+
+class BarRing:
+    # The newest `capacity` bars of one timeframe in preallocated arrays.
+    # Bars are ordered by start time; head is the slot of the next new bar.
+
+    def __init__(self, seconds, capacity):
+        self.seconds = seconds
+        self.capacity = capacity
+        self.t = np.zeros(capacity, dtype=np.int64)
+        self.o = np.zeros(capacity)
+        self.h = np.zeros(capacity)
+        self.l = np.zeros(capacity)
+        self.c = np.zeros(capacity)
+        self.v = np.zeros(capacity)
+        self.size = 0
+        self.head = 0
+
+    def __len__(self):
+        return self.size
+
+    def _last(self):
+        return (self.head - 1) % self.capacity
+
+    def _append(self, start, o, h, l, c, v):
+        i = self.head
+        self.t[i], self.o[i], self.h[i], self.l[i], self.c[i], self.v[i] = start, o, h, l, c, v
+        self.head = (i + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+
+    def _find(self, start):
+        # Slot of the bar starting at `start`, or None
+        order = self._order()
+        k = np.searchsorted(self.t[order], start)
+        if k < len(order) and self.t[order[k]] == start:
+            return order[k]
+        return None
+
+    def _order(self):
+        return (np.arange(self.size) + self.head - self.size) % self.capacity
+
+    def first(self):
+        return int(self.t[(self.head - self.size) % self.capacity]) if self.size else None
+
+    def last(self):
+        return int(self.t[self._last()]) if self.size else None
+
+    def add_tick(self, seconds, price, size):
+        start = seconds - seconds % self.seconds
+        last = self.last()
+        if last is None or start > last:
+            self._append(start, price, price, price, price, size)
+            return True
+        i = self._last() if start == last else self._find(start)
+        if i is None:
+            return False    # older than the ring
+        self.h[i] = max(self.h[i], price)
+        self.l[i] = min(self.l[i], price)
+        if start == last:
+            self.c[i] = price
+        self.v[i] += size
+        return False
+
+    def put_bar(self, start, o, h, l, c, v):
+        # Upstream bar replaces whatever the ticks built for that interval
+        last = self.last()
+        if last is None or start > last:
+            self._append(start, o, h, l, c, v)
+            return
+        i = self._find(start)
+        if i is not None:
+            self.o[i], self.h[i], self.l[i], self.c[i], self.v[i] = o, h, l, c, v
+
+    def seed(self, bars):
+        # Bars (e.g. from REST) older than anything in the ring yet
+        for k in range(max(0, len(bars) - self.capacity), len(bars)):
+            start = int(bars.t[k].astype(np.int64))
+            self.put_bar(start, bars.o[k], bars.h[k], bars.l[k], bars.c[k], bars.v[k])
+
+    def bars(self, start=None, end=None):
+        # Copy of the bars with start <= t <= end, oldest first
+        order = self._order()
+        t = self.t[order]
+        lo = np.searchsorted(t, start) if start is not None else 0
+        hi = np.searchsorted(t, end, side='right') if end is not None else len(t)
+        index = order[lo:hi]
+        return Bars(t=self.t[index].astype('datetime64[s]'), o=self.o[index], h=self.h[index],
+                    l=self.l[index], c=self.c[index], v=self.v[index])
+
+class MarketStream:
+
+    def __init__(self, symbol="BTC/USD", capacity=None, record_path=None, book_levels=20):
+        self.symbol = symbol
+        self.rings = {timeframe: BarRing(TIMEFRAMES[timeframe], size)
+                      for timeframe, size in (capacity or DEFAULT_CAPACITY).items()}
+        self.book_levels = book_levels
+        self.book = OrderBook(symbol)
+        self.last_trade = None
+        self.last_quote = None
+        self.updated = None
+        self.connected = False
+        self.lock = threading.RLock()
+        self.listeners = {"trade": [], "quote": [], "book": [], "bar": []}
+        self.record_path = record_path
+        self.stopped = threading.Event()
+        self.thread = None
+        self.app = None
+
+    # Events: "trade", "quote", "book" get the message; "bar" gets
+    # (timeframe, start) of a bar once the first tick of the next one arrives
+    def on(self, event, callback):
+        self.listeners[event].append(callback)
+
+    def _emit(self, event, *args):
+        for callback in self.listeners[event]:
+            try:
+                callback(*args)
+            except Exception as e:
+                logger.error(f"Stream {event} listener failed: {e}")
+
+    # State
+    def seed(self, timeframe, bars):
+        with self.lock:
+            self.rings[timeframe].seed(bars)
+
+    def fresh(self, max_age=30):
+        return self.updated is not None and time.time() - self.updated <= max_age
+
+    def covers(self, symbol, timeframe, start, max_age=30):
+        # True if this stream can answer a bars request from memory
+        ring = self.rings.get(timeframe)
+        if symbol != self.symbol or ring is None or not len(ring) or not self.fresh(max_age):
+            return False
+        return start is None or ring.first() <= epoch(start)
+
+    def bars(self, timeframe, start=None, end=None):
+        with self.lock:
+            return self.rings[timeframe].bars(epoch(start) if start else None, epoch(end) if end else None)
+
+    def order_book(self):
+        # Same shape as the REST latest/orderbooks response
+        with self.lock:
+            return self.book.to_response(self.book_levels)
+
+    def has_book(self):
+        return self.book.ready()
+
+    # Messages
+    def handle(self, messages):
+        if isinstance(messages, (str, bytes)):
+            messages = json.loads(messages)
+        if isinstance(messages, dict):
+            messages = [messages]
+        if self.record_path:
+            with open(self.record_path, "a") as f:
+                f.write(json.dumps(messages) + "\n")
+        for message in messages:
+            kind = message.get("T")
+            if kind in ("success", "subscription", "error"):
+                if kind == "error":
+                    logger.error(f"Stream error: {message}")
+                continue
+            if message.get("S") != self.symbol:
+                continue
+            closed = []
+            with self.lock:
+                if kind == "t":
+                    closed = self._on_trade(message)
+                elif kind == "q":
+                    self.last_quote = message
+                elif kind == "b":
+                    self._on_bar(message)
+                elif kind == "o":
+                    self._on_book(message)
+                self.updated = time.time()
+            if kind in EVENTS:
+                self._emit(EVENTS[kind], message)
+            for timeframe, start in closed:
+                self._emit("bar", timeframe, start)
+
+    def _on_trade(self, message):
+        # Returns (timeframe, start) of every bar this tick closed
+        self.last_trade = message
+        seconds = epoch(message["t"])
+        closed = []
+        for timeframe, ring in self.rings.items():
+            previous = ring.last()
+            if ring.add_tick(seconds, float(message["p"]), float(message["s"])) and previous is not None:
+                closed.append((timeframe, previous))
+        return closed
+
+    def _on_bar(self, message):
+        ring = self.rings.get("1Min")
+        if ring is not None:
+            ring.put_bar(epoch(message["t"]), message["o"], message["h"], message["l"], message["c"], message["v"])
+
+    def _on_book(self, message):
+        self.book.apply(message)
+
+    # Websocket
+    def connect(self, key=None, secret=None, url=STREAM_URL, channels=("trades", "quotes", "bars", "orderbooks")):
+        # Runs in a daemon thread and reconnects with backoff until stop()
+        if websocket is None:
+            raise RuntimeError("Streaming needs the websocket-client package (pip install websocket-client)")
+        key = key or os.getenv("APCA_API_KEY_ID")
+        secret = secret or os.getenv("APCA_API_SECRET_KEY")
+        subscribe = {"action": "subscribe", **{channel: [self.symbol] for channel in channels}}
+
+        def on_open(app):
+            app.send(json.dumps({"action": "auth", "key": key, "secret": secret}))
+            app.send(json.dumps(subscribe))
+            self.connected = True
+            logger.info(f"Stream connected: {url}")
+
+        def on_close(app, *args):
+            self.connected = False
+
+        def run():
+            delay = 1
+            while not self.stopped.is_set():
+                self.app = websocket.WebSocketApp(
+                    url, on_open=on_open, on_message=lambda app, message: self.handle(message),
+                    on_error=lambda app, error: logger.error(f"Stream error: {error}"), on_close=on_close)
+                started = time.time()
+                self.app.run_forever(ping_interval=20, ping_timeout=10)
+                if time.time() - started > 60:
+                    delay = 1
+                self.stopped.wait(delay)
+                delay = min(delay * 2, 60)
+
+        self.thread = threading.Thread(target=run, name="market-stream", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.stopped.set()
+        if self.app is not None:
+            self.app.close()
+
+class ReplayFeed:
+    # Plays recorded messages (one JSON list per line, as written with
+    # record_path) into a stream. speed=0 replays as fast as possible,
+    # otherwise at `speed` x the recorded pace.
+
+    def __init__(self, stream, path=None, messages=None, speed=0.0):
+        self.stream = stream
+        self.path = path
+        self.messages = messages
+        self.speed = speed
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def batches(self):
+        if self.messages is not None:
+            yield from self.messages
+            return
+        with open(self.path) as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+    def run(self):
+        previous = None
+        for batch in self.batches():
+            if self.stopped.is_set():
+                return
+            stamp = next((epoch(message["t"]) for message in batch if "t" in message), None)
+            if self.speed and previous is not None and stamp is not None and stamp > previous:
+                self.stopped.wait((stamp - previous) / self.speed)
+            previous = stamp if stamp is not None else previous
+            self.stream.handle(batch)
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run, name="market-replay", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.stopped.set()
+
+def synthetic_messages(symbol, bars, spread=5.0, levels=20):
+    # Replay batches from 1-minute Bars: four trades per bar (open, high, low,
+    # close), then the bar itself, a quote and a fresh book around the close
+    times = bars.timestamps()
+    for k in range(len(bars)):
+        start = int(bars.t[k].astype(np.int64))
+        size = bars.v[k] / 4
+        batch = []
+        for offset, price in ((0, bars.o[k]), (15, bars.h[k]), (30, bars.l[k]), (45, bars.c[k])):
+            stamp = np.datetime_as_string(np.datetime64(start + offset, 's')) + 'Z'
+            batch.append({"T": "t", "S": symbol, "p": float(price), "s": float(size), "t": stamp})
+        close = float(bars.c[k])
+        batch.append({"T": "b", "S": symbol, "t": times[k], "o": float(bars.o[k]), "h": float(bars.h[k]),
+                      "l": float(bars.l[k]), "c": close, "v": float(bars.v[k])})
+        batch.append({"T": "q", "S": symbol, "t": times[k], "bp": close - spread, "bs": 1.0,
+                      "ap": close + spread, "as": 1.0})
+        batch.append({"T": "o", "S": symbol, "t": times[k], "r": True,
+                      "b": [{"p": round(close - spread - i * 7.5, 2), "s": round(0.05 + 0.03 * i, 4)} for i in range(levels)],
+                      "a": [{"p": round(close + spread + i * 7.5, 2), "s": round(0.05 + 0.03 * i, 4)} for i in range(levels)]})
+        yield batch
@@ -1,31 +1,254 @@
-import streamlit as st
 import sqlite3
+import threading
+from datetime import datetime, timedelta
+
+import streamlit as st
 import pandas as pd
 import plotly.express as px
+import trade_store
+import analytics
+from downsample import lttb
+
+MAX_POINTS = 2000      # per chart, after LTTB
+HISTORY_ROWS = 500     # newest rows shown in the trade table
+
+RANGES = {
+  "Last 24 hours": timedelta(days=1),
+  "Last 7 days": timedelta(days=7),
+  "Last 30 days": timedelta(days=30),
+  "Last 90 days": timedelta(days=90),
+  "All": None,
+  "Custom": None,
+}
 
 def get_connection():
-  return sqlite3.connect('bitcoin_trades.db')
+  # Read-only; the WAL journal lets this run while the trader is writing
+  return trade_store.connect_readonly()
+
+def load_data(start=None, end=None, after_id=0, until_id=None, conn=None):
+  # Trades in [start, end) with after_id < id <= until_id; the timestamp index
+  # keeps this proportional to the window, not the table
+  clauses, params = ["id > ?"], [after_id]
+  if until_id is not None:
+    clauses.append("id <= ?")
+    params.append(until_id)
+  if start is not None:
+    clauses.append("timestamp >= ?")
+    params.append(start)
+  if end is not None:
+    clauses.append("timestamp < ?")
+    params.append(end)
+  own = conn is None
+  conn = conn or get_connection()
+  try:
+    query = f"SELECT * FROM trades WHERE {' AND '.join(clauses)} ORDER BY timestamp"
+    return pd.read_sql_query(query, conn, params=params)
+  finally:
+    if own:
+      conn.close()
+
+def latest_id(conn):
+  return conn.execute("SELECT COALESCE(MAX(id), 0) FROM trades").fetchone()[0]
+
+# Cache
+# ------------------------
+# One TradeCache per server process. Each rerun asks for MAX(id) only; rows and
+# totals are fetched again just for ids above the last one seen.
+
+class TradeCache:
+
+  def __init__(self):
+    self.lock = threading.Lock()
+    self.reset()
+
+  def reset(self):
+    self.last_id = 0
+    self.total = 0
+    self.first = None
+    self.last = None
+    self.loaded = False
+    self.start = None
+    self.rows = None
+    self.rows_id = 0
+
+  def covers(self, start):
+    return self.loaded and (self.start is None or (start is not None and start >= self.start))
+
+  def sync(self, conn):
+    # Totals up to the newest id; returns that id
+    newest = latest_id(conn)
+    if newest < self.last_id:
+      # Table was cleared or replaced
+      self.reset()
+    if newest > self.last_id:
+      self.update_totals(conn, newest)
+      self.last_id = newest
+    return newest
+
+  def refresh(self, start=None):
+    # Rows from start up to now
+    with self.lock:
+      conn = get_connection()
+      try:
+        newest = self.sync(conn)
+        if not self.covers(start):
+          self.rows = load_data(start=start, until_id=newest, conn=conn)
+          self.loaded = True
+        elif newest > self.rows_id:
+          new = load_data(start=start, after_id=self.rows_id, until_id=newest, conn=conn)
+          if len(new):
+            self.rows = pd.concat([self.rows, new], ignore_index=True)
+        if start is not None and self.start != start:
+          self.rows = self.rows[self.rows['timestamp'] >= start].reset_index(drop=True)
+        self.start = start
+        self.rows_id = newest
+        return self.rows
+      finally:
+        conn.close()
+
+  def refresh_totals(self):
+    with self.lock:
+      conn = get_connection()
+      try:
+        return self.sync(conn)
+      finally:
+        conn.close()
 
-def load_data():
+  def update_totals(self, conn, newest):
+    count, first, last = conn.execute(
+      "SELECT COUNT(*), MIN(timestamp), MAX(timestamp) FROM trades WHERE id > ? AND id <= ?",
+      (self.last_id, newest)).fetchone()
+    if not count:
+      return
+    self.total += count
+    self.first = first if self.first is None else min(self.first, first)
+    self.last = last if self.last is None else max(self.last, last)
+
+@st.cache_resource
+def get_cache():
+  return TradeCache()
+
+@st.cache_data(max_entries=8)
+def load_window(start, end, newest):
+  # Closed custom ranges; newest is only part of the cache key
+  return load_data(start=start, end=end, until_id=newest)
+
+def rollup_level(start, end):
+  # Hourly buckets for windows up to two weeks, daily beyond that
+  if start is None:
+    return 'day'
+  span = (datetime.fromisoformat(end) if end else datetime.now()) - datetime.fromisoformat(start)
+  return 'hour' if span <= timedelta(days=14) else 'day'
+
+@st.cache_data(max_entries=16)
+def load_performance(start, end, newest, symbol=trade_store.DEFAULT_SYMBOL, account=trade_store.DEFAULT_ACCOUNT):
+  # Window lookups on the rollup tables the trader maintains; newest is only
+  # part of the cache key
+  level = rollup_level(start, end)
   conn = get_connection()
-  query = "SELECT * FROM trades"
-  df = pd.read_sql_query(query, conn)
-  conn.close()
-  return df
+  try:
+    return (trade_store.performance(conn, start, end, level, symbol, account),
+            trade_store.equity_series(conn, start, end, level, symbol, account))
+  except sqlite3.OperationalError:
+    # Rollup tables are created when the trader opens the database
+    return None, None
+  finally:
+    conn.close()
+
+@st.cache_data(max_entries=16)
+def risk(_df, key):
+  # Whole-window summary and a downsampled drawdown curve
+  portfolio = analytics.from_frame(_df)
+  curve = pd.DataFrame({'timestamp': portfolio.t, 'drawdown_pct': analytics.drawdown(analytics.equity_curve(portfolio)) * 100})
+  return analytics.summary(portfolio), lttb(curve, 'timestamp', 'drawdown_pct', MAX_POINTS)
+
+@st.cache_data(max_entries=4)
+def load_targets(newest):
+  conn = get_connection()
+  try:
+    return trade_store.targets(conn)
+  except sqlite3.OperationalError:
+    return []
+  finally:
+    conn.close()
+
+def select_target(newest):
+  # (symbol, account); only shown once more than one has been traded
+  targets = load_targets(newest)
+  if len(targets) <= 1:
+    return None
+  default = (trade_store.DEFAULT_SYMBOL, trade_store.DEFAULT_ACCOUNT)
+  return st.sidebar.selectbox("Symbol", targets, index=targets.index(default) if default in targets else 0,
+                              format_func=lambda target: f"{target[0]}@{target[1]}" if target[1] else target[0])
+
+def select_range():
+  label = st.sidebar.selectbox("Time range", list(RANGES), index=1)
+  if label == "Custom":
+    today = datetime.now().date()
+    picked = st.sidebar.date_input("Dates", (today - timedelta(days=7), today))
+    if len(picked) != 2:
+      st.stop()
+    return picked[0].isoformat(), (picked[1] + timedelta(days=1)).isoformat()
+  if RANGES[label] is None:
+    return None, None
+  # Whole minutes so reruns within the same minute share a window start
+  start = datetime.now().replace(second=0, microsecond=0) - RANGES[label]
+  return start.isoformat(), None
+
+@st.cache_data(max_entries=32)
+def series(_df, key, column):
+  # LTTB-downsampled column; key (range and newest id) stands in for hashing _df
+  frame = _df[['timestamp', column]].copy()
+  frame['timestamp'] = pd.to_datetime(frame['timestamp'], format='ISO8601')
+  return lttb(frame, 'timestamp', column, MAX_POINTS)
 
 def main():
   st.title("Bitcoin Trades Viewer")
 
-  df = load_data()
+  cache = get_cache()
+  start, end = select_range()
+  if end is None:
+    df = cache.refresh(start)
+  else:
+    df = load_window(start, end, cache.refresh_totals())
+  target = select_target(cache.last_id)
+  if target is not None:
+    df = df[(df['symbol'] == target[0]) & (df['account'] == target[1])]
+  key = (start, end, cache.last_id, target)
 
   st.header("Basic Statistics")
-  st.write(f"Total number of trades:{len(df)}")
-  st.write(f"First trade data: {df['timestamp'].min()}")
-  st.write(f"Last trade data: {df['timestamp'].max()}")
+  st.write(f"Total number of trades:{cache.total}")
+  st.write(f"First trade data: {cache.first}")
+  st.write(f"Last trade data: {cache.last}")
+  st.write(f"Trades in selected range: {len(df)}")
+
+  st.header("Performance")
+  performance, equity = load_performance(start, end, cache.last_id,
+                                         *(target or (trade_store.DEFAULT_SYMBOL, trade_store.DEFAULT_ACCOUNT)))
+  if performance is None:
+    st.info("No performance rollups yet; they are created when the trader next starts.")
+  else:
+    columns = st.columns(4)
+    columns[0].metric("Return", f"{performance['return_pct']:.2f}%")
+    columns[1].metric("Realized PnL", f"{performance['realized_pnl']:,.2f} USD")
+    columns[2].metric("Unrealized PnL", f"{performance['unrealized_pnl']:,.2f} USD")
+    columns[3].metric("Trades", f"{performance['trades']}")
+    fig = px.line(equity, x='bucket', y='close_equity', title='Equity (USD)')
+    st.plotly_chart(fig)
+
+  stats, drawdown = risk(df, key)
+  columns = st.columns(4)
+  columns[0].metric("Max drawdown", f"{stats['max_drawdown_pct']:.2f}%")
+  columns[1].metric("Sharpe / Sortino", f"{stats['sharpe']:.2f} / {stats['sortino']:.2f}")
+  columns[2].metric("Win rate", f"{stats['win_rate_pct']:.1f}%")
+  columns[3].metric("BTC exposure", f"{stats['exposure_pct']:.1f}%")
+  fig = px.area(drawdown, x='timestamp', y='drawdown_pct', title='Drawdown (%)')
+  st.plotly_chart(fig)
 
   # 거래 내역
   st.header("Trade History")
-  st.dataframe(df)
+  st.caption(f"Newest {min(len(df), HISTORY_ROWS)} of {len(df)} trades in range")
+  st.dataframe(df.iloc[::-1].head(HISTORY_ROWS))
 
   # 거래 분포
   st.header("Trade Decision Distrubution")
@@ -35,20 +258,18 @@ def main():
 
   # BTC 잔액 변화
   st.header('BTC Balance Over Time')
-  fig = px.line(df, x='timestamp', y='btc_balance', title = 'BTC Balance')
+  fig = px.line(series(df, key, 'btc_balance'), x='timestamp', y='btc_balance', title = 'BTC Balance')
   st.plotly_chart(fig)
 
   # USD 잔액 변화
   st.header('USD Balance Over Time')
-  fig = px.line(df, x="timestamp", y = "usd_balance", title="USD Balance")
+  fig = px.line(series(df, key, 'usd_balance'), x="timestamp", y = "usd_balance", title="USD Balance")
   st.plotly_chart(fig)
 
   # BTC 가격 변화
   st.header('BTC Price Over Time')
-  fig = px.line(df, x='timestamp', y = "btc_usd_price", title="BTC Price (USD)")
+  fig = px.line(series(df, key, 'btc_usd_price'), x='timestamp', y = "btc_usd_price", title="BTC Price (USD)")
   st.plotly_chart(fig)
 
 if __name__ == "__main__":
   main()
-
-
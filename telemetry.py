@@ -0,0 +1,272 @@
+import os
+import sys
+import json
+import time
+import sqlite3
+import logging
+import cProfile
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+# Telemetry
+# ------------------------
+# Timings and counters for the trading cycle, kept in memory and exported
+# when each cycle ends:
+#   stage_seconds{stage, symbol}        gather_inputs, get_decision, execute_decision, ...
+#   source_seconds{source}              each gathered input (bars, chart, news, ...)
+#   http_request_seconds{endpoint, status}
+#   llm_seconds{call}, llm_tokens_total{call, kind}
+#   db_write_seconds{table}
+# TELEMETRY_PROM is a Prometheus textfile (node_exporter textfile collector)
+# rewritten with the running totals; TELEMETRY_DB is an SQLite file that gets
+# one row per span or counter increment, tagged with the cycle. Either can be
+# set to "" to turn it off. configure(profile_dir=...) also writes a profile
+# per cycle: "sample" polls every thread's stack (collapsed stacks, for
+# flamegraph.pl / speedscope), "cprofile" profiles the cycle thread only.
+
+PREFIX = "aibitcoin_"
+PROM_PATH = os.getenv("TELEMETRY_PROM", "metrics.prom")
+DB_PATH = os.getenv("TELEMETRY_DB", "")
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+MAX_SAMPLES = 100000        # per cycle, for the SQLite export
+
+HELP = {
+    "stage_seconds": "Time spent in each stage of the trading cycle",
+    "source_seconds": "Time to gather each input source",
+    "http_request_seconds": "HTTP request latency by endpoint and status",
+    "llm_seconds": "OpenAI chat completion latency",
+    "llm_tokens_total": "OpenAI tokens used",
+    "db_write_seconds": "Trade store write time by table",
+    "cycles_total": "Trading cycles run",
+}
+
+def _key(labels):
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+def _labels(key, extra=()):
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ""
+    escape = lambda value: value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return "{" + ",".join(f'{name}="{escape(value)}"' for name, value in pairs) + "}"
+
+class SamplingProfiler:
+    # Stacks of every thread every `interval` seconds, counted per unique stack
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.stacks = Counter()
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run, name="sampling-profiler", daemon=True)
+        self.thread.start()
+        return self
+
+    def run(self):
+        me = threading.get_ident()
+        while not self.stopped.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                self.stacks[";".join([names.get(ident, str(ident))] + stack[::-1])] += 1
+
+    def stop(self, path):
+        self.stopped.set()
+        self.thread.join()
+        with open(path, "w") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+class Telemetry:
+
+    def __init__(self, prom_path=PROM_PATH, db_path=DB_PATH):
+        self.prom_path = prom_path
+        self.db_path = db_path
+        self.lock = threading.Lock()
+        self.histograms = {}    # (metric, labels) -> [count, sum, bucket counts]
+        self.counters = {}      # (metric, labels) -> value
+        self.samples = []
+        self.cycle_id = None
+        self.cycle_depth = 0
+        self.profile_dir = None
+        self.profiler = "sample"
+
+    def configure(self, prom_path=None, db_path=None, profile_dir=None, profiler=None):
+        if prom_path is not None:
+            self.prom_path = prom_path
+        if db_path is not None:
+            self.db_path = db_path
+        if profile_dir is not None:
+            os.makedirs(profile_dir, exist_ok=True)
+            self.profile_dir = profile_dir
+        if profiler is not None:
+            self.profiler = profiler
+
+    # Recording
+    def observe(self, metric, seconds, **labels):
+        key = _key(labels)
+        with self.lock:
+            histogram = self.histograms.get((metric, key))
+            if histogram is None:
+                histogram = self.histograms[(metric, key)] = [0, 0.0, [0] * len(BUCKETS)]
+            histogram[0] += 1
+            histogram[1] += seconds
+            for i, bound in enumerate(BUCKETS):
+                if seconds <= bound:
+                    histogram[2][i] += 1
+            self._sample(metric, key, seconds)
+
+    def inc(self, metric, value=1, **labels):
+        key = _key(labels)
+        with self.lock:
+            self.counters[(metric, key)] = self.counters.get((metric, key), 0) + value
+            self._sample(metric, key, value)
+
+    def _sample(self, metric, key, value):
+        if self.cycle_id is not None and self.db_path and len(self.samples) < MAX_SAMPLES:
+            self.samples.append((self.cycle_id, metric, json.dumps(dict(key)), time.time(), value))
+
+    @contextmanager
+    def span(self, metric, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(metric, time.perf_counter() - start, **labels)
+
+    def llm_usage(self, call, usage):
+        # usage: the completion's usage object (prompt_tokens, completion_tokens)
+        if usage is None:
+            return
+        self.inc("llm_tokens_total", getattr(usage, "prompt_tokens", 0) or 0, call=call, kind="prompt")
+        self.inc("llm_tokens_total", getattr(usage, "completion_tokens", 0) or 0, call=call, kind="completion")
+
+    # Cycles
+    @contextmanager
+    def cycle(self, name=None):
+        # Outermost call exports and profiles; nested calls just run
+        with self.lock:
+            self.cycle_depth += 1
+            outer = self.cycle_depth == 1
+            if outer:
+                self.cycle_id = name or datetime.now().isoformat()
+                self.samples = []
+        profiler = self._start_profile() if outer else None
+        try:
+            yield
+        finally:
+            if outer:
+                self.inc("cycles_total")
+                self._stop_profile(profiler)
+                self.export()
+            with self.lock:
+                self.cycle_depth -= 1
+                if outer:
+                    self.cycle_id = None
+
+    def _start_profile(self):
+        if not self.profile_dir:
+            return None
+        if self.profiler == "cprofile":
+            profile = cProfile.Profile()
+            profile.enable()
+            return profile
+        return SamplingProfiler().start()
+
+    def _stop_profile(self, profiler):
+        if profiler is None:
+            return
+        stamp = self.cycle_id.replace(":", "").replace("-", "")
+        try:
+            if isinstance(profiler, cProfile.Profile):
+                profiler.disable()
+                profiler.dump_stats(os.path.join(self.profile_dir, f"cycle-{stamp}.prof"))
+            else:
+                profiler.stop(os.path.join(self.profile_dir, f"cycle-{stamp}.folded"))
+        except Exception as e:
+            logger.error(f"Could not write profile: {e}")
+
+    # Export
+    def export(self):
+        try:
+            if self.prom_path:
+                self.write_prometheus(self.prom_path)
+            if self.db_path:
+                self.write_sqlite(self.db_path)
+        except Exception as e:
+            logger.error(f"Telemetry export failed: {e}")
+
+    def prometheus(self):
+        with self.lock:
+            histograms = {key: (count, total, list(buckets)) for key, (count, total, buckets) in self.histograms.items()}
+            counters = dict(self.counters)
+        lines = []
+        for metric in sorted({metric for metric, _ in histograms}):
+            name = PREFIX + metric
+            lines += [f"# HELP {name} {HELP.get(metric, metric)}", f"# TYPE {name} histogram"]
+            for (other, key), (count, total, buckets) in sorted(histograms.items()):
+                if other != metric:
+                    continue
+                for bound, value in zip(BUCKETS, buckets):
+                    lines.append(f"{name}_bucket{_labels(key, [('le', f'{bound:g}')])} {value}")
+                lines.append(f"{name}_bucket{_labels(key, [('le', '+Inf')])} {count}")
+                lines.append(f"{name}_sum{_labels(key)} {total:.6f}")
+                lines.append(f"{name}_count{_labels(key)} {count}")
+        for metric in sorted({metric for metric, _ in counters}):
+            name = PREFIX + metric
+            lines += [f"# HELP {name} {HELP.get(metric, metric)}", f"# TYPE {name} counter"]
+            for (other, key), value in sorted(counters.items()):
+                if other == metric:
+                    lines.append(f"{name}{_labels(key)} {value}")
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path):
+        # Write then rename, so the collector never reads half a file
+        temporary = f"{path}.{os.getpid()}.tmp"
+        with open(temporary, "w") as f:
+            f.write(self.prometheus())
+        os.replace(temporary, path)
+
+    def write_sqlite(self, path):
+        with self.lock:
+            samples, self.samples = self.samples, []
+        conn = sqlite3.connect(path)
+        try:
+            conn.execute('''CREATE TABLE IF NOT EXISTS samples
+            (cycle TEXT, metric TEXT, labels TEXT, at REAL, value REAL)''')
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_samples_cycle ON samples (cycle, metric)")
+            conn.executemany("INSERT INTO samples VALUES (?, ?, ?, ?, ?)", samples)
+            conn.commit()
+        finally:
+            conn.close()
+
+    def reset(self):
+        with self.lock:
+            self.histograms.clear()
+            self.counters.clear()
+            self.samples = []
+
+_telemetry = Telemetry()
+
+def get_telemetry():
+    return _telemetry
+
+# Module-level shortcuts on the process-wide instance
+configure = _telemetry.configure
+observe = _telemetry.observe
+inc = _telemetry.inc
+span = _telemetry.span
+llm_usage = _telemetry.llm_usage
+cycle = _telemetry.cycle
@@ -0,0 +1,15 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import telemetry
+
+
+@pytest.fixture(autouse=True)
+def no_metrics_file(monkeypatch):
+    # Cycles run in tests would otherwise rewrite metrics.prom in the repo
+    monkeypatch.setattr(telemetry.get_telemetry(), "prom_path", "")
+    monkeypatch.setattr(telemetry.get_telemetry(), "db_path", "")
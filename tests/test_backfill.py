@@ -0,0 +1,89 @@
+import threading
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from alpaca import CryptoTrader
+
+START = datetime(2024, 1, 1)
+MINUTES = 3 * 1440
+
+
+def minute_times(count=MINUTES):
+    return [(START + timedelta(minutes=i)).strftime('%Y-%m-%dT%H:%M:%SZ') for i in range(count)]
+
+
+class FakeResponse:
+
+    def __init__(self, body):
+        self.body = body
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self.body
+
+
+class PagedBars:
+    # Bars endpoint: start and end are both inclusive, as Alpaca's are, so
+    # neighbouring slices overlap at their shared boundary; pages of `limit`
+
+    def __init__(self, symbols, times):
+        self.bars = {symbol: [{"t": t, "o": i, "h": i, "l": i, "c": i, "v": 1.0, "n": 1}
+                              for i, t in enumerate(times)] for symbol in symbols}
+        self.requests = 0
+        self.lock = threading.Lock()
+
+    def get(self, url, params=None, headers=None):
+        with self.lock:
+            self.requests += 1
+        offset = int(params.get("page_token") or 0)
+        symbol = params["symbols"]
+        matching = [bar for bar in self.bars[symbol] if params["start"] <= bar["t"] <= params["end"]]
+        page = matching[offset:offset + params["limit"]]
+        token = str(offset + params["limit"]) if offset + params["limit"] < len(matching) else None
+        return FakeResponse({"bars": {symbol: page}, "next_page_token": token})
+
+
+def trader(session):
+    crypto_trader = CryptoTrader(bar_store=object())
+    crypto_trader.session = session
+    return crypto_trader
+
+
+def test_every_bar_once_across_slices_and_symbols():
+    times = minute_times()
+    session = PagedBars(["BTC/USD", "ETH/USD"], times)
+    seen = {"BTC/USD": [], "ETH/USD": []}
+    # The range ends on the last bar, which belongs to the last slice and is kept
+    for symbol, bars in trader(session).backfill(["BTC/USD", "ETH/USD"], start=times[0], end=times[-1],
+                                                slice_days=1, max_workers=3, requests_per_minute=100000, limit=500):
+        seen[symbol].extend(bars.timestamps())
+    for symbol, stamps in seen.items():
+        assert sorted(stamps) == times, symbol
+        assert len(set(stamps)) == len(stamps)
+
+
+def test_bars_keep_their_values():
+    times = minute_times(300)
+    session = PagedBars(["BTC/USD"], times)
+    chunks = list(trader(session).backfill("BTC/USD", start=times[0], end=times[-1], slice_days=1,
+                                           requests_per_minute=100000, limit=50))
+    closes = np.sort(np.concatenate([bars.c for _, bars in chunks]))
+    assert list(closes) == list(range(300))
+
+
+def test_closing_the_generator_stops_the_workers():
+    times = minute_times()
+    session = PagedBars(["BTC/USD"], times)
+    chunks = trader(session).backfill("BTC/USD", start=times[0], end=times[-1], slice_days=1, max_workers=2,
+                                      requests_per_minute=100000, limit=10)
+    next(chunks)
+    chunks.close()
+    time.sleep(1.0)
+    settled = session.requests
+    time.sleep(0.3)
+    assert session.requests == settled
+    assert settled < MINUTES // 10
@@ -0,0 +1,134 @@
+import pytest
+
+import execution
+from execution import MAX_FAILURES, MAX_ORDER_USD, ExecutionEngine
+
+
+class FakeExchange:
+    # Fills each child at `price` (fill_ratio of what was asked), or rejects it.
+    # Depth is the BTC size near mid on each side, read by book_features()
+
+    def __init__(self, mid=100.0, price=None, depth=0.0, fill_ratio=1.0, reject=False, fail=False):
+        self.mid = mid
+        self.price = price or mid
+        self.depth = depth
+        self.fill_ratio = fill_ratio
+        self.reject = reject
+        self.fail = fail
+        self.orders = []
+
+    def book_features(self):
+        features = {"mid": self.mid}
+        for bps in execution.DEPTH_BPS:
+            features[f"depth_{bps}bps_bid"] = features[f"depth_{bps}bps_ask"] = self.depth
+        return features
+
+    def price_estimate(self, side):
+        return self.mid
+
+    def submit_order(self, side, notional=None, qty=None):
+        self.orders.append((side, notional, qty))
+        if self.fail:
+            raise RuntimeError("connection reset")
+        if self.reject:
+            return {"id": str(len(self.orders)), "status": "rejected", "filled_qty": "0"}
+        filled = (qty if qty is not None else notional / self.price) * self.fill_ratio
+        return {"id": str(len(self.orders)), "status": "filled", "filled_qty": str(filled),
+                "filled_avg_price": str(self.price), "commission": "0"}
+
+
+def engine(exchange, strategy, **kwargs):
+    sleeps = []
+    return ExecutionEngine(exchange, strategy=strategy, sleep=sleeps.append, **kwargs), sleeps
+
+
+def test_twap_slices_at_the_order_cap():
+    exchange = FakeExchange()
+    twap, sleeps = engine(exchange, "twap", duration=60)
+    report = twap.execute("buy", notional=2.5 * MAX_ORDER_USD)
+    # ceil(2.5) slices, equal in size, spread evenly over the duration
+    assert [notional for _, notional, _ in exchange.orders] == pytest.approx([2.5 * MAX_ORDER_USD / 3] * 3)
+    assert sleeps == pytest.approx([20, 20])
+    assert report["complete"] and report["children"] == 3
+    assert report["filled_notional"] == pytest.approx(2.5 * MAX_ORDER_USD)
+
+
+def test_twap_small_order_is_one_child():
+    exchange = FakeExchange()
+    twap, sleeps = engine(exchange, "twap")
+    assert twap.execute("buy", notional=1000)["children"] == 1
+    assert sleeps == []
+
+
+def test_twap_sells_in_btc():
+    exchange = FakeExchange(mid=100000.0)
+    twap, _ = engine(exchange, "twap", duration=10)
+    report = twap.execute("sell", qty=3.0)
+    assert [qty for _, _, qty in exchange.orders] == pytest.approx([1.5, 1.5])
+    assert report["unit"] == "BTC" and report["filled_qty"] == pytest.approx(3.0)
+
+
+def test_participation_caps_children_at_depth():
+    # 25% of 10 BTC at 100 USD: children of at most 250 USD
+    exchange = FakeExchange(depth=10.0)
+    participation, sleeps = engine(exchange, "participation", participation=0.25, pause=0.5)
+    report = participation.execute("buy", notional=1000)
+    assert [notional for _, notional, _ in exchange.orders] == pytest.approx([250] * 4)
+    assert sleeps == [0.5] * 3
+    assert report["complete"]
+
+
+def test_participation_without_depth_uses_the_order_cap():
+    exchange = FakeExchange(depth=0.0)
+    participation, _ = engine(exchange, "participation")
+    participation.execute("buy", notional=1.5 * MAX_ORDER_USD)
+    assert [notional for _, notional, _ in exchange.orders] == pytest.approx([MAX_ORDER_USD, 0.5 * MAX_ORDER_USD])
+
+
+def test_iceberg_children():
+    exchange = FakeExchange()
+    iceberg, _ = engine(exchange, "iceberg", iceberg_usd=400)
+    iceberg.execute("buy", notional=1000)
+    assert [notional for _, notional, _ in exchange.orders] == pytest.approx([400, 400, 200])
+
+
+def test_iceberg_is_held_to_the_order_cap():
+    exchange = FakeExchange()
+    iceberg, _ = engine(exchange, "iceberg", iceberg_usd=10 * MAX_ORDER_USD)
+    iceberg.execute("buy", notional=1.5 * MAX_ORDER_USD)
+    assert max(notional for _, notional, _ in exchange.orders) == MAX_ORDER_USD
+
+
+def test_partial_fills_are_worked_to_completion():
+    exchange = FakeExchange(fill_ratio=0.5)
+    iceberg, _ = engine(exchange, "iceberg", iceberg_usd=400)
+    report = iceberg.execute("buy", notional=1000)
+    assert report["complete"]
+    assert report["filled_notional"] == pytest.approx(1000, abs=execution.MIN_ORDER_USD)
+    assert report["children"] > 3
+
+
+@pytest.mark.parametrize("exchange", [FakeExchange(reject=True), FakeExchange(fail=True)])
+def test_stops_after_unfilled_children(exchange):
+    twap, _ = engine(exchange, "twap")
+    report = twap.execute("buy", notional=1000)
+    assert len(exchange.orders) == MAX_FAILURES
+    assert not report["complete"]
+    assert report["filled_qty"] == 0 and report["avg_price"] is None and report["slippage_bps"] is None
+
+
+@pytest.mark.parametrize("side,price", [("buy", 101.0), ("sell", 99.0)])
+def test_slippage_against_arrival_mid(side, price):
+    exchange = FakeExchange(mid=100.0, price=price)
+    twap, _ = engine(exchange, "twap")
+    report = twap.execute(side, notional=1000) if side == "buy" else twap.execute(side, qty=10.0)
+    assert report["arrival_mid"] == 100.0
+    assert report["avg_price"] == pytest.approx(price)
+    assert report["slippage_bps"] == pytest.approx(100.0)
+
+
+def test_no_price_sends_nothing():
+    exchange = FakeExchange(mid=None)
+    twap, _ = engine(exchange, "twap")
+    assert twap.execute("buy", notional=1000) is None
+    assert exchange.orders == []
@@ -0,0 +1,130 @@
+import threading
+import time
+
+import pytest
+
+from feed_cache import FeedCache
+
+URL = "https://feeds.example/fng"
+
+
+class FakeResponse:
+
+    def __init__(self, status_code=200, body=None, headers=None):
+        self.status_code = status_code
+        self.body = body
+        self.headers = headers or {}
+
+    def json(self):
+        return self.body
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise RuntimeError(f"HTTP {self.status_code}")
+
+
+class FakeSession:
+    # Answers with the queued responses in order; records the request headers
+
+    def __init__(self, *responses, delay=0.0):
+        self.responses = list(responses)
+        self.delay = delay
+        self.requests = []
+        self.release = threading.Event()
+
+    def get(self, url, params=None, headers=None):
+        self.requests.append(dict(headers or {}))
+        if self.delay:
+            self.release.wait(self.delay)
+        return self.responses.pop(0)
+
+
+def parse(body):
+    return body["value"]
+
+
+@pytest.fixture
+def cache_path(tmp_path):
+    return str(tmp_path / "feeds.db")
+
+
+def settle(cache):
+    # Wait for the background refreshes
+    cache.executor.shutdown(wait=True)
+
+
+def expire(cache, key, age):
+    # Pretend the entry was fetched `age` seconds ago and is past its TTL
+    entry = cache.entries[key]
+    entry["fetched_at"] = time.time() - age
+    entry["expires_at"] = time.time() - 1
+
+
+def test_fresh_entry_needs_no_request(cache_path):
+    session = FakeSession(FakeResponse(body={"value": 1}))
+    cache = FeedCache(cache_path, session=session)
+    assert cache.get("fng", URL, parse) == 1
+    assert cache.get("fng", URL, parse) == 1
+    assert len(session.requests) == 1
+
+
+def test_stale_entry_served_while_revalidating(cache_path):
+    session = FakeSession(FakeResponse(body={"value": 1}), FakeResponse(body={"value": 2}))
+    cache = FeedCache(cache_path, session=session)
+    cache.get("fng", URL, parse)
+    expire(cache, "fng", age=100)
+
+    assert cache.get("fng", URL, parse, stale=86400) == 1
+    settle(cache)
+    assert cache.entries["fng"]["value"] == 2
+    assert len(session.requests) == 2
+
+
+def test_etag_and_not_modified(cache_path):
+    session = FakeSession(FakeResponse(body={"value": 1}, headers={"ETag": '"v1"', "Last-Modified": "Mon"}),
+                          FakeResponse(status_code=304))
+    cache = FeedCache(cache_path, session=session)
+    cache.get("fng", URL, parse)
+    expire(cache, "fng", age=100)
+    cache.get("fng", URL, parse)
+    settle(cache)
+
+    assert session.requests[1] == {"If-None-Match": '"v1"', "If-Modified-Since": "Mon"}
+    entry = cache.entries["fng"]
+    assert entry["value"] == 1
+    assert entry["expires_at"] > time.time()
+    assert entry["etag"] == '"v1"'
+
+
+def test_wait_is_bounded_without_a_usable_value(cache_path):
+    session = FakeSession(FakeResponse(body={"value": 1}), delay=5)
+    cache = FeedCache(cache_path, session=session)
+    started = time.monotonic()
+    assert cache.get("fng", URL, parse, wait=0.05) is None
+    assert time.monotonic() - started < 1
+    session.release.set()
+    settle(cache)
+    assert cache.entries["fng"]["value"] == 1
+
+
+def test_failed_refresh_keeps_value_and_backs_off(cache_path):
+    session = FakeSession(FakeResponse(body={"value": 1}), FakeResponse(status_code=500))
+    cache = FeedCache(cache_path, session=session)
+    cache.get("fng", URL, parse)
+    expire(cache, "fng", age=100)
+    cache.get("fng", URL, parse)
+    settle(cache)
+    assert cache.entries["fng"]["value"] == 1
+    # Backing off: no new request, the old value is served
+    assert cache._refresh("fng", URL, parse, None, 3600) is None
+    assert len(session.requests) == 2
+
+
+def test_restart_starts_warm(cache_path):
+    cache = FeedCache(cache_path, session=FakeSession(FakeResponse(body={"value": [1, 2]})))
+    cache.get("news", URL, parse, ttl=lambda value: 600)
+    cache.conn.close()
+
+    session = FakeSession()
+    assert FeedCache(cache_path, session=session).get("news", URL, parse) == [1, 2]
+    assert session.requests == []
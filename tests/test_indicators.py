@@ -0,0 +1,83 @@
+import numpy as np
+import pandas as pd
+import pytest
+import ta
+
+import indicators
+from indicators import INDICATOR_COLUMNS, IndicatorEngine
+
+
+def make_bars(n=300, seed=1):
+    rng = np.random.default_rng(seed)
+    close = 30000 * np.exp(np.cumsum(rng.normal(0, 0.01, n)))
+    t = pd.date_range("2024-01-01", periods=n, freq="h").strftime("%Y-%m-%dT%H:%M:%SZ")
+    return pd.DataFrame({"t": t, "o": close, "h": close * 1.01, "l": close * 0.99, "c": close,
+                         "v": rng.uniform(1, 10, n)})
+
+
+def assert_same(left, right):
+    for column in INDICATOR_COLUMNS:
+        np.testing.assert_allclose(left[column].to_numpy(dtype=float), right[column].to_numpy(dtype=float),
+                                   rtol=1e-9, atol=1e-9, equal_nan=True, err_msg=column)
+
+
+def test_compute_matches_ta():
+    df = make_bars()
+    result = indicators.compute(df)
+    close = df["c"]
+    bands = ta.volatility.BollingerBands(close=close, window=20, window_dev=2)
+    macd = ta.trend.MACD(close=close)
+    expected = pd.DataFrame({
+        "bb_bbm": bands.bollinger_mavg(), "bb_bbh": bands.bollinger_hband(), "bb_bbl": bands.bollinger_lband(),
+        "rsi": ta.momentum.RSIIndicator(close=close, window=14).rsi(),
+        "macd": macd.macd(), "macd_signal": macd.macd_signal(), "macd_diff": macd.macd_diff(),
+        "sma_20": ta.trend.SMAIndicator(close=close, window=20).sma_indicator(),
+        "ema_12": ta.trend.EMAIndicator(close=close, window=12).ema_indicator(),
+    })
+    assert_same(result, expected)
+
+
+def test_engine_matches_batch():
+    df = make_bars()
+    engine = IndicatorEngine(history=len(df))
+    engine.update_many(df.to_dict("records"))
+    assert_same(engine.frame(), indicators.compute(df))
+
+
+def test_resent_last_bar_replaces_it():
+    df = make_bars()
+    engine = IndicatorEngine(history=len(df))
+    records = df.to_dict("records")
+    engine.update_many(records)
+    # The still-forming bar comes again with a new close
+    partial = dict(records[-1], c=records[-1]["c"] * 1.02)
+    engine.update(partial)
+    engine.update(partial)
+
+    expected = df.copy()
+    expected.loc[expected.index[-1], "c"] = partial["c"]
+    assert len(engine.rows) == len(df)
+    assert_same(engine.frame(), indicators.compute(expected))
+
+
+def test_older_bar_is_ignored():
+    df = make_bars(50)
+    engine = IndicatorEngine()
+    records = df.to_dict("records")
+    engine.update_many(records)
+    assert engine.update(records[10]) is None
+    assert engine.count == len(df)
+
+
+def test_saved_state_continues(tmp_path):
+    df = make_bars()
+    records = df.to_dict("records")
+    engine = IndicatorEngine(history=len(df))
+    engine.update_many(records[:200])
+    engine.save(tmp_path / "state.json")
+
+    loaded = IndicatorEngine.load(tmp_path / "state.json")
+    loaded.update_many(records[200:])
+    engine.update_many(records[200:])
+    assert_same(loaded.frame(), engine.frame())
+    assert loaded.rows[-1]["rsi"] == pytest.approx(engine.rows[-1]["rsi"])
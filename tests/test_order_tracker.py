@@ -0,0 +1,130 @@
+import threading
+
+import pytest
+
+from execution import ExecutionEngine
+from order_tracker import FEE_RATE, OrderTracker, expected_position, fill_summary
+
+
+class FakeTrader:
+
+    def __init__(self, orders=(), snapshots=()):
+        self.orders = list(orders)
+        self.snapshots = list(snapshots)
+        self.order_calls = 0
+        self.snapshot_calls = 0
+
+    def get_order(self, order_id):
+        self.order_calls += 1
+        return self.orders.pop(0) if len(self.orders) > 1 else self.orders[0]
+
+    def account_snapshot(self):
+        self.snapshot_calls += 1
+        return self.snapshots.pop(0) if len(self.snapshots) > 1 else self.snapshots[0]
+
+
+def tracker(trader, timeout=1.0):
+    return OrderTracker(trader, initial_delay=0.001, max_delay=0.005, timeout=timeout)
+
+
+def test_wait_polls_until_terminal():
+    trader = FakeTrader(orders=[{"id": "a", "status": "new"}, {"id": "a", "status": "partially_filled"},
+                                {"id": "a", "status": "filled", "filled_qty": "0.5"}])
+    order = tracker(trader).wait({"id": "a", "status": "accepted"})
+    assert order["status"] == "filled"
+    assert trader.order_calls == 3
+
+
+def test_wait_returns_latest_at_timeout():
+    trader = FakeTrader(orders=[{"id": "a", "status": "new"}])
+    assert tracker(trader, timeout=0.02).wait({"id": "a", "status": "accepted"})["status"] == "new"
+
+
+def test_pushed_update_wakes_wait():
+    trader = FakeTrader(orders=[{"id": "a", "status": "new"}])
+    orders = OrderTracker(trader, initial_delay=5, max_delay=5, timeout=5)
+    threading.Timer(0.05, orders.update, [{"id": "a", "status": "filled"}]).start()
+    assert orders.wait({"id": "a", "status": "accepted"})["status"] == "filled"
+    assert trader.order_calls == 0
+
+
+def test_reconcile_waits_for_position():
+    trader = FakeTrader(snapshots=[{"btc_balance": 0.0}, {"btc_balance": 0.0}, {"btc_balance": 0.5}])
+    assert tracker(trader).reconcile(expected_btc=0.5)["btc_balance"] == 0.5
+    assert trader.snapshot_calls == 3
+
+
+def test_reconcile_gives_up_at_timeout():
+    trader = FakeTrader(snapshots=[{"btc_balance": 0.0}])
+    assert tracker(trader, timeout=0.02).reconcile(expected_btc=0.5)["btc_balance"] == 0.0
+
+
+def test_reconcile_without_expectation_reads_once():
+    trader = FakeTrader(snapshots=[{"btc_balance": 1.0}])
+    tracker(trader).reconcile()
+    assert trader.snapshot_calls == 1
+
+
+def test_fill_summary_fees():
+    reported = fill_summary({"id": "a", "status": "filled", "filled_qty": "2", "filled_avg_price": "100",
+                             "commission": "0.3"})
+    assert (reported["notional"], reported["fee"], reported["fee_estimate"]) == (200.0, 0.3, 0.3)
+
+    missing = fill_summary({"id": "a", "status": "filled", "filled_qty": "2", "filled_avg_price": "100"})
+    assert missing["fee"] is None
+    assert missing["fee_estimate"] == pytest.approx(200.0 * FEE_RATE)
+
+    unfilled = fill_summary({"id": "a", "status": "canceled", "filled_qty": "0"})
+    assert (unfilled["fee"], unfilled["avg_price"]) == (0.0, None)
+
+
+class FakeExchange:
+    # Fills every child at 100 USD/BTC, with or without a commission
+
+    def __init__(self, commission):
+        self.commission = commission
+        self.count = 0
+
+    def book_features(self):
+        return {"mid": 100.0}
+
+    def submit_order(self, side, notional=None, qty=None):
+        self.count += 1
+        qty = qty if qty is not None else notional / 100.0
+        order = {"id": str(self.count), "status": "filled", "filled_qty": str(qty), "filled_avg_price": "100"}
+        if self.commission:
+            order["commission"] = str(qty * 100.0 * 0.001)
+        return order
+
+
+@pytest.mark.parametrize("commission", [True, False])
+def test_execution_report_fees(commission):
+    exchange = FakeExchange(commission)
+    engine = ExecutionEngine(exchange, strategy="iceberg", iceberg_usd=400, sleep=lambda seconds: None)
+    report = engine.execute("buy", notional=1000)
+    assert report["children"] == 3
+    assert report["filled_notional"] == pytest.approx(1000)
+    if commission:
+        assert report["fees"] == pytest.approx(1.0)
+        assert report["fee_estimate"] == pytest.approx(1.0)
+    else:
+        assert report["fees"] is None
+        assert report["fee_estimate"] == pytest.approx(1000 * FEE_RATE)
+
+
+def test_expected_position():
+    buy = {"side": "buy", "filled_qty": 0.5}
+    sell = {"side": "sell", "filled_qty": 0.5}
+    assert expected_position(1.0, buy) == 1.5
+    assert expected_position(1.0, sell) == 0.5
+    assert expected_position(1.0, {"side": "buy", "filled_qty": 0.0}) is None
+    assert expected_position(1.0, None) is None
+
+
+def test_unknown_position_does_not_wait():
+    # Balances could not be read before the trade: take the first snapshot
+    # instead of polling for a position the fills cannot predict
+    trader = FakeTrader(snapshots=[{"btc_balance": 0.2}, {"btc_balance": 0.7}])
+    snapshot = tracker(trader, timeout=5).reconcile(expected_position(None, {"side": "sell", "filled_qty": 0.5}))
+    assert snapshot["btc_balance"] == 0.2
+    assert trader.snapshot_calls == 1
@@ -0,0 +1,113 @@
+import random
+
+import pytest
+
+from orderbook import BookSide, OrderBook
+
+
+def book_side(levels, descending=False, capacity=2000):
+    side = BookSide(descending=descending, capacity=capacity)
+    side.load([price for price, _ in levels], [size for _, size in levels])
+    return side
+
+
+def levels(side):
+    return [(level["p"], level["s"]) for level in side.levels(len(side))]
+
+
+def test_set_inserts_replaces_and_deletes():
+    asks = book_side([(101.0, 1.0), (103.0, 3.0)])
+    asks.set(102.0, 2.0)
+    asks.set(100.0, 0.5)
+    assert levels(asks) == [(100.0, 0.5), (101.0, 1.0), (102.0, 2.0), (103.0, 3.0)]
+    asks.set(102.0, 4.0)
+    asks.set(100.0, 0)
+    assert levels(asks) == [(101.0, 1.0), (102.0, 4.0), (103.0, 3.0)]
+    # Deleting a level that is not there changes nothing
+    asks.set(99.0, 0)
+    assert levels(asks) == [(101.0, 1.0), (102.0, 4.0), (103.0, 3.0)]
+
+
+def test_bids_sort_best_first():
+    bids = book_side([(99.0, 1.0), (98.0, 2.0)], descending=True)
+    bids.set(99.5, 3.0)
+    assert levels(bids) == [(99.5, 3.0), (99.0, 1.0), (98.0, 2.0)]
+    assert bids.best() == 99.5
+
+
+def test_full_side_drops_its_worst_level():
+    asks = book_side([(101.0, 1.0), (102.0, 1.0), (103.0, 1.0)], capacity=3)
+    asks.set(100.0, 1.0)
+    assert [price for price, _ in levels(asks)] == [100.0, 101.0, 102.0]
+    # Worse than every level kept: ignored
+    asks.set(104.0, 1.0)
+    assert [price for price, _ in levels(asks)] == [100.0, 101.0, 102.0]
+
+
+def test_load_skips_empty_levels():
+    asks = book_side([(102.0, 1.0), (101.0, 0.0), (100.0, 2.0)])
+    assert levels(asks) == [(100.0, 2.0), (102.0, 1.0)]
+
+
+def test_depth_includes_the_band_edge():
+    asks = book_side([(100.0, 1.0), (101.0, 2.0), (102.0, 4.0)])
+    assert asks.depth(101.0) == 3.0
+    assert asks.depth(100.99) == 1.0
+    assert asks.depth(99.0) == 0.0
+    bids = book_side([(100.0, 1.0), (99.0, 2.0)], descending=True)
+    assert bids.depth(99.0) == 3.0
+    assert bids.depth(99.01) == 1.0
+
+
+def test_vwap_by_qty():
+    asks = book_side([(100.0, 1.0), (101.0, 2.0)])
+    assert asks.vwap(qty=0.5) == (100.0, 0.5)
+    price, filled = asks.vwap(qty=2.0)
+    assert (price, filled) == (pytest.approx((100.0 + 101.0) / 2), 2.0)
+    # Runs out of book: average of everything there, less than asked
+    price, filled = asks.vwap(qty=5.0)
+    assert (price, filled) == (pytest.approx(302.0 / 3), 3.0)
+
+
+def test_vwap_by_notional():
+    asks = book_side([(100.0, 1.0), (200.0, 1.0)])
+    price, filled = asks.vwap(notional=200.0)
+    assert filled == pytest.approx(1.5)
+    assert price == pytest.approx(200.0 / 1.5)
+    price, filled = asks.vwap(notional=1000.0)
+    assert (price, filled) == (pytest.approx(150.0), 2.0)
+    assert BookSide(descending=False).vwap(qty=1.0) == (None, 0.0)
+
+
+def test_matches_a_dict_reference():
+    rng = random.Random(7)
+    bids = BookSide(descending=True, capacity=50)
+    reference = {}
+    for _ in range(3000):
+        price = float(rng.randint(900, 1100))
+        size = rng.choice([0.0, 0.0, rng.uniform(0.1, 5.0)])
+        bids.set(price, size)
+        if size > 0:
+            reference[price] = size
+        else:
+            reference.pop(price, None)
+        # The side keeps the best 50 bids; a level dropped at capacity is gone for good
+        if len(reference) > 50:
+            del reference[min(reference)]
+        assert levels(bids) == sorted(reference.items(), reverse=True)
+    limit = 1000.0
+    assert bids.depth(limit) == pytest.approx(sum(size for price, size in reference.items() if price >= limit))
+
+
+def test_features():
+    book = OrderBook()
+    book.apply({"r": True, "t": "t0", "b": [{"p": 99.0, "s": 2.0}], "a": [{"p": 101.0, "s": 2.0}]})
+    features = book.features(depth_bps=(100,), fill_notionals=(101, 1000))
+    assert (features["mid"], features["spread"], features["spread_bps"]) == (100.0, 2.0, 200.0)
+    assert features["depth_100bps_ask"] == 2.0 and features["imbalance_100bps"] == 0.0
+    # Fill probes are sized in USD whatever the symbol; None once the book runs out
+    assert features["buy_101usd_bps"] == pytest.approx(100.0)
+    assert features["sell_101usd_bps"] == pytest.approx(100.0)
+    assert features["buy_1000usd_bps"] is None and features["sell_1000usd_bps"] is None
+    book.apply({"a": [{"p": 101.0, "s": 0}, {"p": 102.0, "s": 1.0}]})
+    assert book.best_ask == 102.0
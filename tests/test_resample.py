@@ -0,0 +1,73 @@
+import numpy as np
+import pytest
+
+from bars import Bars
+from resample import Resampler, resample, timeframe_seconds
+
+
+def minute_bars(start, n, seed=0):
+    rng = np.random.default_rng(seed)
+    t = np.datetime64(start, 's') + np.arange(n) * np.timedelta64(60, 's')
+    close = 100 + np.cumsum(rng.normal(0, 1, n))
+    return Bars(t=t, o=close - 0.5, h=close + 1, l=close - 1, c=close, v=rng.uniform(1, 2, n))
+
+
+def same(left, right):
+    assert len(left) == len(right)
+    np.testing.assert_array_equal(left.t, right.t)
+    for name in ('o', 'h', 'l', 'c', 'v'):
+        np.testing.assert_allclose(getattr(left, name), getattr(right, name), err_msg=name)
+
+
+def test_timeframe_seconds():
+    assert timeframe_seconds("1Min") == 60
+    assert timeframe_seconds("15Min") == 900
+    assert timeframe_seconds("4H") == 4 * 3600
+    assert timeframe_seconds("1Day") == 86400
+    with pytest.raises(ValueError):
+        timeframe_seconds("3Fortnights")
+
+
+def test_hour_buckets():
+    # 23:30 .. 01:29, so three hourly buckets with a partial first and last one
+    bars = minute_bars("2024-01-01T23:30:00", 120)
+    hours = resample(bars, 3600)
+    assert list(hours.t.astype(str)) == ["2024-01-01T23:00:00", "2024-01-02T00:00:00", "2024-01-02T01:00:00"]
+    assert hours.o[1] == bars.o[30]
+    assert hours.c[1] == bars.c[89]
+    assert hours.h[1] == bars.h[30:90].max()
+    assert hours.l[1] == bars.l[30:90].min()
+    assert hours.v[1] == pytest.approx(bars.v[30:90].sum())
+
+
+def test_day_buckets_start_at_midnight_plus_offset():
+    bars = minute_bars("2024-01-01T22:00:00", 240)
+    assert list(resample(bars, 86400).t.astype(str)) == ["2024-01-01T00:00:00", "2024-01-02T00:00:00"]
+    # Days starting at 23:00 UTC
+    shifted = resample(bars, 86400, offset=-3600)
+    assert list(shifted.t.astype(str)) == ["2023-12-31T23:00:00", "2024-01-01T23:00:00"]
+    assert shifted.o[0] == bars.o[0]
+    assert shifted.o[1] == bars.o[60]
+
+
+def test_gaps_skip_empty_buckets():
+    bars = Bars.concat([minute_bars("2024-01-01T00:00:00", 10), minute_bars("2024-01-01T03:00:00", 10, seed=1)])
+    assert list(resample(bars, 3600).t.astype(str)) == ["2024-01-01T00:00:00", "2024-01-01T03:00:00"]
+
+
+def test_updates_match_a_full_resample():
+    bars = minute_bars("2024-01-01T22:00:00", 300)
+    resampler = Resampler(offset=0)
+    resampler.update(bars[:100])
+    resampler.bars("1H")
+    resampler.bars("1D")
+    # The newest bar was partial and comes again with the next batch
+    partial = bars[100:101]
+    resampler.update(Bars(t=partial.t, o=partial.o, h=partial.h, l=partial.l, c=partial.c - 5, v=partial.v / 2))
+    resampler.update(bars[100:200])
+    resampler.update(bars[200:])
+
+    same(resampler.bars("1Min"), bars)
+    same(resampler.bars("1H"), resample(bars, 3600))
+    same(resampler.bars("1D"), resample(bars, 86400))
+    assert len(resampler.bars("1H", start="2024-01-02T00:00:00Z", end="2024-01-02T01:00:00Z")) == 2
@@ -0,0 +1,90 @@
+from datetime import datetime, timedelta
+
+import scheduler
+from scheduler import Scheduler, next_deadline, parse_times
+
+TIMES = parse_times("15:00,09:00,21:30")
+
+
+class FakeStore:
+
+    def __init__(self):
+        self.cycles = []
+
+    def log_cycle(self, deadline, status, **fields):
+        self.cycles.append((deadline, status, fields))
+
+
+class Clock(datetime):
+    current = None
+
+    @classmethod
+    def now(cls, tz=None):
+        return cls.current
+
+
+def test_parse_times_sorted():
+    assert TIMES == [(9, 0), (15, 0), (21, 30)]
+
+
+def test_next_deadline_times():
+    assert next_deadline(datetime(2024, 1, 1, 8, 0), TIMES) == datetime(2024, 1, 1, 9, 0)
+    # Strictly after: a deadline does not follow itself
+    assert next_deadline(datetime(2024, 1, 1, 9, 0), TIMES) == datetime(2024, 1, 1, 15, 0)
+    assert next_deadline(datetime(2024, 1, 1, 21, 30), TIMES) == datetime(2024, 1, 2, 9, 0)
+    assert next_deadline(datetime(2024, 12, 31, 23, 0), TIMES) == datetime(2025, 1, 1, 9, 0)
+
+
+def test_next_deadline_interval():
+    assert next_deadline(datetime(2024, 1, 1, 10, 7), interval=900) == datetime(2024, 1, 1, 10, 15)
+    assert next_deadline(datetime(2024, 1, 1, 10, 15), interval=900) == datetime(2024, 1, 1, 10, 30)
+    assert next_deadline(datetime(2024, 1, 1, 23, 50), interval=3600) == datetime(2024, 1, 2, 0, 0)
+
+
+def test_late_cycle_is_missed():
+    store = FakeStore()
+    decided = []
+    daemon = Scheduler(lambda: {"inputs": 1}, decided.append, times=TIMES, grace=60, store=store)
+    daemon.run_cycle(datetime.now() - timedelta(seconds=120))
+    assert decided == []
+    [(_, status, fields)] = store.cycles
+    assert status == "missed"
+    assert fields["lateness"] >= 120
+
+
+def test_cycle_without_inputs():
+    store = FakeStore()
+    daemon = Scheduler(lambda: None, lambda inputs: None, times=TIMES, store=store)
+    daemon.run_cycle(datetime.now())
+    assert [status for _, status, _ in store.cycles] == ["no_inputs"]
+
+
+def test_overlapping_cycle_is_recorded():
+    store = FakeStore()
+    daemon = Scheduler(lambda: {}, lambda inputs: None, times=TIMES, store=store)
+    daemon.running.acquire()
+    daemon.run_cycle(datetime.now())
+    assert [status for _, status, _ in store.cycles] == ["overlap"]
+
+
+def test_deadlines_passed_during_a_cycle_are_missed(monkeypatch):
+    monkeypatch.setattr(scheduler, "datetime", Clock)
+    Clock.current = Clock(2024, 1, 1, 8, 0)
+    store = FakeStore()
+    daemon = Scheduler(lambda: {}, lambda inputs: None, times=TIMES, lead=0, grace=300, store=store)
+    ran = []
+
+    def long_cycle(deadline):
+        # Runs until 22:00, past the 15:00 and 21:30 deadlines and their grace
+        ran.append(deadline)
+        Clock.current = Clock(2024, 1, 1, 22, 0)
+        daemon.stop()
+
+    monkeypatch.setattr(daemon, "wait_until", lambda when: not daemon.stopped.is_set())
+    monkeypatch.setattr(daemon, "run_cycle", long_cycle)
+    daemon.run()
+
+    assert ran == [datetime(2024, 1, 1, 9, 0)]
+    assert [(deadline, status) for deadline, status, _ in store.cycles] == [
+        ("2024-01-01T15:00:00", "missed"), ("2024-01-01T21:30:00", "missed")]
+    assert store.cycles[0][2]["lateness"] == 7 * 3600
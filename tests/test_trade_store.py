@@ -0,0 +1,124 @@
+import sqlite3
+
+import pytest
+
+import trade_store
+from trade_store import TRADE_COLUMNS, TradeStore
+
+# (timestamp, decision, percentage, reason, btc_balance, usd_balance, btc_avg_buy_price, btc_usd_price, reflection)
+TRADES = [
+    ('2024-01-01T10:00:00', 'buy', 100, 'r', 1.0, 0.0, 100.0, 100.0, ''),
+    ('2024-01-01T11:00:00', 'sell', 50, 'r', 0.5, 60.0, 100.0, 120.0, ''),
+    ('2024-01-01T12:00:00', 'hold', 0, 'r', 0.5, 60.0, 100.0, 110.0, ''),
+]
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = TradeStore(str(tmp_path / "trades.db"))
+    yield store
+    store.close()
+
+
+def rollup_tables(conn):
+    return {table: conn.execute(f"SELECT * FROM {table} ORDER BY 1, 2, 3, 4").fetchall()
+            for table in ("rollups", "decision_rollups", "rollup_state")}
+
+
+def test_performance_from_rollups(store):
+    store.log_trades(TRADES)
+    result = store.performance()
+    assert result['start_equity'] == 100.0
+    assert result['end_equity'] == 115.0
+    assert result['return_pct'] == pytest.approx(15.0)
+    assert result['realized_pnl'] == pytest.approx(10.0)
+    assert result['unrealized_pnl'] == pytest.approx(5.0)
+    assert (result['trades'], result['buys'], result['sells'], result['holds']) == (3, 1, 1, 1)
+
+
+def test_performance_window(store):
+    store.log_trades(TRADES)
+    result = store.performance(start='2024-01-01T11:00:00')
+    assert result['start_equity'] == 120.0
+    assert result['trades'] == 2
+    assert result['realized_pnl'] == pytest.approx(10.0)
+    assert store.performance(start='2024-01-02T00:00:00')['trades'] == 0
+
+
+def test_incremental_rollups_match_backfill(store):
+    # One insert per trade, as the live bot logs them
+    for row in TRADES:
+        store.log_trades([row])
+    incremental = rollup_tables(store.conn)
+
+    for table in ("rollups", "decision_rollups", "rollup_state"):
+        store.conn.execute(f"DELETE FROM {table}")
+    trade_store.backfill_rollups(store.conn)
+    store.conn.commit()
+    assert rollup_tables(store.conn) == incremental
+
+
+def build_database(path, version, rows):
+    # Database as the code at schema `version` left it, with `rows` as its trades
+    conn = sqlite3.connect(path)
+    for number, statements in enumerate(trade_store.MIGRATIONS[:version], start=1):
+        for statement in statements:
+            statement(conn) if callable(statement) else conn.execute(statement)
+        conn.execute(f"PRAGMA user_version = {number}")
+    columns = TRADE_COLUMNS + (['symbol'] if version >= 6 else [])
+    conn.executemany(f"INSERT INTO trades ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+                     [row + ((trade_store.DEFAULT_SYMBOL,) if version >= 6 else ()) for row in rows])
+    conn.commit()
+    conn.close()
+
+
+@pytest.mark.parametrize("version", [2, 5, 6])
+def test_migrates_old_databases(tmp_path, version):
+    path = str(tmp_path / "old.db")
+    build_database(path, version, TRADES)
+    store = TradeStore(path)
+    try:
+        assert store.conn.execute("PRAGMA user_version").fetchone()[0] == len(trade_store.MIGRATIONS)
+        assert store.targets() == [(trade_store.DEFAULT_SYMBOL, trade_store.DEFAULT_ACCOUNT)]
+        assert len(store.get_recent_trades(days=100000, account='')) == len(TRADES)
+        result = store.performance()
+        assert (result['start_equity'], result['end_equity'], result['trades']) == (100.0, 115.0, 3)
+        assert result['realized_pnl'] == pytest.approx(10.0)
+    finally:
+        store.close()
+
+
+def test_failed_migration_rolls_back(tmp_path, monkeypatch):
+    path = str(tmp_path / "trades.db")
+    TradeStore(path).close()
+
+    def fail(conn):
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(trade_store, "MIGRATIONS", trade_store.MIGRATIONS + [
+        ['CREATE TABLE extra (id INTEGER)', 'ALTER TABLE trades ADD COLUMN extra TEXT', fail]])
+    with pytest.raises(RuntimeError):
+        TradeStore(path)
+
+    conn = sqlite3.connect(path)
+    try:
+        assert conn.execute("PRAGMA user_version").fetchone()[0] == len(trade_store.MIGRATIONS) - 1
+        assert conn.execute("SELECT name FROM sqlite_master WHERE name = 'extra'").fetchone() is None
+        assert 'extra' not in [column[1] for column in conn.execute("PRAGMA table_info(trades)")]
+    finally:
+        conn.close()
+
+
+def test_accounts_are_kept_apart(store):
+    store.log_trades(TRADES, symbol='BTC/USD')
+    store.log_trades(TRADES[:1], symbol='BTC/USD', account='alt')
+    store.save_reflection('h1', 1, 'default', symbol='BTC/USD')
+    store.save_reflection('h2', 4, 'alt', symbol='BTC/USD', account='alt')
+
+    assert store.targets() == [('BTC/USD', ''), ('BTC/USD', 'alt')]
+    assert store.performance()['trades'] == 3
+    assert store.performance(account='alt')['trades'] == 1
+    assert len(store.get_recent_trades(days=100000, symbol='BTC/USD', account='alt')) == 1
+    assert len(store.get_recent_trades(days=100000)) == 4
+    assert store.get_cached_reflection('BTC/USD', '')[2] == 'default'
+    assert store.get_cached_reflection('BTC/USD', 'alt')[2] == 'alt'
@@ -0,0 +1,539 @@
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+import telemetry
+
+# Trade store
+# ------------------------
+# One long-lived WAL-mode connection per database file. WAL lets the Streamlit
+# reader run while the trader writes. The schema is versioned with PRAGMA
+# user_version and brought up to date when the store is opened.
+
+DB_PATH = 'bitcoin_trades.db'
+
+# Symbol of rows written before trades were keyed by symbol
+DEFAULT_SYMBOL = 'BTC/USD'
+# Account of the default APCA_API_KEY_ID credentials (runner.py names the others)
+DEFAULT_ACCOUNT = ''
+
+TRADE_COLUMNS = ['timestamp', 'decision', 'percentage', 'reason', 'btc_balance',
+                 'usd_balance', 'btc_avg_buy_price', 'btc_usd_price', 'reflection']
+
+# How the decision's orders filled (live trades only; NULL for backtests)
+FILL_COLUMNS = ['order_status', 'filled_qty', 'filled_avg_price', 'fees', 'order_ids']
+
+# Each entry moves the schema from version i to i + 1
+MIGRATIONS = [
+    # 1: original tables
+    ['''CREATE TABLE IF NOT EXISTS trades
+        (id INTEGER PRIMARY KEY AUTOINCREMENT,
+         timestamp TEXT,
+         decision TEXT,
+         percentage INTEGER,
+         reason TEXT,
+         btc_balance REAL,
+         usd_balance REAL,
+         btc_avg_buy_price REAL,
+         btc_usd_price REAL,
+         reflection TEXT)''',
+     '''CREATE TABLE IF NOT EXISTS reflections
+        (id INTEGER PRIMARY KEY AUTOINCREMENT,
+         created_at TEXT,
+         input_hash TEXT,
+         last_trade_id INTEGER,
+         content TEXT)'''],
+    # 2: indexes for the recent-trades window and per-decision queries
+    ['CREATE INDEX IF NOT EXISTS idx_trades_timestamp ON trades (timestamp)',
+     'CREATE INDEX IF NOT EXISTS idx_trades_decision ON trades (decision, timestamp)'],
+    # 3: performance rollups, filled from the existing trades
+    ['''CREATE TABLE IF NOT EXISTS rollups
+        (level TEXT,
+         bucket TEXT,
+         trades INTEGER,
+         buys INTEGER,
+         sells INTEGER,
+         holds INTEGER,
+         open_equity REAL,
+         close_equity REAL,
+         high_equity REAL,
+         low_equity REAL,
+         realized_pnl REAL,
+         unrealized_pnl REAL,
+         cum_trades INTEGER,
+         cum_buys INTEGER,
+         cum_sells INTEGER,
+         cum_realized_pnl REAL,
+         last_timestamp TEXT,
+         PRIMARY KEY (level, bucket)) WITHOUT ROWID''',
+     '''CREATE TABLE IF NOT EXISTS decision_rollups
+        (decision TEXT,
+         day TEXT,
+         trades INTEGER,
+         executed INTEGER,
+         realized_pnl REAL,
+         PRIMARY KEY (decision, day)) WITHOUT ROWID''',
+     '''CREATE TABLE IF NOT EXISTS rollup_state
+        (id INTEGER PRIMARY KEY CHECK (id = 0),
+         btc_balance REAL,
+         btc_avg_buy_price REAL,
+         trades INTEGER,
+         buys INTEGER,
+         sells INTEGER,
+         realized_pnl REAL)''',
+     lambda conn: backfill_rollups(conn, keys=(), state_key={'id': 0})],
+    # 4: one row per scheduled decision, with how late it ran
+    ['''CREATE TABLE IF NOT EXISTS cycles
+        (id INTEGER PRIMARY KEY AUTOINCREMENT,
+         deadline TEXT,
+         status TEXT,
+         prefetch_started TEXT,
+         prefetch_seconds REAL,
+         decided_at TEXT,
+         lateness REAL,
+         cycle_seconds REAL,
+         error TEXT)''',
+     'CREATE INDEX IF NOT EXISTS idx_cycles_deadline ON cycles (deadline)'],
+    # 5: fills of the orders behind each trade
+    ['ALTER TABLE trades ADD COLUMN order_status TEXT',
+     'ALTER TABLE trades ADD COLUMN filled_qty REAL',
+     'ALTER TABLE trades ADD COLUMN filled_avg_price REAL',
+     'ALTER TABLE trades ADD COLUMN fees REAL',
+     'ALTER TABLE trades ADD COLUMN order_ids TEXT'],
+    # 6: trades, reflections and rollups keyed by symbol; rollups rebuilt from the trades
+    ['ALTER TABLE trades ADD COLUMN symbol TEXT',
+     f"UPDATE trades SET symbol = '{DEFAULT_SYMBOL}'",
+     'CREATE INDEX IF NOT EXISTS idx_trades_symbol ON trades (symbol, timestamp)',
+     'ALTER TABLE reflections ADD COLUMN symbol TEXT',
+     f"UPDATE reflections SET symbol = '{DEFAULT_SYMBOL}'",
+     'DROP TABLE IF EXISTS rollups',
+     'DROP TABLE IF EXISTS decision_rollups',
+     'DROP TABLE IF EXISTS rollup_state',
+     '''CREATE TABLE rollups
+        (symbol TEXT,
+         level TEXT,
+         bucket TEXT,
+         trades INTEGER,
+         buys INTEGER,
+         sells INTEGER,
+         holds INTEGER,
+         open_equity REAL,
+         close_equity REAL,
+         high_equity REAL,
+         low_equity REAL,
+         realized_pnl REAL,
+         unrealized_pnl REAL,
+         cum_trades INTEGER,
+         cum_buys INTEGER,
+         cum_sells INTEGER,
+         cum_realized_pnl REAL,
+         last_timestamp TEXT,
+         PRIMARY KEY (symbol, level, bucket)) WITHOUT ROWID''',
+     '''CREATE TABLE decision_rollups
+        (symbol TEXT,
+         decision TEXT,
+         day TEXT,
+         trades INTEGER,
+         executed INTEGER,
+         realized_pnl REAL,
+         PRIMARY KEY (symbol, decision, day)) WITHOUT ROWID''',
+     '''CREATE TABLE rollup_state
+        (symbol TEXT PRIMARY KEY,
+         btc_balance REAL,
+         btc_avg_buy_price REAL,
+         trades INTEGER,
+         buys INTEGER,
+         sells INTEGER,
+         realized_pnl REAL)''',
+     lambda conn: backfill_rollups(conn, keys=('symbol',))],
+    # 7: trades, reflections and rollups keyed by account as well, so two accounts
+    # trading one symbol keep separate positions; rollups rebuilt from the trades
+    [f"ALTER TABLE trades ADD COLUMN account TEXT NOT NULL DEFAULT '{DEFAULT_ACCOUNT}'",
+     'DROP INDEX IF EXISTS idx_trades_symbol',
+     'CREATE INDEX IF NOT EXISTS idx_trades_target ON trades (symbol, account, timestamp)',
+     f"ALTER TABLE reflections ADD COLUMN account TEXT NOT NULL DEFAULT '{DEFAULT_ACCOUNT}'",
+     'DROP TABLE rollups',
+     'DROP TABLE decision_rollups',
+     'DROP TABLE rollup_state',
+     '''CREATE TABLE rollups
+        (symbol TEXT,
+         account TEXT,
+         level TEXT,
+         bucket TEXT,
+         trades INTEGER,
+         buys INTEGER,
+         sells INTEGER,
+         holds INTEGER,
+         open_equity REAL,
+         close_equity REAL,
+         high_equity REAL,
+         low_equity REAL,
+         realized_pnl REAL,
+         unrealized_pnl REAL,
+         cum_trades INTEGER,
+         cum_buys INTEGER,
+         cum_sells INTEGER,
+         cum_realized_pnl REAL,
+         last_timestamp TEXT,
+         PRIMARY KEY (symbol, account, level, bucket)) WITHOUT ROWID''',
+     '''CREATE TABLE decision_rollups
+        (symbol TEXT,
+         account TEXT,
+         decision TEXT,
+         day TEXT,
+         trades INTEGER,
+         executed INTEGER,
+         realized_pnl REAL,
+         PRIMARY KEY (symbol, account, decision, day)) WITHOUT ROWID''',
+     '''CREATE TABLE rollup_state
+        (symbol TEXT,
+         account TEXT,
+         btc_balance REAL,
+         btc_avg_buy_price REAL,
+         trades INTEGER,
+         buys INTEGER,
+         sells INTEGER,
+         realized_pnl REAL,
+         PRIMARY KEY (symbol, account))''',
+     lambda conn: backfill_rollups(conn, keys=('symbol', 'account'))],
+]
+
+# Rollups
+# ------------------------
+# Hourly and daily buckets (timestamp prefixes) plus per-decision daily
+# counts, one set per symbol and account, updated in the same transaction as every trade insert. Each bucket
+# also stores the running totals at its close, so any window is two or three
+# primary-key lookups instead of a scan over trades. Realized PnL is booked
+# when btc_balance drops, against the average buy price before the sale.
+
+ROLLUP_LEVELS = {'hour': 13, 'day': 10}
+
+ROLLUP_COLUMNS = ['level', 'bucket', 'trades', 'buys', 'sells', 'holds', 'open_equity', 'close_equity',
+                  'high_equity', 'low_equity', 'realized_pnl', 'unrealized_pnl', 'cum_trades', 'cum_buys',
+                  'cum_sells', 'cum_realized_pnl', 'last_timestamp']
+STATE_COLUMNS = ['btc_balance', 'btc_avg_buy_price', 'trades', 'buys', 'sells', 'realized_pnl']
+
+def _insert(table, columns, conflict=None, updates=None, verb="INSERT"):
+    # Named-parameter INSERT, or UPSERT when `conflict` columns are given
+    sql = f"{verb} INTO {table} ({', '.join(columns)}) VALUES ({', '.join(':' + column for column in columns)})"
+    if conflict:
+        sql += f" ON CONFLICT ({', '.join(conflict)}) DO UPDATE SET " + ", ".join(updates)
+    return sql
+
+def _rollup_upsert(key):
+    return _insert('rollups', list(key) + ROLLUP_COLUMNS, list(key) + ['level', 'bucket'], [
+        'trades = trades + excluded.trades',
+        'buys = buys + excluded.buys',
+        'sells = sells + excluded.sells',
+        'holds = holds + excluded.holds',
+        'close_equity = excluded.close_equity',
+        'high_equity = MAX(high_equity, excluded.high_equity)',
+        'low_equity = MIN(low_equity, excluded.low_equity)',
+        'realized_pnl = realized_pnl + excluded.realized_pnl',
+        'unrealized_pnl = excluded.unrealized_pnl',
+    ] + [f'{column} = excluded.{column}' for column in
+         ('cum_trades', 'cum_buys', 'cum_sells', 'cum_realized_pnl', 'last_timestamp')])
+
+def _decision_upsert(key):
+    return _insert('decision_rollups', list(key) + ['decision', 'day', 'trades', 'executed', 'realized_pnl'],
+                   list(key) + ['decision', 'day'], [
+        'trades = trades + excluded.trades',
+        'executed = executed + excluded.executed',
+        'realized_pnl = realized_pnl + excluded.realized_pnl',
+    ])
+
+def _where(key):
+    return " AND ".join(f"{column} = :{column}" for column in key) or "1"
+
+def update_rollups(conn, rows, key=None, state_key=None):
+    # rows: tuples in TRADE_COLUMNS order for one key, oldest first, not yet rolled up.
+    # key: {column: value} leading the rollup primary keys, e.g. {'symbol': 'BTC/USD', 'account': ''};
+    # state_key selects the rollup_state row when it differs (the v3 table's id = 0)
+    key = {'symbol': DEFAULT_SYMBOL, 'account': DEFAULT_ACCOUNT} if key is None else key
+    state_key = key if state_key is None else state_key
+    state = conn.execute(f"SELECT {', '.join(STATE_COLUMNS)} FROM rollup_state WHERE {_where(state_key)}",
+                         state_key).fetchone()
+    btc, avg, trades, buys, sells, realized = state or (0.0, 0.0, 0, 0, 0, 0.0)
+    buckets = {}
+    decisions = {}
+    for timestamp, decision, percentage, _, btc_balance, usd_balance, avg_price, price, _ in rows:
+        btc_balance, usd_balance, avg_price, price = (float(btc_balance or 0), float(usd_balance or 0),
+                                                      float(avg_price or 0), float(price or 0))
+        pnl = (btc - btc_balance) * (price - avg) if btc_balance < btc else 0.0
+        btc, avg = btc_balance, avg_price
+        equity = usd_balance + btc_balance * price
+        trades += 1
+        buys += decision == "buy"
+        sells += decision == "sell"
+        realized += pnl
+
+        for level, width in ROLLUP_LEVELS.items():
+            bucket_key = (level, timestamp[:width])
+            bucket = buckets.get(bucket_key)
+            if bucket is None:
+                bucket = buckets[bucket_key] = {
+                    **key, 'level': level, 'bucket': bucket_key[1], 'trades': 0, 'buys': 0, 'sells': 0, 'holds': 0,
+                    'open_equity': equity, 'high_equity': equity, 'low_equity': equity, 'realized_pnl': 0.0,
+                }
+            bucket['trades'] += 1
+            bucket['buys'] += decision == "buy"
+            bucket['sells'] += decision == "sell"
+            bucket['holds'] += decision not in ("buy", "sell")
+            bucket['close_equity'] = equity
+            bucket['high_equity'] = max(bucket['high_equity'], equity)
+            bucket['low_equity'] = min(bucket['low_equity'], equity)
+            bucket['realized_pnl'] += pnl
+            bucket['unrealized_pnl'] = btc_balance * (price - avg_price)
+            bucket.update(cum_trades=trades, cum_buys=buys, cum_sells=sells, cum_realized_pnl=realized,
+                          last_timestamp=timestamp)
+
+        counts = decisions.setdefault((decision, timestamp[:10]), [0, 0, 0.0])
+        counts[0] += 1
+        counts[1] += bool(percentage)
+        counts[2] += pnl
+
+    if not buckets:
+        return
+    conn.executemany(_rollup_upsert(key), buckets.values())
+    conn.executemany(_decision_upsert(key), [
+        {**key, 'decision': decision, 'day': day, 'trades': counts[0], 'executed': counts[1], 'realized_pnl': counts[2]}
+        for (decision, day), counts in decisions.items()])
+    conn.execute(_insert('rollup_state', list(state_key) + STATE_COLUMNS, verb="INSERT OR REPLACE"),
+                 {**state_key, **dict(zip(STATE_COLUMNS, (btc, avg, trades, buys, sells, realized)))})
+
+def backfill_rollups(conn, keys=('symbol', 'account'), state_key=None, chunk=10000):
+    # Rolls up every trade, one pass per distinct value of the `keys` columns.
+    # Migrations pass the key columns their own table shapes use.
+    groups = conn.execute(f"SELECT DISTINCT {', '.join(keys)} FROM trades").fetchall() if keys else [()]
+    for values in groups:
+        key = dict(zip(keys, values))
+        cursor = conn.execute(f"SELECT {', '.join(TRADE_COLUMNS)} FROM trades WHERE {_where(key)} ORDER BY id", key)
+        while True:
+            rows = cursor.fetchmany(chunk)
+            if not rows:
+                break
+            update_rollups(conn, rows, key, state_key)
+
+def _bucket(timestamp, level):
+    return timestamp[:ROLLUP_LEVELS[level]] if timestamp else None
+
+def performance(conn, start=None, end=None, level='hour', symbol=DEFAULT_SYMBOL, account=DEFAULT_ACCOUNT):
+    # Equity change, PnL and trade counts for trades in [start, end], to the
+    # bucket: the first bucket at or after start against the last one at or
+    # before end. start/end are ISO timestamps, None for open ends.
+    start, end = _bucket(start, level), _bucket(end, level)
+    columns = 'open_equity, close_equity, unrealized_pnl, cum_trades, cum_buys, cum_sells, cum_realized_pnl'
+    where = "FROM rollups WHERE symbol = ? AND account = ? AND level = ? AND bucket"
+    first = conn.execute(f"SELECT {columns} {where} >= ? ORDER BY bucket LIMIT 1",
+                         (symbol, account, level, start or '')).fetchone()
+    last = conn.execute(f"SELECT {columns} {where} <= ? ORDER BY bucket DESC LIMIT 1",
+                        (symbol, account, level, end or '\uffff')).fetchone()
+    before = None
+    if start:
+        before = conn.execute(f"SELECT {columns} {where} < ? ORDER BY bucket DESC LIMIT 1",
+                              (symbol, account, level, start)).fetchone()
+
+    result = {'start_equity': 0.0, 'end_equity': 0.0, 'return_pct': 0.0, 'realized_pnl': 0.0,
+              'unrealized_pnl': 0.0, 'trades': 0, 'buys': 0, 'sells': 0, 'holds': 0}
+    if first is None or last is None or (end and start and start > end):
+        return result
+    base = before[3:] if before else (0, 0, 0, 0.0)
+    trades, buys, sells = last[3] - base[0], last[4] - base[1], last[5] - base[2]
+    if trades <= 0:
+        return result
+    result.update(
+        start_equity=first[0], end_equity=last[1],
+        return_pct=(last[1] - first[0]) / first[0] * 100 if first[0] else 0.0,
+        realized_pnl=last[6] - base[3], unrealized_pnl=last[2],
+        trades=trades, buys=buys, sells=sells, holds=trades - buys - sells,
+    )
+    return result
+
+def equity_series(conn, start=None, end=None, level='hour', symbol=DEFAULT_SYMBOL, account=DEFAULT_ACCOUNT):
+    # One row per bucket: bucket, close/high/low equity, realized and unrealized PnL, trades
+    return pd.read_sql_query(
+        '''SELECT bucket, close_equity, high_equity, low_equity, realized_pnl, unrealized_pnl, trades
+           FROM rollups WHERE symbol = ? AND account = ? AND level = ? AND bucket >= ? AND bucket <= ?
+           ORDER BY bucket''',
+        conn, params=(symbol, account, level, _bucket(start, level) or '', _bucket(end, level) or '\uffff'))
+
+def decision_counts(conn, start=None, end=None, symbol=DEFAULT_SYMBOL, account=DEFAULT_ACCOUNT):
+    # decision -> trades, executed, realized_pnl over whole days in the window
+    return pd.read_sql_query(
+        '''SELECT decision, SUM(trades) AS trades, SUM(executed) AS executed, SUM(realized_pnl) AS realized_pnl
+           FROM decision_rollups WHERE symbol = ? AND account = ? AND day >= ? AND day <= ? GROUP BY decision''',
+        conn, params=(symbol, account, _bucket(start, 'day') or '', _bucket(end, 'day') or '\uffff'))
+
+def targets(conn):
+    return conn.execute("SELECT symbol, account FROM rollup_state ORDER BY symbol, account").fetchall()
+
+def connect_readonly(path=DB_PATH):
+    # Reader connection for the dashboard; never blocks the trader's writes
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+    conn.execute("PRAGMA busy_timeout=5000")
+    return conn
+
+class TradeStore:
+
+    def __init__(self, path=DB_PATH):
+        self.path = path
+        self.lock = threading.RLock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("PRAGMA busy_timeout=5000")
+        self._batch_depth = 0
+        self.migrate()
+
+    def migrate(self):
+        with self.lock:
+            version = self.conn.execute("PRAGMA user_version").fetchone()[0]
+            for number, statements in enumerate(MIGRATIONS[version:], start=version + 1):
+                # Each step and its user_version bump commit together; DDL would
+                # otherwise run outside the implicit transaction
+                self.conn.execute("BEGIN")
+                try:
+                    for statement in statements:
+                        if callable(statement):
+                            statement(self.conn)
+                        else:
+                            self.conn.execute(statement)
+                    self.conn.execute(f"PRAGMA user_version = {number}")
+                except Exception:
+                    self.conn.rollback()
+                    raise
+                self.conn.commit()
+            return max(version, len(MIGRATIONS))
+
+    def _commit(self):
+        if self._batch_depth == 0:
+            self.conn.commit()
+
+    @contextmanager
+    def batch(self):
+        # Writes inside the block share one transaction
+        with self.lock:
+            self._batch_depth += 1
+            try:
+                yield self
+            except Exception:
+                self._batch_depth -= 1
+                if self._batch_depth == 0:
+                    self.conn.rollback()
+                raise
+            self._batch_depth -= 1
+            self._commit()
+
+    # Trades
+    def log_trade(self, decision, percentage, reason, btc_balance, usd_balance, btc_avg_buy_price, btc_usd_price,
+                  reflection, timestamp=None, fill=None, symbol=DEFAULT_SYMBOL, account=DEFAULT_ACCOUNT):
+        # fill: dict with FILL_COLUMNS keys, written in the same insert
+        timestamp = timestamp or datetime.now().isoformat()
+        row = (timestamp, decision, percentage, reason, btc_balance, usd_balance,
+               btc_avg_buy_price, btc_usd_price, reflection)
+        if fill is None:
+            return self.log_trades([row], symbol=symbol, account=account)
+        return self.log_trades([row + tuple(fill.get(column) for column in FILL_COLUMNS)],
+                               TRADE_COLUMNS + FILL_COLUMNS, symbol=symbol, account=account)
+
+    def log_trades(self, rows, columns=TRADE_COLUMNS, symbol=DEFAULT_SYMBOL, account=DEFAULT_ACCOUNT):
+        # rows: tuples in `columns` order (TRADE_COLUMNS first), oldest first, all for `symbol` on `account`
+        rows = list(rows)
+        with telemetry.span("db_write_seconds", table="trades"), self.lock:
+            try:
+                cursor = self.conn.executemany(
+                    f'''INSERT INTO trades ({", ".join(columns)}, symbol, account)
+                        VALUES ({", ".join("?" * (len(columns) + 2))})''', [(*row, symbol, account) for row in rows])
+                if len(columns) > len(TRADE_COLUMNS):
+                    rows = [row[:len(TRADE_COLUMNS)] for row in rows]
+                update_rollups(self.conn, rows, {'symbol': symbol, 'account': account})
+            except Exception:
+                if self._batch_depth == 0:
+                    self.conn.rollback()
+                raise
+            self._commit()
+            return cursor.lastrowid
+
+    def clear_trades(self):
+        with self.lock:
+            for table in ("trades", "rollups", "decision_rollups", "rollup_state"):
+                self.conn.execute(f"DELETE FROM {table}")
+            self._commit()
+
+    def get_recent_trades(self, days=7, symbol=None, account=None):
+        # symbol/account None: every symbol/account
+        since = (datetime.now() - timedelta(days=days)).isoformat()
+        where, params = ["timestamp > ?"], [since]
+        for column, value in (("symbol", symbol), ("account", account)):
+            if value is not None:
+                where.append(f"{column} = ?")
+                params.append(value)
+        with self.lock:
+            c = self.conn.execute(f"SELECT * FROM trades WHERE {' AND '.join(where)} ORDER BY timestamp DESC", params)
+            columns = [column[0] for column in c.description]
+            rows = c.fetchall()
+        return pd.DataFrame.from_records(data=rows, columns=columns)
+
+    # Rollups
+    def performance(self, start=None, end=None, level='hour', symbol=DEFAULT_SYMBOL, account=DEFAULT_ACCOUNT):
+        with self.lock:
+            return performance(self.conn, start, end, level, symbol, account)
+
+    def recent_performance(self, days=7, symbol=DEFAULT_SYMBOL, account=DEFAULT_ACCOUNT):
+        return self.performance(start=(datetime.now() - timedelta(days=days)).isoformat(), symbol=symbol,
+                                account=account)
+
+    def equity_series(self, start=None, end=None, level='hour', symbol=DEFAULT_SYMBOL, account=DEFAULT_ACCOUNT):
+        with self.lock:
+            return equity_series(self.conn, start, end, level, symbol, account)
+
+    def targets(self):
+        # (symbol, account) pairs that have trades
+        with self.lock:
+            return targets(self.conn)
+
+    # Scheduled cycles
+    def log_cycle(self, deadline, status, prefetch_started=None, prefetch_seconds=None, decided_at=None,
+                  lateness=None, cycle_seconds=None, error=None):
+        with telemetry.span("db_write_seconds", table="cycles"), self.lock:
+            self.conn.execute(
+                '''INSERT INTO cycles (deadline, status, prefetch_started, prefetch_seconds, decided_at, lateness,
+                   cycle_seconds, error) VALUES (?, ?, ?, ?, ?, ?, ?, ?)''',
+                (deadline, status, prefetch_started, prefetch_seconds, decided_at, lateness, cycle_seconds, error))
+            self._commit()
+
+    # Reflections
+    def get_cached_reflection(self, symbol=DEFAULT_SYMBOL, account=DEFAULT_ACCOUNT):
+        with self.lock:
+            return self.conn.execute(
+                '''SELECT input_hash, last_trade_id, content FROM reflections WHERE symbol = ? AND account = ?
+                   ORDER BY id DESC LIMIT 1''', (symbol, account)).fetchone()
+
+    def save_reflection(self, input_hash, last_trade_id, content, symbol=DEFAULT_SYMBOL, account=DEFAULT_ACCOUNT):
+        with telemetry.span("db_write_seconds", table="reflections"), self.lock:
+            self.conn.execute(
+                '''INSERT INTO reflections (created_at, input_hash, last_trade_id, content, symbol, account)
+                   VALUES (?, ?, ?, ?, ?, ?)''',
+                (datetime.now().isoformat(), input_hash, last_trade_id, content, symbol, account))
+            self._commit()
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+        with _stores_lock:
+            if _stores.get(self.path) is self:
+                del _stores[self.path]
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+def get_store(path=DB_PATH):
+    with _stores_lock:
+        store = _stores.get(path)
+        if store is None:
+            store = TradeStore(path)
+            _stores[path] = store
+        return store